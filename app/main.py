@@ -1,14 +1,82 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 
-from app.routers import products
+from app.routers import metrics, prices, products, status
+from app.services.driver_pool import DRIVER_POOL_WARM, close_driver_pool, get_driver_pool
+from app.services.executor import shutdown_executor
+from app.services.fetchers import close_http_fetcher
+from app.services.local_cache import local_cache, snapshot_versions
+from app.services.price_history import price_history
+from app.services.scheduler import CRAWL_SCHEDULER, CrawlScheduler
+from app.utils.metrics import HTTP_REQUEST_SECONDS
 
 load_dotenv()
 
+# Query parameters whose presence labels request latency metrics.
+FILTER_PARAMS = ("store", "category", "min_discount", "sort", "cursor")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    crawls_here = CRAWL_SCHEDULER in ("app", "off")
+    if crawls_here and DRIVER_POOL_WARM:
+        asyncio.get_running_loop().run_in_executor(None, get_driver_pool().warm)
+
+    listener = None
+    if local_cache.enabled:
+        listener = asyncio.create_task(snapshot_versions.listen(), name="snapshot-listener")
+
+    scheduler = None
+    if CRAWL_SCHEDULER == "app":
+        scheduler = CrawlScheduler()
+        scheduler.start()
+
+    yield
+
+    if scheduler is not None:
+        await scheduler.stop()
+    if listener is not None:
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+    shutdown_executor()
+    close_driver_pool()
+    close_http_fetcher()
+    price_history.close()
+
+
 app = FastAPI(
     title="Discounted Men's Clothing Products Scraper API",
     description="This API retrieves discounted men's clothing products from stores like Zara and Amazon.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        filters = [name for name in FILTER_PARAMS if request.query_params.get(name)]
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status_code),
+            filters="+".join(filters) or "none",
+        )
+
+
 app.include_router(products.router)
+app.include_router(prices.router)
+app.include_router(status.router)
+app.include_router(metrics.router)
@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic import BaseModel
 
 
@@ -10,3 +12,53 @@ class Product(BaseModel):
     image_url: str
     store: str
     category: str
+    # The display prices in integer minor units (e.g. cents) of `currency`.
+    currency: Optional[str] = None
+    original_price_minor: Optional[int] = None
+    discounted_price_minor: Optional[int] = None
+
+
+class ProductChanges(BaseModel):
+    store: str
+    version: int
+    previous_version: Optional[int]
+    published_at: float
+    added: List[Product]
+    changed: List[Product]
+    removed: List[Product]
+
+
+class PricePoint(BaseModel):
+    observed_at: float
+    price: Optional[float]
+    original_price: Optional[float]
+    discount_percent: float
+    display_price: str
+    display_original_price: str
+
+
+class PriceHistory(BaseModel):
+    identity: str
+    store: str
+    name: str
+    category: str
+    purchase_url: str
+    image_url: str
+    first_seen: float
+    lowest_price: Optional[float]
+    highest_price: Optional[float]
+    prices: List[PricePoint]
+
+
+class PriceDrop(BaseModel):
+    identity: str
+    store: str
+    name: str
+    category: str
+    purchase_url: str
+    image_url: str
+    observed_at: float
+    price: float
+    previous_price: float
+    lowest_price: float
+    drop_percent: float
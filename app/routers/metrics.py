@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.services.driver_pool import get_driver_pool
+from app.utils.metrics import DRIVER_POOL_SESSIONS, render
+
+router = APIRouter()
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="Get metrics in the Prometheus text format",
+    description=(
+        "Crawl durations and per-stage timings, extracted items and parse errors, "
+        "cache hit/stale/miss counts, Redis latency and API request latency."
+    ),
+)
+async def get_metrics() -> PlainTextResponse:
+    stats = get_driver_pool().stats()
+    for state in ("open", "idle", "leased"):
+        DRIVER_POOL_SESSIONS.set(stats[state], state=state)
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,70 @@
+import asyncio
+import functools
+import time
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.models.product import PriceDrop, PriceHistory
+from app.services.deltas import url_identity
+from app.services.price_history import price_history
+
+router = APIRouter()
+
+
+async def _run(func, *args, **kwargs):
+    """Run a blocking price history query off the event loop."""
+    if not price_history.enabled:
+        raise HTTPException(status_code=503, detail="Price history is disabled")
+    return await asyncio.get_running_loop().run_in_executor(
+        None, functools.partial(func, *args, **kwargs)
+    )
+
+
+@router.get(
+    "/price-history",
+    response_model=PriceHistory,
+    summary="Get the price history of a product",
+    description=(
+        "Returns every price recorded for a product, oldest first, with the lowest and "
+        "highest prices seen. A price is recorded whenever a crawl finds it changed. "
+        "An `original_price` well above the `highest_price` the product ever sold at "
+        "suggests an inflated discount."
+    ),
+)
+async def get_price_history(
+    store: str = Query(..., description="Store of the product (e.g., 'zara')"),
+    url: str = Query(..., description="Purchase URL of the product"),
+) -> PriceHistory:
+    history = await _run(price_history.history, url_identity(store.lower(), url))
+    if history is None:
+        raise HTTPException(status_code=404, detail="No price history for this product")
+    return history
+
+
+@router.get(
+    "/price-drops",
+    response_model=List[PriceDrop],
+    summary="Get recent price drops",
+    description=(
+        "Returns products whose price fell in the last `hours` hours, largest drop first. "
+        "`lowest_price` is the lowest price ever recorded for the product."
+    ),
+)
+async def get_price_drops(
+    store: Optional[str] = Query(
+        None, description="Filter by store (e.g., 'zara', 'amazon', 'mango')"
+    ),
+    hours: float = Query(24, gt=0, description="How far back to look for drops"),
+    min_drop: float = Query(
+        0, ge=0, le=100, description="Minimum drop as a percentage of the previous price"
+    ),
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of products"),
+) -> List[PriceDrop]:
+    return await _run(
+        price_history.price_drops,
+        time.time() - hours * 3600,
+        store=store.lower() if store else None,
+        min_drop=min_drop,
+        limit=limit,
+    )
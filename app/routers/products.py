@@ -1,14 +1,43 @@
 import asyncio
-from typing import List, Optional
+import csv
+import hashlib
+import io
+import json
+import os
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Set
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 
-from app.models.product import Product
-from app.services.amazon_scraper import scrape_amazon_discounted_products
-from app.services.mango_scraper import scrape_mango_discounted_products
-from app.services.zara_scraper import scrape_zara_discounted_products
+from app.models.product import Product, ProductChanges
+from app.services.local_cache import snapshot_versions
+from app.services.product_index import Match, product_index
+from app.services.response_cache import (
+    RESPONSE_CACHE_MAX_AGE,
+    CachedPage,
+    PageKey,
+    encode_records,
+    page_cache,
+    page_etag,
+)
+from app.services.scheduler import API_READ_ONLY
+from app.services.snapshot import FIELDS, Snapshot
+from app.services.store_cache import (
+    SnapshotChangedError,
+    get_or_refresh_many,
+    load_records,
+    load_version,
+    read_changes,
+    sync_index,
+    version_key,
+)
+from app.services.stores import Store, store_mapping
+from app.utils.cursor import Cursor, InvalidCursorError, decode_cursor, encode_cursor
 from app.utils.logger import logger
 
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "500"))
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
 router = APIRouter()
 
 
@@ -16,7 +45,16 @@ router = APIRouter()
     "/discounted-products",
     response_model=List[Product],
     summary="Get discounted men's clothing products",
-    description="This endpoint returns a list of discounted men's clothing products from various stores such as Zara, Amazon, and Mango.",
+    description=(
+        "This endpoint returns a list of discounted men's clothing products from various "
+        "stores such as Zara, Amazon, and Mango. Without `sort`, results filtered by "
+        "min_discount are ordered by descending discount. When more results follow, the "
+        "`X-Next-Cursor` response header holds a cursor for the next page, which keeps "
+        "reading the same catalog snapshot even if the stores are re-crawled meanwhile. "
+        "The ETag changes only when a store is re-crawled, so re-polling with "
+        "`If-None-Match` returns `304 Not Modified` until then."
+    ),
+    responses={304: {"description": "The page has not changed"}},
 )
 async def get_discounted_products(
     store: Optional[str] = Query(
@@ -28,57 +66,347 @@ async def get_discounted_products(
     min_discount: Optional[float] = Query(
         None, ge=0, le=100, description="Filter by minimum discount percentage (0-100%)"
     ),
+    sort: Optional[Literal["discount_percent", "price", "name"]] = Query(
+        None,
+        description="Sort by discount (highest first), price (lowest first) or name",
+    ),
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(10, ge=1, le=100, description="Number of items per page"),
-) -> List[Product]:
+    cursor: Optional[str] = Query(
+        None,
+        description="Cursor from a previous X-Next-Cursor header; replaces page and the filters",
+    ),
+    if_none_match: Optional[str] = Header(None),
+) -> Response:
     """
     Get discounted products with filtering and pagination support.
     - store: Optional filter by store (zara, amazon, etc.)
     - category: Optional filter by category (shirts, jackets, etc.)
     - min_discount: Optional filter by minimum discount percentage
+    - sort: Optional sort order (discount_percent, price, name)
     - page: The page of results to return
     - page_size: The number of results per page
-    """
-    all_products: List[Product] = []
+    - cursor: Continue from a previous page at the same snapshot versions
 
-    start_index = (page - 1) * page_size
+    Pages are rendered to JSON once per snapshot version and served from the
+    in-process cache as raw bytes, without validating them again.
+    """
+    pinned = None
+    if cursor:
+        try:
+            position = decode_cursor(cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        store, category, min_discount, sort = (
+            position.store,
+            position.category,
+            position.min_discount,
+            position.sort,
+        )
+        pinned = position.versions
+        start_index = position.offset
+    else:
+        start_index = (page - 1) * page_size
     end_index = start_index + page_size
 
+    selected_stores = _select_stores(store)
+    store = store.lower() if store else None
+    key = PageKey.of(
+        [s.name for s in selected_stores], category, min_discount, sort, start_index, end_index
+    )
+
     try:
-        scrape_tasks = []
-        store_mapping = {
-            "zara": scrape_zara_discounted_products,
-            "amazon": scrape_amazon_discounted_products,
-            "mango": scrape_mango_discounted_products,
-        }
-
-        if store:
-            store = store.lower()
-            if store in store_mapping:
-                scrape_tasks.append(store_mapping[store]())
+        versions = await _resolve_versions(selected_stores, pinned)
+        etag = page_etag(key, versions)
+        headers = {"ETag": etag, "Cache-Control": f"max-age={RESPONSE_CACHE_MAX_AGE}"}
+        if if_none_match and _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+
+        try:
+            rendered = await _render_page(key, versions)
+        except SnapshotChangedError:
+            # A new snapshot was published mid-read; answer from the new one.
+            versions = await _resolve_versions(selected_stores, pinned)
+            headers["ETag"] = page_etag(key, versions)
+            rendered = await _render_page(key, versions)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing the request for discounted products: {e}")
+        raise HTTPException(status_code=500, detail="Could not load discounted products")
+
+    headers["X-Total-Count"] = str(rendered.total)
+    if end_index < rendered.total:
+        headers["X-Next-Cursor"] = encode_cursor(
+            Cursor(versions, store, category, min_discount, sort, end_index)
+        )
+    return Response(rendered.body, media_type="application/json", headers=headers)
+
+
+@router.get(
+    "/discounted-products/export",
+    summary="Export the whole filtered catalog",
+    description=(
+        "Streams every product matching the filters as NDJSON (one JSON object per line) "
+        "or CSV. The ETag identifies the snapshot versions and filters the export was "
+        "built from, so re-polling with `If-None-Match` returns `304 Not Modified` "
+        "until a store is re-crawled."
+    ),
+    response_class=StreamingResponse,
+    responses={304: {"description": "The catalog has not changed"}},
+)
+async def export_discounted_products(
+    store: Optional[str] = Query(
+        None, description="Filter by store (e.g., 'zara', 'amazon', 'mango')"
+    ),
+    category: Optional[str] = Query(
+        None, description="Filter by clothing category (e.g., 'shirt', 'jacket')"
+    ),
+    min_discount: Optional[float] = Query(
+        None, ge=0, le=100, description="Filter by minimum discount percentage (0-100%)"
+    ),
+    sort: Optional[Literal["discount_percent", "price", "name"]] = Query(
+        None,
+        description="Sort by discount (highest first), price (lowest first) or name",
+    ),
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="Export format"),
+    if_none_match: Optional[str] = Header(None),
+) -> Response:
+    """
+    Stream the filtered catalog straight from the cached snapshots.
+
+    Rows are decoded EXPORT_BATCH_SIZE at a time, so memory use does not
+    grow with the size of the catalog.
+    """
+    stores = _select_stores(store)
+    store = store.lower() if store else None
+    await _sync_stores(stores)
+
+    names = [s.name for s in stores]
+    versions = product_index.versions(names)
+    snapshots = {name: product_index.snapshot(name) for name in versions}
+    total, matches = product_index.query(names, category, min_discount, sort=sort)
+
+    etag = _export_etag(versions, store, category, min_discount, sort, format)
+    headers = {
+        "ETag": etag,
+        "X-Total-Count": str(total),
+        "X-Catalog-Version": str(max(versions.values(), default=0)),
+    }
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    if format == "csv":
+        headers["Content-Disposition"] = 'attachment; filename="discounted-products.csv"'
+    return StreamingResponse(
+        _export_lines(matches, snapshots, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers=headers,
+    )
+
+
+@router.get(
+    "/discounted-products/changes",
+    response_model=List[ProductChanges],
+    summary="Get product changes since a snapshot version",
+    description=(
+        "Returns the products added, changed and removed by every crawl published after "
+        "`since`, oldest first. Start from the `X-Catalog-Version` of an export and pass "
+        "the `X-Catalog-Version` of each response as the next `since`. `410 Gone` means "
+        "the changes are no longer retained and the catalog has to be exported again."
+    ),
+)
+async def get_product_changes(
+    response: Response,
+    since: int = Query(..., ge=0, description="Snapshot version already seen"),
+    store: Optional[str] = Query(
+        None, description="Filter by store (e.g., 'zara', 'amazon', 'mango')"
+    ),
+) -> List[ProductChanges]:
+    stores = _select_stores(store)
+    feeds = await asyncio.gather(*[read_changes(s.cache_key, since) for s in stores])
+
+    changes = []
+    for s, feed in zip(stores, feeds):
+        if feed is None:
+            raise HTTPException(
+                status_code=410,
+                detail=f"Changes to {s.name} since {since} are no longer retained",
+            )
+        changes.extend(ProductChanges(store=s.name, **entry) for entry in feed)
+    changes.sort(key=lambda c: c.version)
+
+    response.headers["X-Catalog-Version"] = str(
+        max([since] + [c.version for c in changes])
+    )
+    return changes
+
+
+def _select_stores(store: Optional[str]) -> List[Store]:
+    if not store:
+        return list(store_mapping.values())
+    selected = store_mapping.get(store.lower())
+    return [selected] if selected is not None else []
+
+
+async def _sync_stores(stores: List[Store]):
+    """Bring the product index up to date with the stores' current snapshots."""
+    if API_READ_ONLY:
+        # With the crawl scheduler running, the API only reads published
+        # snapshots and never starts a crawl itself.
+        await sync_index(product_index, {s.name: s.cache_key for s in stores})
+        return
+
+    results = await get_or_refresh_many([(s.cache_key, s.refresh) for s in stores])
+    for s, result in zip(stores, results):
+        if isinstance(result, Exception):
+            logger.error(f"Scraping error: {result}")
+            continue
+        product_index.update(s.name, result)
+
+
+async def _load_rows(name: str, snapshot: Snapshot, rows: List[int]) -> List[Dict[str, Any]]:
+    """
+    Decode rows of a store snapshot, current or superseded.
+
+    A snapshot that was current when the query started may be replaced
+    while its rows are read; its retained versioned copy is read instead.
+    """
+    key = store_mapping[name].cache_key
+    if product_index.version(name) == snapshot.version:
+        try:
+            return await load_records(key, snapshot, rows)
+        except SnapshotChangedError:
+            pass
+    return await load_records(version_key(key, snapshot.version), snapshot, rows)
+
+
+async def _load_page(
+    matches: List[Match], snapshots: Dict[str, Snapshot]
+) -> List[Dict[str, Any]]:
+    """Decode the records of some matches, in order, with one read per store."""
+    wanted: Dict[str, List[int]] = {}
+    for name, index in matches:
+        wanted.setdefault(name, []).append(index)
+
+    loaded = await asyncio.gather(
+        *[_load_rows(name, snapshots[name], rows) for name, rows in wanted.items()]
+    )
+    records = {
+        (name, index): record
+        for name, store_records in zip(wanted, loaded)
+        for index, record in zip(wanted[name], store_records)
+    }
+    return [records[match] for match in matches]
+
+
+def _export_etag(versions: Dict[str, int], *params: Any) -> str:
+    digest = hashlib.sha1(
+        json.dumps([sorted(versions.items()), *params]).encode("utf-8")
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in [tag.removeprefix("W/") for tag in candidates]
+
+
+async def _export_lines(
+    matches: List[Match], snapshots: Dict[str, Snapshot], format: str
+) -> AsyncIterator[str]:
+    if format == "csv":
+        yield _csv_line(FIELDS)
+
+    for start in range(0, len(matches), EXPORT_BATCH_SIZE):
+        try:
+            records = await _load_page(
+                matches[start : start + EXPORT_BATCH_SIZE], snapshots
+            )
+        except Exception as e:
+            # Headers are already sent, so the export can only end early.
+            logger.error(f"Export stopped after {start} products: {e}")
+            return
+
+        if format == "csv":
+            yield "".join(_csv_line([r[field] for field in FIELDS]) for r in records)
         else:
-            scrape_tasks = [scraper() for scraper in store_mapping.values()]
+            yield "".join(
+                json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n"
+                for r in records
+            )
+
 
-        results = await asyncio.gather(*scrape_tasks, return_exceptions=True)
+def _csv_line(values: List[Any]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
 
-        for result in results:
-            if isinstance(result, Exception):
-                logger.error(f"Scraping error: {result}")
-                continue
-            all_products.extend(result)
 
-        if category:
-            category = category.lower()
-            all_products = [p for p in all_products if p.category.lower() == category]
+async def _resolve_versions(
+    stores: List[Store], versions: Optional[Dict[str, int]] = None
+) -> Dict[str, int]:
+    """
+    Return the snapshot versions a page is read from: the current ones, or
+    those of a cursor, which are loaded into the index if needed.
+    """
+    if versions is None:
+        await _sync_stores(stores)
+        return product_index.versions([s.name for s in stores])
 
-        if min_discount is not None:
-            all_products = [
-                p for p in all_products if p.discount_percent >= min_discount
-            ]
+    for s in stores:
+        if s.name in versions and not await load_version(
+            product_index, s.name, s.cache_key, versions[s.name]
+        ):
+            raise HTTPException(status_code=410, detail="Cursor has expired")
+    return versions
 
-        return all_products[start_index:end_index]
 
-    except Exception as e:
-        logger.error(f"Error processing the request for discounted products: {e}")
+async def _render_page(key: PageKey, versions: Dict[str, int]) -> CachedPage:
+    """
+    Answer a query from the in-memory product index and render only one page.
+
+    Rendered pages are cached by query and snapshot versions, so a page is
+    decoded and encoded once per crawl however often it is requested.
+    """
+    cached = page_cache.get(key, versions)
+    if cached is not None:
+        return cached
+
+    total, matches = product_index.query(
+        list(key.stores), key.category, key.min_discount, key.start, key.end, key.sort, versions
+    )
+    snapshots = {name: product_index.snapshot(name, v) for name, v in versions.items()}
+    rendered = CachedPage(encode_records(await _load_page(matches, snapshots)), total)
+    page_cache.put(key, versions, rendered)
+    return rendered
+
+
+def _precompute_pages(cache_key: str, version: int) -> None:
+    """Render the most requested first pages of a store as soon as it is republished."""
+    names = [s.name for s in store_mapping.values() if s.cache_key == cache_key]
+    keys = {key for name in names for key in page_cache.popular(name)}
+    if keys:
+        task = asyncio.create_task(_render_pages(keys))
+        _precomputing.add(task)
+        task.add_done_callback(_precomputing.discard)
+
+
+async def _render_pages(keys: Set[PageKey]):
+    """
+    Render pages from the published snapshots only: this runs on a pub/sub
+    message, which must never start a crawl even where the API may crawl.
+    """
+    for key in keys:
+        stores = [store_mapping[name] for name in key.stores if name in store_mapping]
+        try:
+            await sync_index(product_index, {s.name: s.cache_key for s in stores})
+            versions = product_index.versions([s.name for s in stores])
+            await _render_page(key, versions)
+        except Exception as e:
+            logger.warning(f"Could not precompute page {key}: {e}")
+
 
-    return all_products[start_index:end_index]
+_precomputing: Set["asyncio.Task[None]"] = set()
+snapshot_versions.listeners.append(_precompute_pages)
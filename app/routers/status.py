@@ -0,0 +1,55 @@
+from typing import Dict
+
+from fastapi import APIRouter, HTTPException
+
+from app.services.crawl_queue import queue_status
+from app.services.driver_pool import get_driver_pool
+from app.services.local_cache import local_cache, snapshot_versions
+from app.services.rendering import render_stats
+
+router = APIRouter()
+
+
+@router.get(
+    "/status/driver-pool",
+    summary="Get WebDriver pool statistics",
+    description="Returns the size, occupancy and lease wait times of the shared WebDriver pool.",
+)
+async def get_driver_pool_stats() -> Dict[str, float]:
+    return get_driver_pool().stats()
+
+
+@router.get(
+    "/status/rendering",
+    summary="Get browser rendering statistics",
+    description=(
+        "Returns, per store, how many pages were rendered in a browser, how long they "
+        "took and how many bytes they transferred."
+    ),
+)
+async def get_rendering_stats() -> Dict[str, Dict[str, float]]:
+    return render_stats.snapshot()
+
+
+@router.get(
+    "/status/crawl-queue",
+    summary="Get distributed crawl queue statistics",
+    description="Returns how many crawl jobs are pending, leased by a worker and dead-lettered.",
+)
+async def get_crawl_queue_stats() -> Dict[str, int]:
+    stats = await queue_status()
+    if stats is None:
+        raise HTTPException(status_code=503, detail="Crawl queue unavailable")
+    return stats
+
+
+@router.get(
+    "/status/local-cache",
+    summary="Get in-process cache statistics",
+    description=(
+        "Returns the size of this process's snapshot cache and whether it is "
+        "subscribed to snapshot publishes."
+    ),
+)
+async def get_local_cache_stats() -> Dict[str, int]:
+    return {**local_cache.stats(), "listening": int(snapshot_versions.listening)}
@@ -1,194 +1,275 @@
-import json
 import os
-import time
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+from bs4 import BeautifulSoup
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
 from app.models.product import Product
-from app.services.redis_cache import get_cache, set_cache
+from app.services.categories import categorise
+from app.services.driver_pool import get_driver_pool
+from app.services.extraction import (
+    HTML_PARSER,
+    ExtractionSpec,
+    FieldSelector,
+    Record,
+    build_products,
+    capture_page,
+    extract_records,
+    parse_records,
+    require,
+)
+from app.services.fetchers import fetch_with_fallback
+from app.services.pricing import currency_of, discount_percent, parse_price
+from app.services.rendering import render_session
+from app.services.stores import ScraperPlugin
 from app.utils.logger import logger
+from app.utils.metrics import crawl_stage
 
 AMAZON_MEN_SALE_URL = os.environ.get('AMAZON_MEN_SALE_URL')
-CACHE_KEY = os.environ.get("AMAZON_CACHE_KEY")
-SELENIUM_URL = os.environ.get("SELENIUM_URL")
 
+AMAZON_MAX_PAGES = int(os.environ.get("AMAZON_MAX_PAGES", "5"))
+AMAZON_MAX_ITEMS = int(os.environ.get("AMAZON_MAX_ITEMS", "0"))
+AMAZON_PAGE_CONCURRENCY = int(os.environ.get("AMAZON_PAGE_CONCURRENCY", "3"))
+AMAZON_PAGE_TIMEOUT = float(os.environ.get("AMAZON_PAGE_TIMEOUT", "10"))
 
-def initialize_driver() -> webdriver.Chrome:
-    """Initialize the Selenium WebDriver with Chrome options."""
-    options = Options()
-    # options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-gpu")
-    options.add_argument('--disable-extensions')
-    options.add_argument('--blink-settings=imagesEnabled=false')
+# Results up to this data-index are widgets and banners, not products.
+LEADING_SLOTS = 5
 
-    if os.environ.get("USE_REMOTE_DRIVER", "false").lower() == "true":
-        driver = webdriver.Remote(
-            command_executor=SELENIUM_URL,
-            options=options,
-        )
-    else:
-        driver = webdriver.Chrome(options=options)
+# A page is ready once the results grid holds at least one result.
+RESULTS_READY_SELECTOR = ".s-main-slot div[data-asin]"
 
-    logger.info("Selenium WebDriver initialized")
-    return driver
+PRODUCT_SPEC = ExtractionSpec(
+    item_selector="div[data-asin]",
+    fields={
+        "index": FieldSelector("", "data-index"),
+        "title": FieldSelector(".s-title-instructions-style"),
+        "name": FieldSelector(".s-title-instructions-style span"),
+        "url": FieldSelector(".a-link-normal", "href"),
+        "image_url": FieldSelector(".s-image", "src"),
+        "price_whole": FieldSelector(".a-price-whole"),
+        "price_fraction": FieldSelector(".a-price-fraction"),
+        # The strike price is rendered twice, for screen readers and on
+        # screen; the text of both together does not parse as a price.
+        "original_prices": FieldSelector(".a-text-price .a-offscreen", many=True),
+        "price_symbols": FieldSelector(".a-price-symbol", many=True),
+    },
+)
 
+PAGINATION_SPEC = ExtractionSpec(
+    item_selector=".s-pagination-item",
+    fields={"label": FieldSelector("")},
+)
 
-async def scrape_amazon_discounted_products() -> List[Product]:
+
+def crawl_amazon_discounted_products() -> List[Product]:
     """
-    Scrape Amazon discounted men's clothing products using Selenium.
-
-    Returns:
-        List[Product]: A list of Product objects with attributes:
-            - name: str
-            - original_price: str
-            - discounted_price: str
-            - discount_percent: float
-            - purchase_url: str
-            - image_url: str
-            - store: str
-            - category: str
+    Crawl Amazon's sale results with Selenium, several pages at a time.
+
+    The first page is loaded to learn how many result pages there are; the
+    remaining pages, up to AMAZON_MAX_PAGES, are then loaded concurrently
+    on separate pooled sessions. Crawling stops early once AMAZON_MAX_ITEMS
+    products have been collected.
+
+    This call blocks for the whole crawl, so it must be run through
+    `run_scraper` rather than directly on the event loop.
     """
-    products = []
-    driver = None
+    products: List[Product] = []
+    seen = set()
 
-    cached = await get_cache(CACHE_KEY)
-    if cached:
-        return [Product(**p) for p in json.loads(cached)]
+    def collect(page_products: List[Product]) -> bool:
+        for product in page_products:
+            if product.purchase_url in seen:
+                continue
+            seen.add(product.purchase_url)
+            products.append(product)
+            if AMAZON_MAX_ITEMS and len(products) >= AMAZON_MAX_ITEMS:
+                return False
+        return True
 
     try:
-        driver = initialize_driver()
-        page = 1
-        driver.get(AMAZON_MEN_SALE_URL)
+        first_page, page_count = crawl_amazon_page(1)
+        if not collect(first_page):
+            return products
 
-        while len(products) == 0 and page <= 3:
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_all_elements_located((By.CLASS_NAME, "s-main-slot"))
-            )
-
-            items = driver.find_elements(By.CSS_SELECTOR, "div[data-asin]")
+        pages = range(2, min(page_count, AMAZON_MAX_PAGES) + 1)
+        if not pages:
+            return products
 
-            for item in items:
+        with ThreadPoolExecutor(
+            max_workers=AMAZON_PAGE_CONCURRENCY, thread_name_prefix="amazon-page"
+        ) as pool:
+            futures = [pool.submit(crawl_amazon_page, page) for page in pages]
+            # Pages are collected in order so the result is deterministic.
+            for page, future in zip(pages, futures):
                 try:
-                    if (
-                        item.get_attribute("data-index")
-                        and item.get_attribute("data-index") <= "5"
-                    ) or (
-                        not item.find_elements(
-                            By.CLASS_NAME, "s-title-instructions-style"
-                        )
-                        or item.find_elements(
-                            By.CLASS_NAME, "s-title-instructions-style"
-                        )[0].text.strip()
-                        == ""
-                    ):
-                        continue
-
-                    name = (
-                        item.find_element(By.CLASS_NAME, "s-title-instructions-style")
-                        .find_element(By.TAG_NAME, "span")
-                        .text.strip()
-                    )
-
-                    url = item.find_element(
-                        By.CLASS_NAME, 'a-link-normal'
-                    ).get_attribute('href')
-                    image_url = item.find_element(
-                        By.CLASS_NAME, "s-image"
-                    ).get_attribute("src")
-
-                    discounted_price_whole = item.find_element(
-                        By.CLASS_NAME, "a-price-whole"
-                    ).text.strip()
-
-                    discounted_price_fraction = item.find_element(
-                        By.CLASS_NAME, "a-price-fraction"
-                    ).text.strip()
-
-                    original_price_el = item.find_elements(
-                        By.CLASS_NAME, "a-text-price"
-                    )
-                    discounted_price = (
-                        discounted_price_whole + "." + discounted_price_fraction
-                    )
-
-                    price_symbol = (
-                        item.find_elements(By.CLASS_NAME, "a-price-symbol")[
-                            -1
-                        ].text.strip()
-                        if item.find_elements(By.CLASS_NAME, "a-price-symbol")
-                        else "$"
-                    )
-
-                    original_price = (
-                        original_price_el[-1].text.strip().replace(price_symbol, "")
-                        if original_price_el and original_price_el[-1].text.strip()
-                        else 0
-                    )
-
-                    if original_price == 0:
-                        continue
-
-                    orig = float(original_price)
-                    disc = float(discounted_price)
-                    discount_percent = round((orig - disc) / orig * 100, 2)
-
-                    if discount_percent <= 0:
-                        continue
-
-                    products.append(
-                        Product(
-                            name=name,
-                            original_price=f"{price_symbol}{original_price}",
-                            discounted_price=f"{price_symbol}{discounted_price}",
-                            discount_percent=discount_percent,
-                            purchase_url=url,
-                            image_url=image_url,
-                            store="amazon",
-                            category=guess_category_from_name(name),
-                        )
-                    )
+                    page_products, _ = future.result()
                 except Exception as e:
-                    logger.error(f"Error processing Amazon product: {e}")
+                    logger.error(f"Error scraping Amazon page {page}: {e}")
                     continue
-
-            page += 1
-            if driver.find_elements(By.CLASS_NAME, "s-pagination-next"):
-                driver.find_elements(By.CLASS_NAME, "s-pagination-next")[0].click()
-            time.sleep(2)
+                if not collect(page_products):
+                    for pending in futures:
+                        pending.cancel()
+                    break
 
     except Exception as e:
         logger.error(f"Error scraping Amazon products: {e}")
-    finally:
-        if driver:
-            try:
-                driver.quit()
-            except Exception as e:
-                logger.error(f"Error quitting the driver: {e}")
-
-    await set_cache(CACHE_KEY, [p.dict() for p in products])
+
     return products
 
 
-def guess_category_from_name(name: str) -> str:
-    """Guess product category based on product name."""
-    name_lower = name.lower()
-    if "jacket" in name_lower:
-        return "jacket"
-    if "shirt" in name_lower or "tee" in name_lower:
-        return "shirt"
-    if "pants" in name_lower or "trouser" in name_lower:
-        return "pants"
-    if "hoodie" in name_lower:
-        return "hoodie"
-    if "socks" in name_lower:
-        return "socks"
-    if "shorts" in name_lower:
-        return "shorts"
-    return "other"
+def crawl_amazon_pages(first_page: int, last_page: int) -> Tuple[List[Product], int]:
+    """
+    Crawl a range of result pages concurrently, for crawls split into jobs.
+
+    Unlike a whole-store crawl, any page that fails fails the range, so the
+    job can be retried. Returns the products in page order and the number
+    of result pages to crawl, capped at AMAZON_MAX_PAGES.
+    """
+    pages = range(first_page, last_page + 1)
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(AMAZON_PAGE_CONCURRENCY, len(pages))),
+        thread_name_prefix="amazon-page",
+    ) as pool:
+        results = list(pool.map(crawl_amazon_page, pages))
+
+    products = [product for page_products, _ in results for product in page_products]
+    page_count = max((count for _, count in results), default=last_page)
+    return products, min(page_count, AMAZON_MAX_PAGES)
+
+
+def crawl_amazon_page(page: int) -> Tuple[List[Product], int]:
+    """
+    Load one result page and extract its products, over plain HTTP when the
+    page validates and on a pooled browser session otherwise.
+
+    Returns the page's products and the number of result pages the
+    pagination bar advertises.
+    """
+    url = page_url(AMAZON_MEN_SALE_URL, page)
+    products, page_count = fetch_with_fallback(
+        "amazon",
+        url,
+        lambda html: parse_amazon_page(html, url),
+        lambda: render_amazon_page(url),
+        valid=lambda result: bool(result[0]),
+    )
+    return products, max(page, page_count)
+
+
+def parse_amazon_page(
+    html: str, base_url: Optional[str] = None
+) -> Tuple[List[Product], int]:
+    """Parse a result page's HTML into its products and advertised page count."""
+    soup = BeautifulSoup(html, HTML_PARSER)
+    records = parse_records(soup, PRODUCT_SPEC, base_url or AMAZON_MEN_SALE_URL)
+    labels = [r["label"] for r in parse_records(soup, PAGINATION_SPEC)]
+    return (
+        build_products(records, product_from_record, "amazon"),
+        last_page_number(labels),
+    )
+
+
+def parse_amazon_products(html: str, base_url: Optional[str] = None) -> List[Product]:
+    """Parse a result page's HTML into its products."""
+    return parse_amazon_page(html, base_url)[0]
+
+
+def render_amazon_page(url: str) -> Tuple[List[Product], int]:
+    """Load a result page in a pooled browser session and extract it."""
+    with get_driver_pool().lease("amazon") as driver, render_session(driver, "amazon"):
+        with crawl_stage("amazon", "navigation"):
+            driver.get(url)
+        with crawl_stage("amazon", "wait"):
+            WebDriverWait(driver, AMAZON_PAGE_TIMEOUT).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, RESULTS_READY_SELECTOR))
+            )
+
+        capture_page(driver, "amazon")
+        with crawl_stage("amazon", "extraction"):
+            products = build_products(
+                extract_records(driver, PRODUCT_SPEC), product_from_record, "amazon"
+            )
+            labels = [r["label"] for r in extract_records(driver, PAGINATION_SPEC)]
+
+    return products, last_page_number(labels)
+
+
+def page_url(url: str, page: int) -> str:
+    """Return the URL of a given result page of an Amazon search URL."""
+    if page <= 1:
+        return url
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "page"]
+    query.append(("page", str(page)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def last_page_number(labels: List[str]) -> int:
+    """Return the highest page number among pagination labels, or 1."""
+    numbers = [int(label) for label in (l.strip() for l in labels) if label.isdigit()]
+    return max(numbers, default=1)
+
+
+def is_leading_slot(index: Optional[str]) -> bool:
+    """Whether a result's data-index is one of the page's leading widget slots."""
+    try:
+        return int(index) <= LEADING_SLOTS
+    except (TypeError, ValueError):
+        return False
+
+
+def product_from_record(record: Record, category: Optional[str] = None) -> Optional[Product]:
+    """
+    Build a Product from a record extracted with PRODUCT_SPEC, categorising
+    its name unless build_products already has.
+    """
+    if is_leading_slot(record.get("index")) or not record.get("title"):
+        return None
+
+    name = require(record, "name")
+    url = require(record, "url")
+    image_url = require(record, "image_url")
+
+    price_symbols = record.get("price_symbols") or []
+    price_symbol = price_symbols[-1] if price_symbols else "$"
+    currency = currency_of(price_symbol) or "USD"
+
+    whole = require(record, "price_whole").rstrip(".,")
+    discounted_price = whole + "." + require(record, "price_fraction")
+
+    original_prices = record.get("original_prices") or []
+    if not original_prices or not original_prices[-1]:
+        return None
+    original_price = original_prices[-1].replace(price_symbol, "")
+
+    original = parse_price(original_price, currency)
+    discounted = parse_price(discounted_price, currency)
+    discount = discount_percent(original, discounted)
+
+    if discount <= 0:
+        return None
+
+    return Product(
+        name=name,
+        original_price=f"{price_symbol}{original_price}",
+        discounted_price=f"{price_symbol}{discounted_price}",
+        discount_percent=discount,
+        purchase_url=url,
+        image_url=image_url,
+        store="amazon",
+        category=category or categorise(name),
+        currency=currency,
+        original_price_minor=original.minor,
+        discounted_price_minor=discounted.minor,
+    )
+
+
+PLUGIN = ScraperPlugin(
+    crawl=crawl_amazon_discounted_products,
+    parse=parse_amazon_products,
+    crawl_pages=crawl_amazon_pages,
+)
@@ -0,0 +1,159 @@
+import functools
+import json
+import os
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from app.utils.logger import logger
+
+# Categories in priority order: a name matching several is given the first,
+# so a "shirt jacket" is a jacket. Keywords match whole words, optionally
+# with an English plural ending, so "shirt" matches "shirts" and "t-shirt"
+# but neither "sweatshirt" nor "shirtdress", and "mont" does not match
+# "Montana". Other inflections are listed as keywords of their own.
+CATEGORY_KEYWORDS: Dict[str, Sequence[str]] = {
+    "jacket": ("jacket", "blazer", "bomber", "ceket", "ceketi"),
+    "coat": ("coat", "overcoat", "parka", "trench", "mont", "montu", "kaban", "kabanı"),
+    "hoodie": ("hoodie", "sweatshirt", "kapüşonlu"),
+    "shirt": ("shirt", "overshirt", "tee", "polo", "gömlek", "gömleği", "tişört", "tişörtü"),
+    "pants": ("pants", "trouser", "chino", "jean", "jogger", "pantolon", "pantolonu"),
+    "shorts": ("shorts", "şort", "şortu"),
+    "socks": ("sock", "çorap", "çorabı"),
+}
+# English plural endings accepted after any keyword.
+PLURAL_ENDING = "(?:e?s)?"
+# A JSON file of {"category": ["keyword", ...]} adding keywords to the
+# built-in categories, or new categories after them.
+CATEGORY_KEYWORDS_PATH = os.environ.get("CATEGORY_KEYWORDS_PATH")
+CATEGORY_CACHE_SIZE = int(os.environ.get("CATEGORY_CACHE_SIZE", "65536"))
+
+DEFAULT_CATEGORY = "other"
+
+# casefold() turns the Turkish "İ" into "i" and a combining dot, so upper
+# case names would not match; "ı" is folded too, so "KABANI" matches "kabanı".
+TURKISH_I = str.maketrans({"İ": "i", "ı": "i"})
+
+
+def normalise(text: str) -> str:
+    """Fold case, compatibility characters, the Turkish i and whitespace."""
+    return " ".join(
+        unicodedata.normalize("NFKC", text).translate(TURKISH_I).casefold().split()
+    )
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Return a regex matching any of `words`, factored by common prefixes.
+
+    Each position of the text is then matched against the keywords in one
+    pass down the trie, not once per keyword, so adding keywords hardly
+    changes the cost of a lookup.
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node: Dict[str, dict]) -> str:
+        branches = [
+            re.escape(char) + emit(child) for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        group = f"(?:{'|'.join(branches)})"
+        # Greedy, so the longest keyword wins.
+        return f"{group}?" if "" in node else group
+
+    return emit(trie)
+
+
+class Categoriser:
+    """
+    Maps product names to categories with a keyword table compiled into a
+    single regex. Results are memoised by normalised name.
+    """
+
+    def __init__(
+        self,
+        keywords: Dict[str, Sequence[str]],
+        default: str = DEFAULT_CATEGORY,
+        cache_size: int = CATEGORY_CACHE_SIZE,
+    ) -> None:
+        self.default = default
+        self._categories: Dict[str, str] = {}
+        self._priority: Dict[str, int] = {}
+        for category, words in keywords.items():
+            self._priority.setdefault(category, len(self._priority))
+            for word in words:
+                self._categories.setdefault(normalise(word), category)
+
+        self._pattern: Optional[re.Pattern] = None
+        if self._categories:
+            self._pattern = re.compile(
+                rf"(?<!\w)({_trie_pattern(self._categories)}){PLURAL_ENDING}(?!\w)"
+            )
+        self._lookup = functools.lru_cache(maxsize=cache_size)(self._match)
+
+    @property
+    def categories(self) -> List[str]:
+        return list(self._priority)
+
+    def categorise(self, name: str) -> str:
+        """Return the category of a product name, or the default category."""
+        return self._lookup(normalise(name))
+
+    def categorise_many(self, names: Iterable[str]) -> List[str]:
+        """Return the category of each of a page of product names."""
+        seen: Dict[str, str] = {}
+        categories = []
+        for name in names:
+            category = seen.get(name)
+            if category is None:
+                category = seen[name] = self.categorise(name)
+            categories.append(category)
+        return categories
+
+    def _match(self, name: str) -> str:
+        if self._pattern is None:
+            return self.default
+        best = None
+        for match in self._pattern.finditer(name):
+            category = self._categories[match.group(1)]
+            if best is None or self._priority[category] < self._priority[best]:
+                best = category
+                if self._priority[best] == 0:
+                    break
+        return best or self.default
+
+
+def _load_keywords(path: Optional[str]) -> Dict[str, Sequence[str]]:
+    keywords = {category: list(words) for category, words in CATEGORY_KEYWORDS.items()}
+    if not path:
+        return keywords
+    try:
+        with open(path, encoding="utf-8") as f:
+            extra = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Ignoring category keywords from {path}: {e}")
+        return keywords
+    for category, words in extra.items():
+        keywords.setdefault(category, []).extend(words)
+    return keywords
+
+
+categoriser = Categoriser(_load_keywords(CATEGORY_KEYWORDS_PATH))
+
+
+def categorise(name: str) -> str:
+    """Return the category of a product name with the shared categoriser."""
+    return categoriser.categorise(name)
+
+
+def categorise_many(names: Iterable[str]) -> List[str]:
+    """Return the categories of a page of product names with the shared categoriser."""
+    return categoriser.categorise_many(names)
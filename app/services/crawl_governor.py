@@ -0,0 +1,255 @@
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, NamedTuple, TypeVar
+
+from app.services import redis_cache
+from app.utils.logger import logger
+from app.utils.metrics import (
+    CRAWL_CONCURRENCY_LIMIT,
+    CRAWL_GOVERNOR_WAIT_SECONDS,
+    CRAWL_REQUESTS,
+)
+
+# "redis" shares each store's limits between every process crawling it,
+# "local" keeps them per process and "off" lets every page load through.
+CRAWL_GOVERNOR = os.environ.get("CRAWL_GOVERNOR", "redis").lower()
+# Sustained page loads per second per store (0: unlimited), and how many
+# may be sent back to back after a quiet spell. Every setting below is
+# overridable per store, e.g. `AMAZON_CRAWL_RATE`.
+CRAWL_RATE = float(os.environ.get("CRAWL_RATE", "1"))
+CRAWL_BURST = float(os.environ.get("CRAWL_BURST", "5"))
+# Bounds of the adaptive limit of concurrent page loads per store.
+CRAWL_MIN_CONCURRENCY = int(os.environ.get("CRAWL_MIN_CONCURRENCY", "1"))
+CRAWL_MAX_CONCURRENCY = int(os.environ.get("CRAWL_MAX_CONCURRENCY", "8"))
+# Page loads slower than this count as congestion and shrink the limit.
+CRAWL_TARGET_LATENCY = float(os.environ.get("CRAWL_TARGET_LATENCY", "10"))
+# How long a store is left alone after refusing a page load.
+CRAWL_BLOCK_COOLDOWN = float(os.environ.get("CRAWL_BLOCK_COOLDOWN", "30"))
+# How long a page load may wait to be let through before giving up.
+CRAWL_GOVERNOR_MAX_WAIT = float(os.environ.get("CRAWL_GOVERNOR_MAX_WAIT", "60"))
+# Slots still held after this long (e.g. by a worker that died) are reclaimed.
+CRAWL_SLOT_TTL = float(os.environ.get("CRAWL_SLOT_TTL", "300"))
+# How long shared state outlives a store's last page load.
+CRAWL_GOVERNOR_STATE_TTL = int(os.environ.get("CRAWL_GOVERNOR_STATE_TTL", "86400"))
+
+# How often a page load waiting for a concurrency slot checks again.
+SLOT_POLL_INTERVAL = 0.25
+
+# Responses that mean the store is refusing us rather than failing.
+BLOCK_STATUSES = (403, 429, 503)
+# Bot-check pages served with a 200 are small and say so; listings are not.
+BLOCK_MARKERS = ("captcha", "are you a robot", "unusual traffic", "access denied")
+BLOCK_PAGE_MAX_CHARS = 64 * 1024
+
+T = TypeVar("T")
+
+
+class CrawlThrottled(Exception):
+    """Raised when a page load waited longer than allowed to be let through."""
+
+
+class StoreLimits(NamedTuple):
+    rate: float
+    burst: float
+    min_concurrency: int
+    max_concurrency: int
+    target_latency: float
+    block_cooldown: float
+
+
+def _setting(store: str, name: str, default: float) -> float:
+    value = os.environ.get(f"{store.upper()}_{name}")
+    return float(value) if value else default
+
+
+def store_limits(store: str) -> StoreLimits:
+    min_concurrency = max(1, int(_setting(store, "CRAWL_MIN_CONCURRENCY", CRAWL_MIN_CONCURRENCY)))
+    return StoreLimits(
+        rate=_setting(store, "CRAWL_RATE", CRAWL_RATE),
+        burst=max(1.0, _setting(store, "CRAWL_BURST", CRAWL_BURST)),
+        min_concurrency=min_concurrency,
+        max_concurrency=max(
+            min_concurrency, int(_setting(store, "CRAWL_MAX_CONCURRENCY", CRAWL_MAX_CONCURRENCY))
+        ),
+        target_latency=_setting(store, "CRAWL_TARGET_LATENCY", CRAWL_TARGET_LATENCY),
+        block_cooldown=_setting(store, "CRAWL_BLOCK_COOLDOWN", CRAWL_BLOCK_COOLDOWN),
+    )
+
+
+def is_block(error: BaseException) -> bool:
+    """Whether a failed request was refused by the store (rate limited, forbidden)."""
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) in BLOCK_STATUSES
+
+
+def looks_blocked(html: str) -> bool:
+    """Whether a page is a bot check rather than the page asked for."""
+    if len(html) > BLOCK_PAGE_MAX_CHARS:
+        return False
+    text = html.lower()
+    return any(marker in text for marker in BLOCK_MARKERS)
+
+
+def _limit(state: Dict[str, Any], limits: StoreLimits) -> float:
+    limit = state.get("limit", float(limits.min_concurrency))
+    return min(max(limit, limits.min_concurrency), limits.max_concurrency)
+
+
+def acquire(state: Dict[str, Any], limits: StoreLimits, slot: str, now: float) -> float:
+    """
+    Take a concurrency slot and a rate token for a page load if both are free.
+
+    Returns 0 once taken, otherwise how long to wait before trying again.
+    `state` is a store's JSON-serialisable governor state, updated in place.
+    """
+    cooldown_until = state.get("cooldown_until", 0.0)
+    if cooldown_until > now:
+        return cooldown_until - now
+
+    slots = {key: expiry for key, expiry in state.get("slots", {}).items() if expiry > now}
+    state["slots"] = slots
+    if len(slots) >= int(_limit(state, limits)):
+        return SLOT_POLL_INTERVAL
+
+    if limits.rate > 0:
+        elapsed = max(0.0, now - state.get("updated", now))
+        tokens = min(limits.burst, state.get("tokens", limits.burst) + elapsed * limits.rate)
+        state["updated"] = now
+        if tokens < 1:
+            state["tokens"] = tokens
+            return (1 - tokens) / limits.rate
+        state["tokens"] = tokens - 1
+
+    slots[slot] = now + CRAWL_SLOT_TTL
+    return 0.0
+
+
+def release(
+    state: Dict[str, Any],
+    limits: StoreLimits,
+    slot: str,
+    now: float,
+    latency: float,
+    outcome: str,
+) -> float:
+    """
+    Free a page load's slot and adapt the concurrency limit to how it went
+    (AIMD), returning the new limit.
+
+    Fast successes raise the limit by 1/limit, so by about one per `limit`
+    page loads. Slow or failed page loads halve it, and a block drops it to
+    the minimum and pauses the store for its cooldown.
+    """
+    state.get("slots", {}).pop(slot, None)
+    limit = _limit(state, limits)
+    if outcome == "blocked":
+        limit = limits.min_concurrency
+        state["cooldown_until"] = now + limits.block_cooldown
+        state["decreased_at"] = now
+    elif outcome == "ok" and latency <= limits.target_latency:
+        limit = min(limits.max_concurrency, limit + 1 / limit)
+    elif now - state.get("decreased_at", 0.0) >= limits.target_latency:
+        # Page loads sent together fail together: halve once per target
+        # latency, not once for each of them.
+        limit = max(limits.min_concurrency, limit / 2)
+        state["decreased_at"] = now
+    state["limit"] = limit
+    return limit
+
+
+class PageLoad:
+    """A page load let through by the governor."""
+
+    __slots__ = ("blocked",)
+
+    def __init__(self) -> None:
+        # Set when the store answered with a bot check instead of the page.
+        self.blocked = False
+
+
+class CrawlGovernor:
+    """
+    Paces page loads per store with a token bucket and an adaptive (AIMD)
+    concurrency limit, backing off when a store slows down, fails or blocks.
+
+    In "redis" mode each store's state is a JSON document in Redis updated
+    atomically by every worker, so the limits hold across processes. While
+    Redis is unreachable the governor falls back to per-process state.
+    """
+
+    def __init__(self, mode: str = CRAWL_GOVERNOR, prefix: str = "crawl-governor") -> None:
+        self.mode = mode
+        self.prefix = prefix
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _update(self, store: str, update: Callable[[Dict[str, Any]], T]) -> T:
+        if self.mode == "redis":
+            result = redis_cache.update_json(
+                f"{self.prefix}:{store}", update, CRAWL_GOVERNOR_STATE_TTL
+            )
+            if result is not None:
+                return result
+        with self._lock:
+            return update(self._states.setdefault(store, {}))
+
+    @contextmanager
+    def request(self, store: str) -> Iterator[PageLoad]:
+        """
+        Hold a slot for one page load of a store, waiting for it if needed.
+
+        An exception from the block counts as an error, or as a block when
+        the store refused the request; setting `blocked` on the yielded
+        page load reports a bot-check page.
+
+        Raises:
+            CrawlThrottled: If the page load was not let through within
+                CRAWL_GOVERNOR_MAX_WAIT seconds.
+        """
+        page = PageLoad()
+        if self.mode not in ("redis", "local"):
+            yield page
+            return
+
+        limits = store_limits(store)
+        slot = uuid.uuid4().hex
+        waited = 0.0
+        while True:
+            wait = self._update(store, lambda state: acquire(state, limits, slot, time.time()))
+            if not wait:
+                break
+            if waited + wait > CRAWL_GOVERNOR_MAX_WAIT:
+                raise CrawlThrottled(
+                    f"{store} page load not let through within {CRAWL_GOVERNOR_MAX_WAIT:g}s"
+                )
+            time.sleep(wait)
+            waited += wait
+        CRAWL_GOVERNOR_WAIT_SECONDS.observe(waited, store=store)
+
+        outcome = "error"
+        start = time.monotonic()
+        try:
+            yield page
+            outcome = "blocked" if page.blocked else "ok"
+        except Exception as e:
+            if is_block(e):
+                outcome = "blocked"
+            raise
+        finally:
+            latency = time.monotonic() - start
+            limit = self._update(
+                store,
+                lambda state: release(state, limits, slot, time.time(), latency, outcome),
+            )
+            CRAWL_REQUESTS.inc(store=store, outcome=outcome)
+            CRAWL_CONCURRENCY_LIMIT.set(limit, store=store)
+            if outcome == "blocked":
+                logger.warning(
+                    f"{store} blocked a page load, pausing it for {limits.block_cooldown:g}s"
+                )
+
+
+governor = CrawlGovernor()
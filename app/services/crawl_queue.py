@@ -0,0 +1,276 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.models.product import Product
+from app.services.redis_cache import acquire_lock, release_lock
+from app.services.redis_queue import (
+    claim_job,
+    complete_job_part,
+    pop_job_results,
+    queue_lengths,
+    release_job,
+    renew_job_lease,
+    requeue_expired_jobs,
+    start_job_run,
+)
+from app.services.scheduler import CrawlScheduler
+from app.services.store_cache import EmptyCrawlError, get_fetched_at, publish
+from app.services.stores import Store, store_mapping
+from app.utils.logger import logger
+
+CRAWL_QUEUE_PREFIX = os.environ.get("CRAWL_QUEUE_PREFIX", "crawl")
+CRAWL_LEASE_TTL = float(os.environ.get("CRAWL_LEASE_TTL", "60"))
+CRAWL_HEARTBEAT_INTERVAL = float(
+    os.environ.get("CRAWL_HEARTBEAT_INTERVAL", str(CRAWL_LEASE_TTL / 3))
+)
+CRAWL_JOB_MAX_ATTEMPTS = int(os.environ.get("CRAWL_JOB_MAX_ATTEMPTS", "3"))
+CRAWL_PAGES_PER_JOB = int(os.environ.get("CRAWL_PAGES_PER_JOB", "2"))
+CRAWL_RUN_TTL = int(os.environ.get("CRAWL_RUN_TTL", "3600"))
+CRAWL_WORKER_CONCURRENCY = int(os.environ.get("CRAWL_WORKER_CONCURRENCY", "2"))
+CRAWL_WORKER_POLL = float(os.environ.get("CRAWL_WORKER_POLL", "1"))
+CRAWL_DEAD_LETTERS = int(os.environ.get("CRAWL_DEAD_LETTERS", "100"))
+
+PENDING_KEY = f"{CRAWL_QUEUE_PREFIX}:pending"
+LEASES_KEY = f"{CRAWL_QUEUE_PREFIX}:leases"
+JOBS_KEY = f"{CRAWL_QUEUE_PREFIX}:jobs"
+DEAD_KEY = f"{CRAWL_QUEUE_PREFIX}:dead"
+
+
+def results_key(run_id: str) -> str:
+    return f"{CRAWL_QUEUE_PREFIX}:run:{run_id}:results"
+
+
+def remaining_key(run_id: str) -> str:
+    return f"{CRAWL_QUEUE_PREFIX}:run:{run_id}:remaining"
+
+
+def run_lock_key(store: str) -> str:
+    return f"{CRAWL_QUEUE_PREFIX}:run:{store}"
+
+
+class CrawlJob(NamedTuple):
+    """
+    One part of a distributed crawl run.
+
+    Part 0 of a run has no `last_page`: it crawls a whole store, or for
+    stores with `crawl_pages` the first page, and then splits the remaining
+    pages into further parts. `lock_token` holds the store's run lock,
+    which the worker that publishes the run releases.
+    """
+
+    id: str
+    run_id: str
+    store: str
+    part: int = 0
+    first_page: int = 1
+    last_page: Optional[int] = None
+    attempts: int = 0
+    lock_token: str = ""
+
+    def to_json(self) -> str:
+        return json.dumps(self._asdict())
+
+    @classmethod
+    def from_json(cls, data: str) -> "CrawlJob":
+        return cls(**json.loads(data))
+
+
+def split_pages(job: CrawlJob, page_count: int, pages_per_job: int) -> List[CrawlJob]:
+    """Split pages 2..page_count of a run into jobs of `pages_per_job` pages."""
+    size = max(1, pages_per_job)
+    return [
+        job._replace(
+            id=f"{job.run_id}:{part}",
+            part=part,
+            first_page=first,
+            last_page=min(first + size - 1, page_count),
+            attempts=0,
+        )
+        for part, first in enumerate(range(2, page_count + 1, size), start=1)
+    ]
+
+
+async def enqueue_run(store: Store) -> Optional[str]:
+    """
+    Start a crawl run for a store, returning its id.
+
+    Returns None if a run for the store is already in progress.
+    """
+    token = await acquire_lock(run_lock_key(store.name), CRAWL_RUN_TTL)
+    if token is None:
+        return None
+
+    run_id = uuid.uuid4().hex
+    job = CrawlJob(id=f"{run_id}:0", run_id=run_id, store=store.name, lock_token=token)
+    if not await start_job_run(PENDING_KEY, job.to_json(), remaining_key(run_id), CRAWL_RUN_TTL):
+        await release_lock(run_lock_key(store.name), token)
+        return None
+    logger.info(f"Enqueued {store.name} crawl run {run_id}")
+    return run_id
+
+
+async def queue_status() -> Optional[Dict[str, int]]:
+    return await queue_lengths(PENDING_KEY, LEASES_KEY, DEAD_KEY)
+
+
+def merge_parts(parts: Dict[str, str]) -> List[Product]:
+    """Concatenate the products of a run's parts in order, dropping duplicates."""
+    products = []
+    seen = set()
+    for _, data in sorted(parts.items(), key=lambda item: int(item[0])):
+        for fields in json.loads(data):
+            product = Product(**fields)
+            if product.purchase_url not in seen:
+                seen.add(product.purchase_url)
+                products.append(product)
+    return products
+
+
+class CrawlWorker:
+    """
+    Pulls crawl jobs from the shared Redis queue and runs them.
+
+    Jobs are leased for `lease_ttl` seconds and the lease is renewed while
+    the crawl runs, so jobs of a worker that dies are requeued by the other
+    workers once the lease runs out. Failed jobs are retried up to
+    `max_attempts` times and then moved to a dead-letter list. The worker
+    that completes the last part of a run merges the parts and publishes
+    the store's snapshot.
+    """
+
+    def __init__(
+        self,
+        stores: Optional[List[Store]] = None,
+        concurrency: int = CRAWL_WORKER_CONCURRENCY,
+        lease_ttl: float = CRAWL_LEASE_TTL,
+        heartbeat_interval: float = CRAWL_HEARTBEAT_INTERVAL,
+        max_attempts: int = CRAWL_JOB_MAX_ATTEMPTS,
+        pages_per_job: int = CRAWL_PAGES_PER_JOB,
+        poll_interval: float = CRAWL_WORKER_POLL,
+    ) -> None:
+        stores = stores if stores is not None else list(store_mapping.values())
+        self.stores = {store.name: store for store in stores}
+        self.concurrency = concurrency
+        self.lease_ttl = lease_ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.max_attempts = max_attempts
+        self.pages_per_job = pages_per_job
+        self.poll_interval = poll_interval
+
+    async def run_forever(self) -> None:
+        logger.info(f"Crawl worker started with {self.concurrency} slots")
+        await asyncio.gather(*(self._run_slot() for _ in range(self.concurrency)))
+
+    async def _run_slot(self) -> None:
+        while True:
+            if not await self.run_once():
+                await asyncio.sleep(self.poll_interval)
+
+    async def run_once(self) -> bool:
+        """Claim and run one job, returning False if the queue was empty."""
+        now = time.time()
+        requeued = await requeue_expired_jobs(LEASES_KEY, JOBS_KEY, PENDING_KEY, now)
+        if requeued:
+            logger.warning(f"Requeued {requeued} crawl jobs with expired leases")
+
+        data = await claim_job(PENDING_KEY, LEASES_KEY, JOBS_KEY, now + self.lease_ttl)
+        if data is None:
+            return False
+        await self.process(CrawlJob.from_json(data))
+        return True
+
+    async def process(self, job: CrawlJob) -> None:
+        store = self.stores.get(job.store)
+        if store is None or job.attempts >= self.max_attempts:
+            reason = "unknown store" if store is None else f"{job.attempts} failed attempts"
+            logger.error(f"Giving up on crawl job {job.id} ({reason})")
+            await release_job(
+                LEASES_KEY, JOBS_KEY, job.id, DEAD_KEY, job.to_json(), CRAWL_DEAD_LETTERS
+            )
+            await release_lock(run_lock_key(job.store), job.lock_token)
+            return
+
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            products, children = await self._crawl(store, job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Crawl job {job.id} failed (attempt {job.attempts + 1}): {e}")
+            retry = job._replace(attempts=job.attempts + 1)
+            await release_job(LEASES_KEY, JOBS_KEY, job.id, PENDING_KEY, retry.to_json())
+            return
+        finally:
+            heartbeat.cancel()
+
+        remaining = await complete_job_part(
+            results_key(job.run_id),
+            remaining_key(job.run_id),
+            PENDING_KEY,
+            job.part,
+            json.dumps([p.model_dump() for p in products]),
+            [child.to_json() for child in children],
+            CRAWL_RUN_TTL,
+        )
+        if remaining is None:
+            # The result was not recorded; let the lease run out so the job
+            # is retried rather than dropped.
+            return
+        await release_job(LEASES_KEY, JOBS_KEY, job.id)
+
+        if remaining == 0:
+            await self._publish_run(store, job)
+
+    async def _crawl(self, store: Store, job: CrawlJob) -> Tuple[List[Product], List[CrawlJob]]:
+        children: List[CrawlJob] = []
+        if store.crawl_pages is None:
+            products = await store.refresh()
+        elif job.last_page is None:
+            products, page_count = await store.crawl_pages(1, 1)
+            children = split_pages(job, page_count, self.pages_per_job)
+        else:
+            products, _ = await store.crawl_pages(job.first_page, job.last_page)
+
+        if not products:
+            raise EmptyCrawlError(f"Crawl job {job.id} returned no products")
+        return products, children
+
+    async def _heartbeat(self, job: CrawlJob) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            if not await renew_job_lease(LEASES_KEY, job.id, time.time() + self.lease_ttl):
+                logger.warning(f"Lost the lease on crawl job {job.id}")
+                return
+
+    async def _publish_run(self, store: Store, job: CrawlJob) -> None:
+        try:
+            parts = await pop_job_results(results_key(job.run_id), remaining_key(job.run_id))
+            if parts is None:
+                return
+            products = merge_parts(parts)
+            await publish(store.cache_key, products)
+            logger.info(
+                f"Published {len(products)} {store.name} products "
+                f"from {len(parts)} crawl jobs"
+            )
+        finally:
+            await release_lock(run_lock_key(store.name), job.lock_token)
+
+
+class CrawlDispatcher(CrawlScheduler):
+    """
+    Enqueues a crawl run for each store on its interval instead of crawling.
+
+    Any number of dispatchers can run side by side: a run is only enqueued
+    when the store's snapshot is due and no other run for it is in progress.
+    """
+
+    async def crawl(self, store: Store) -> bool:
+        fetched_at = await get_fetched_at(store.cache_key)
+        if fetched_at is not None and time.time() - fetched_at < store.crawl_interval - self.jitter:
+            return False
+        return await enqueue_run(store) is not None
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import re
+from typing import Dict, List, NamedTuple, Sequence
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from app.models.product import Product
+
+# Amazon product URLs carry the ASIN, which survives changes to the slug
+# and to the tracking parameters of search result links.
+AMAZON_ASIN = re.compile(r"/(?:dp|gp/product)/([A-Z0-9]{10})(?:[/?]|$)")
+
+TRACKING_PARAMS = ("ref", "ref_", "qid", "sr", "pd_rd_i", "pd_rd_r", "pd_rd_w", "pf_rd_r")
+
+
+class Delta(NamedTuple):
+    """Products added, changed and removed between two crawls of a store."""
+
+    added: List[Product]
+    changed: List[Product]
+    removed: List[Product]
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added or self.changed or self.removed)
+
+
+def product_identity(product: Product) -> str:
+    """
+    Return a stable identity for a product across crawls.
+
+    Amazon products are identified by their ASIN; other stores by their
+    purchase URL without fragment, trailing slash or tracking parameters.
+    """
+    return url_identity(product.store, product.purchase_url)
+
+
+def url_identity(store: str, purchase_url: str) -> str:
+    """Return the identity of the product a store's purchase URL points to."""
+    asin = AMAZON_ASIN.search(purchase_url)
+    if asin:
+        return f"{store}:{asin.group(1)}"
+
+    parts = urlsplit(purchase_url)
+    query = sorted(
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k not in TRACKING_PARAMS and not k.startswith("utm_")
+    )
+    identity = f"{parts.netloc.lower()}{parts.path.rstrip('/')}"
+    if query:
+        identity += f"?{urlencode(query)}"
+    return f"{store}:{identity}"
+
+
+def content_hash(product: Product) -> str:
+    """Return a hash of every field of a product."""
+    data = json.dumps(product.model_dump(), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def _by_identity(products: Sequence[Product]) -> Dict[str, Product]:
+    return {product_identity(p): p for p in products}
+
+
+def diff_products(previous: Sequence[Product], current: Sequence[Product]) -> Delta:
+    """Compare two crawls of a store by product identity and content hash."""
+    before = _by_identity(previous)
+    after = _by_identity(current)
+
+    added = [p for identity, p in after.items() if identity not in before]
+    changed = [
+        p
+        for identity, p in after.items()
+        if identity in before and content_hash(p) != content_hash(before[identity])
+    ]
+    removed = [p for identity, p in before.items() if identity not in after]
+    return Delta(added, changed, removed)
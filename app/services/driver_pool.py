@@ -0,0 +1,252 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, Optional
+
+from app.services.rendering import chrome_options, rendering_profile
+from app.utils.logger import logger
+from app.utils.metrics import CRAWL_STAGE_SECONDS
+
+if TYPE_CHECKING:
+    from selenium.webdriver.remote.webdriver import WebDriver
+
+SELENIUM_URL = os.environ.get("SELENIUM_URL")
+DRIVER_POOL_SIZE = int(os.environ.get("DRIVER_POOL_SIZE", "3"))
+DRIVER_MAX_USES = int(os.environ.get("DRIVER_MAX_USES", "20"))
+DRIVER_LEASE_TIMEOUT = float(os.environ.get("DRIVER_LEASE_TIMEOUT", "60"))
+DRIVER_POOL_WARM = os.environ.get("DRIVER_POOL_WARM", "true").lower() == "true"
+
+
+def initialize_driver() -> "WebDriver":
+    """Initialize the Selenium WebDriver with the default rendering profile."""
+    # Imported on first use: processes that never crawl never load Selenium.
+    from selenium import webdriver
+
+    options = chrome_options(rendering_profile())
+
+    if os.environ.get("USE_REMOTE_DRIVER", "false").lower() == "true":
+        driver = webdriver.Remote(
+            command_executor=SELENIUM_URL,
+            options=options,
+        )
+    else:
+        driver = webdriver.Chrome(options=options)
+
+    logger.info("Selenium WebDriver initialized")
+    return driver
+
+
+class _PooledDriver:
+    __slots__ = ("driver", "uses")
+
+    def __init__(self, driver: "WebDriver") -> None:
+        self.driver = driver
+        self.uses = 0
+
+
+class DriverPool:
+    """
+    A thread-safe pool of warm WebDriver sessions.
+
+    Sessions are leased with `lease()` and returned automatically. Between
+    leases a session has its cookies and storage cleared; it is replaced
+    after `max_uses` leases or when it fails a health check.
+    """
+
+    def __init__(
+        self,
+        size: int = DRIVER_POOL_SIZE,
+        max_uses: int = DRIVER_MAX_USES,
+        lease_timeout: float = DRIVER_LEASE_TIMEOUT,
+        factory: Callable[[], "WebDriver"] = initialize_driver,
+    ) -> None:
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        self.lease_timeout = lease_timeout
+        self._factory = factory
+        self._idle: "queue.LifoQueue[_PooledDriver]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._total = 0
+        self._closed = False
+
+        self._leases = 0
+        self._created = 0
+        self._recycled = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def warm(self) -> None:
+        """Start sessions until the pool is full."""
+        while True:
+            with self._lock:
+                if self._closed or self._total >= self.size:
+                    return
+                self._total += 1
+            try:
+                self._idle.put(self._create())
+            except Exception as e:
+                with self._lock:
+                    self._total -= 1
+                logger.error(f"Error warming the driver pool: {e}")
+                return
+
+    @contextmanager
+    def lease(self, store: Optional[str] = None) -> Iterator["WebDriver"]:
+        """
+        Lease a driver for the duration of the `with` block.
+
+        The time spent waiting for (or starting) a driver is recorded as the
+        "driver" crawl stage of `store`.
+        """
+        pooled = self._acquire(store)
+        try:
+            yield pooled.driver
+        finally:
+            self._release(pooled)
+
+    def stats(self) -> Dict[str, float]:
+        """Return pool occupancy and lease wait-time statistics."""
+        with self._lock:
+            idle = self._idle.qsize()
+            return {
+                "size": self.size,
+                "open": self._total,
+                "idle": idle,
+                "leased": self._total - idle,
+                "leases": self._leases,
+                "created": self._created,
+                "recycled": self._recycled,
+                "wait_seconds_total": round(self._wait_total, 4),
+                "wait_seconds_max": round(self._wait_max, 4),
+                "wait_seconds_avg": round(self._wait_total / self._leases, 4)
+                if self._leases
+                else 0.0,
+            }
+
+    def close(self) -> None:
+        """Quit every idle session; leased sessions are quit on return."""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(pooled)
+
+    def _acquire(self, store: Optional[str] = None) -> _PooledDriver:
+        start = time.perf_counter()
+        pooled = None
+
+        while pooled is None:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    if self._closed:
+                        raise RuntimeError("Driver pool is closed")
+                    can_create = self._total < self.size
+                    if can_create:
+                        self._total += 1
+                if can_create:
+                    try:
+                        pooled = self._create()
+                    except Exception:
+                        with self._lock:
+                            self._total -= 1
+                        raise
+                else:
+                    remaining = self.lease_timeout - (time.perf_counter() - start)
+                    if remaining <= 0:
+                        raise TimeoutError("Timed out waiting for a WebDriver")
+                    try:
+                        pooled = self._idle.get(timeout=remaining)
+                    except queue.Empty:
+                        continue
+
+            if not self._is_healthy(pooled):
+                self._discard(pooled)
+                pooled = None
+
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._leases += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        if store is not None:
+            CRAWL_STAGE_SECONDS.observe(waited, store=store, stage="driver")
+
+        pooled.uses += 1
+        return pooled
+
+    def _release(self, pooled: _PooledDriver) -> None:
+        with self._lock:
+            closed = self._closed
+
+        if closed or pooled.uses >= self.max_uses or not self._reset(pooled):
+            self._discard(pooled)
+            return
+
+        self._idle.put(pooled)
+
+    def _create(self) -> _PooledDriver:
+        pooled = _PooledDriver(self._factory())
+        with self._lock:
+            self._created += 1
+        return pooled
+
+    def _discard(self, pooled: _PooledDriver) -> None:
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logger.error(f"Error quitting the driver: {e}")
+        with self._lock:
+            self._total -= 1
+            self._recycled += 1
+
+    @staticmethod
+    def _is_healthy(pooled: _PooledDriver) -> bool:
+        try:
+            pooled.driver.current_url
+            return True
+        except Exception as e:
+            logger.warning(f"Discarding unhealthy WebDriver session: {e}")
+            return False
+
+    @staticmethod
+    def _reset(pooled: _PooledDriver) -> bool:
+        """Clear cookies and storage so the next lease starts clean."""
+        try:
+            pooled.driver.delete_all_cookies()
+            pooled.driver.execute_script(
+                "try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}"
+            )
+            pooled.driver.get("about:blank")
+            return True
+        except Exception as e:
+            logger.warning(f"Error resetting WebDriver session: {e}")
+            return False
+
+
+_driver_pool: Optional[DriverPool] = None
+_driver_pool_lock = threading.Lock()
+
+
+def get_driver_pool() -> DriverPool:
+    """Return the process-wide driver pool, creating it on first use."""
+    global _driver_pool
+    with _driver_pool_lock:
+        if _driver_pool is None:
+            _driver_pool = DriverPool()
+        return _driver_pool
+
+
+def close_driver_pool() -> None:
+    """Quit all pooled sessions."""
+    global _driver_pool
+    with _driver_pool_lock:
+        pool, _driver_pool = _driver_pool, None
+    if pool is not None:
+        pool.close()
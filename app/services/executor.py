@@ -0,0 +1,107 @@
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from app.utils.logger import logger
+from app.utils.metrics import CRAWL_SECONDS
+
+T = TypeVar("T")
+
+SCRAPER_MAX_WORKERS = int(os.environ.get("SCRAPER_MAX_WORKERS", "4"))
+SCRAPER_STORE_CONCURRENCY = int(os.environ.get("SCRAPER_STORE_CONCURRENCY", "1"))
+SCRAPER_TIMEOUT = float(os.environ.get("SCRAPER_TIMEOUT", "120"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_store_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the shared thread pool used for blocking scraper calls."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=SCRAPER_MAX_WORKERS, thread_name_prefix="scraper"
+        )
+    return _executor
+
+
+def store_concurrency(store: str) -> int:
+    """Max concurrent crawls for a store, overridable with <STORE>_SCRAPER_CONCURRENCY."""
+    value = os.environ.get(f"{store.upper()}_SCRAPER_CONCURRENCY")
+    return max(1, int(value)) if value else SCRAPER_STORE_CONCURRENCY
+
+
+def store_timeout(store: str) -> float:
+    """Crawl timeout in seconds for a store, overridable with <STORE>_SCRAPER_TIMEOUT."""
+    value = os.environ.get(f"{store.upper()}_SCRAPER_TIMEOUT")
+    return float(value) if value else SCRAPER_TIMEOUT
+
+
+def _get_semaphore(store: str) -> asyncio.Semaphore:
+    semaphore = _store_semaphores.get(store)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(store_concurrency(store))
+        _store_semaphores[store] = semaphore
+    return semaphore
+
+
+async def run_scraper(
+    store: str,
+    func: Callable[..., T],
+    *args: Any,
+    timeout: Optional[float] = None,
+) -> T:
+    """
+    Run a blocking scraper function in the shared thread pool.
+
+    The store's concurrency slot is held until the worker thread actually
+    finishes, so a crawl that outlives its timeout still counts against the
+    per-store limit instead of letting a second crawl pile up behind it.
+
+    Raises:
+        asyncio.TimeoutError: If the crawl does not finish within the timeout.
+    """
+    semaphore = _get_semaphore(store)
+    await semaphore.acquire()
+
+    loop = asyncio.get_running_loop()
+    try:
+        future = get_executor().submit(functools.partial(func, *args))
+    except Exception:
+        semaphore.release()
+        raise
+
+    def _release(_):
+        try:
+            loop.call_soon_threadsafe(semaphore.release)
+        except RuntimeError:
+            # The event loop is already closed (e.g. during shutdown).
+            pass
+
+    future.add_done_callback(_release)
+
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        result = await asyncio.wait_for(
+            asyncio.wrap_future(future), timeout or store_timeout(store)
+        )
+        outcome = "ok"
+        return result
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+        logger.error(f"Scraper for {store} timed out")
+        raise
+    finally:
+        CRAWL_SECONDS.observe(time.perf_counter() - start, store=store, outcome=outcome)
+
+
+def shutdown_executor() -> None:
+    """Stop accepting new crawls and release the worker threads."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,176 @@
+import importlib.util
+import os
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, NamedTuple, Optional, Union
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+from bs4.element import Tag
+
+from app.models.product import Product
+from app.services.categories import categorise_many
+from app.utils.logger import logger
+from app.utils.metrics import CRAWL_ITEMS, CRAWL_PARSE_ERRORS
+
+if TYPE_CHECKING:
+    from selenium.webdriver.remote.webdriver import WebDriver
+
+Record = Dict[str, Any]
+
+PAGE_CAPTURE_DIR = os.environ.get("PAGE_CAPTURE_DIR")
+
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+URL_ATTRIBUTES = ("href", "src")
+
+
+class FieldSelector(NamedTuple):
+    """
+    A declarative selector for one product field.
+
+    - selector: CSS selector relative to the item ("" selects the item itself)
+    - attribute: "text" for the rendered text, otherwise a DOM attribute name
+    - many: collect the values of every match instead of only the first one
+    """
+
+    selector: str
+    attribute: str = "text"
+    many: bool = False
+
+
+class ExtractionSpec(NamedTuple):
+    """The item container selector and the fields to pull from each item."""
+
+    item_selector: str
+    fields: Dict[str, FieldSelector]
+
+
+# Runs inside the page and returns every item's fields in one round trip.
+# Attributes are read as DOM properties when available so that `href` and
+# `src` resolve to absolute URLs, matching WebElement.get_attribute().
+EXTRACT_SCRIPT = """
+const itemSelector = arguments[0];
+const fields = arguments[1];
+
+function readValue(node, attribute) {
+    if (attribute === "text") {
+        return (node.innerText || node.textContent || "").trim();
+    }
+    const value = attribute in node ? node[attribute] : node.getAttribute(attribute);
+    return value === undefined || value === null ? null : String(value);
+}
+
+return Array.from(document.querySelectorAll(itemSelector)).map((item) => {
+    const record = {};
+    for (const [key, field] of Object.entries(fields)) {
+        const nodes = field.selector
+            ? Array.from(item.querySelectorAll(field.selector))
+            : [item];
+        const values = nodes.map((node) => readValue(node, field.attribute));
+        record[key] = field.many ? values : (values.length ? values[0] : null);
+    }
+    return record;
+});
+"""
+
+
+def extract_records(driver: "WebDriver", spec: ExtractionSpec) -> List[Record]:
+    """Extract every item on the current page with a single execute_script call."""
+    fields = {key: field._asdict() for key, field in spec.fields.items()}
+    return driver.execute_script(EXTRACT_SCRIPT, spec.item_selector, fields) or []
+
+
+def _read_value(node: Tag, attribute: str, base_url: Optional[str]) -> Optional[str]:
+    if attribute == "text":
+        return node.get_text().strip()
+    value = node.get(attribute)
+    if isinstance(value, list):
+        value = " ".join(value)
+    if value is not None and base_url and attribute in URL_ATTRIBUTES:
+        value = urljoin(base_url, value)
+    return value
+
+
+def parse_records(
+    html: Union[str, BeautifulSoup], spec: ExtractionSpec, base_url: Optional[str] = None
+) -> List[Record]:
+    """
+    Extract records from static HTML with the same spec used in the browser.
+
+    `html` may also be an already parsed document, so several specs can be
+    applied to one page without parsing it again. Relative `href`/`src`
+    values are resolved against `base_url`, mirroring the absolute URLs the
+    in-page script returns.
+    """
+    soup = html if isinstance(html, BeautifulSoup) else BeautifulSoup(html, HTML_PARSER)
+    records = []
+
+    for item in soup.select(spec.item_selector):
+        record = {}
+        for key, field in spec.fields.items():
+            nodes = item.select(field.selector) if field.selector else [item]
+            values = [_read_value(node, field.attribute, base_url) for node in nodes]
+            record[key] = values if field.many else (values[0] if values else None)
+        records.append(record)
+
+    return records
+
+
+def build_products(
+    records: List[Record],
+    builder: Callable[[Record, str], Optional[Product]],
+    store: str,
+) -> List[Product]:
+    """
+    Turn raw records into products, skipping records the builder rejects.
+
+    The page's names are categorised together and each builder is given its
+    record's category. Builders return None for items that should be
+    skipped silently and raise for malformed items, which are logged and
+    skipped.
+    """
+    categories = categorise_many(str(record.get("name") or "") for record in records)
+    products = []
+    for record, category in zip(records, categories):
+        try:
+            product = builder(record, category)
+        except Exception as e:
+            CRAWL_PARSE_ERRORS.inc(store=store)
+            logger.error(f"Error processing {store} product: {e}")
+            continue
+        if product is not None:
+            products.append(product)
+    CRAWL_ITEMS.inc(len(products), store=store)
+    return products
+
+
+def require(record: Record, key: str) -> Any:
+    """Return a record field, raising if it was not found on the page."""
+    value = record.get(key)
+    if value is None or value == []:
+        raise ValueError(f"missing field '{key}'")
+    return value
+
+
+def capture_page(driver: "WebDriver", store: str) -> None:
+    """
+    Save the rendered page to PAGE_CAPTURE_DIR for offline re-parsing.
+
+    Does nothing unless PAGE_CAPTURE_DIR is set.
+    """
+    if PAGE_CAPTURE_DIR:
+        capture_html(driver.page_source, store)
+
+
+def capture_html(html: str, store: str) -> None:
+    """Save fetched HTML to PAGE_CAPTURE_DIR, if it is set."""
+    if not PAGE_CAPTURE_DIR:
+        return
+
+    try:
+        os.makedirs(PAGE_CAPTURE_DIR, exist_ok=True)
+        path = os.path.join(PAGE_CAPTURE_DIR, f"{store}-{time.time_ns()}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html)
+    except Exception as e:
+        logger.warning(f"Error capturing {store} page: {e}")
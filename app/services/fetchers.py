@@ -0,0 +1,157 @@
+import importlib.util
+import os
+import threading
+from typing import Callable, Optional, TypeVar
+
+from app.services.crawl_governor import CrawlThrottled, governor, looks_blocked
+from app.utils.logger import logger
+from app.utils.metrics import crawl_stage
+
+# "auto" tries a plain HTTP fetch first and falls back to the browser when
+# the page does not validate, "http" never opens a browser, and "browser"
+# always renders the page. Overridable per store as e.g. `ZARA_FETCH_MODE`.
+FETCH_MODE = os.environ.get("FETCH_MODE", "auto").lower()
+FETCH_MODES = ("auto", "http", "browser")
+
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "10"))
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", "15"))
+HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", "2"))
+HTTP_USER_AGENT = os.environ.get(
+    "HTTP_USER_AGENT",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+)
+
+# urllib3 decodes brotli only when a brotli package is installed.
+ACCEPT_ENCODING = (
+    "gzip, deflate, br"
+    if importlib.util.find_spec("brotli") or importlib.util.find_spec("brotlicffi")
+    else "gzip, deflate"
+)
+
+T = TypeVar("T")
+
+
+def fetch_mode(store: str) -> str:
+    mode = os.environ.get(f"{store.upper()}_FETCH_MODE", FETCH_MODE).lower()
+    return mode if mode in FETCH_MODES else "auto"
+
+
+class HttpFetcher:
+    """
+    A pooled HTTP client for pages that can be parsed without a browser.
+
+    One session is shared by every crawl thread, so connections to a store
+    are kept alive and reused across pages and crawls, and responses are
+    transparently decompressed.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = HTTP_POOL_SIZE,
+        timeout: float = HTTP_TIMEOUT,
+        retries: int = HTTP_RETRIES,
+        user_agent: str = HTTP_USER_AGENT,
+    ) -> None:
+        # Imported on first use: processes that never crawl never load requests.
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=0.5,
+                # 429 and 503 are left to the crawl governor to back off from.
+                status_forcelist=(500, 502, 504),
+                allowed_methods=("GET",),
+            ),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(
+            {
+                "User-Agent": user_agent,
+                "Accept": "text/html,application/xhtml+xml,application/json;q=0.9,*/*;q=0.8",
+                "Accept-Encoding": ACCEPT_ENCODING,
+                "Accept-Language": "en-US,en;q=0.9",
+            }
+        )
+
+    def fetch(self, url: str) -> str:
+        """Return the body of a page, raising for non-2xx responses."""
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.text
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_fetcher: Optional[HttpFetcher] = None
+_fetcher_lock = threading.Lock()
+
+
+def get_http_fetcher() -> HttpFetcher:
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = HttpFetcher()
+        return _fetcher
+
+
+def close_http_fetcher() -> None:
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is not None:
+            _fetcher.close()
+            _fetcher = None
+
+
+def fetch_with_fallback(
+    store: str,
+    url: str,
+    parse: Callable[[str], T],
+    browser: Callable[[], T],
+    valid: Callable[[T], bool] = bool,
+) -> T:
+    """
+    Load a page over plain HTTP, falling back to the browser if needed.
+
+    `parse` turns the fetched HTML into a result and `valid` decides whether
+    that result is usable (by default: non-empty). Pages that fail to fetch
+    or validate, e.g. client-rendered listings or bot checks, are loaded
+    with `browser` instead, unless the store's fetch mode is "http".
+    In "browser" mode no HTTP request is made at all.
+
+    Every page load, over HTTP or in the browser, goes through the crawl
+    governor, which paces them per store.
+    """
+    # Imported on first use: processes that never crawl never load the parsers.
+    from app.services.extraction import capture_html
+
+    mode = fetch_mode(store)
+    if mode != "browser":
+        try:
+            with governor.request(store) as page:
+                with crawl_stage(store, "http_fetch"):
+                    html = get_http_fetcher().fetch(url)
+                capture_html(html, store)
+                result = parse(html)
+                usable = valid(result)
+                page.blocked = not usable and looks_blocked(html)
+        except Exception as e:
+            if mode == "http" or isinstance(e, CrawlThrottled):
+                raise
+            logger.warning(f"HTTP fetch of {store} page failed, using browser: {e}")
+        else:
+            if mode == "http" or usable:
+                return result
+            logger.info(f"HTTP fetch of {store} page did not validate, using browser: {url}")
+
+    with governor.request(store):
+        return browser()
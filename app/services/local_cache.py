@@ -0,0 +1,161 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from app.services.redis_cache import subscribe
+from app.utils.logger import logger
+from app.utils.metrics import LOCAL_CACHE_BYTES, LOCAL_CACHE_REQUESTS
+
+# 0 disables the in-process cache; every read then goes to Redis.
+LOCAL_CACHE_MAX_BYTES = int(os.environ.get("LOCAL_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# How long a snapshot version learned from Redis is trusted without a
+# re-check. Publishes are pushed immediately; this only bounds how long an
+# expired (not republished) snapshot can be served from memory.
+LOCAL_CACHE_MAX_AGE = float(os.environ.get("LOCAL_CACHE_MAX_AGE", "60"))
+LOCAL_CACHE_RETRY = float(os.environ.get("LOCAL_CACHE_RETRY", "5"))
+SNAPSHOT_CHANNEL = os.environ.get("SNAPSHOT_CHANNEL", "snapshots")
+
+
+class LocalCache:
+    """
+    A size-bounded LRU of decoded values, each tagged with the snapshot
+    version it was decoded from.
+
+    A lookup only hits if the caller asks for the same version, so an entry
+    for a superseded snapshot is never returned as the current one. Values
+    are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, max_bytes: int = LOCAL_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: Hashable, version: Hashable, kind: str = "value") -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                LOCAL_CACHE_REQUESTS.inc(kind=kind, result="miss")
+                return None
+            self._entries.move_to_end(key)
+        LOCAL_CACHE_REQUESTS.inc(kind=kind, result="hit")
+        return entry[1]
+
+    def put(self, key: Hashable, version: Hashable, value: Any, size: int) -> None:
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[2]
+            self._entries[key] = (version, value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+            LOCAL_CACHE_BYTES.set(self.size)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.size -= entry[2]
+                LOCAL_CACHE_BYTES.set(self.size)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            LOCAL_CACHE_BYTES.set(0)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.size, "max_bytes": self.max_bytes}
+
+
+class SnapshotVersions:
+    """
+    The current snapshot version of each cache key, as far as this process
+    knows, kept up to date by the snapshot pub/sub channel.
+
+    Versions are only reported while the subscription is live: a dropped
+    connection may have missed publishes, so everything learned before it
+    is forgotten and reads go back to Redis until it is re-established.
+    """
+
+    def __init__(self, max_age: float = LOCAL_CACHE_MAX_AGE) -> None:
+        self.max_age = max_age
+        self.listening = False
+        # Bumped on every (re)subscription so reads started before a
+        # reconnect cannot record what they saw.
+        self.generation = 0
+        self._versions: Dict[str, Tuple[int, float]] = {}
+        # Called with (key, version) for every publish.
+        self.listeners: List[Callable[[str, int], None]] = []
+
+    def get(self, key: str) -> Optional[int]:
+        if not self.listening:
+            return None
+        entry = self._versions.get(key)
+        if entry is None or time.monotonic() - entry[1] > self.max_age:
+            return None
+        return entry[0]
+
+    def seen(self, key: str, version: int, generation: int) -> None:
+        """Record a version read from Redis, unless a publish superseded it meanwhile."""
+        if not self.listening or generation != self.generation:
+            return
+        entry = self._versions.get(key)
+        if entry is None or time.monotonic() - entry[1] > self.max_age:
+            self._versions[key] = (version, time.monotonic())
+
+    def published(self, key: str, version: int) -> None:
+        self._versions[key] = (version, time.monotonic())
+        # The decoded snapshot carries fetched_at, which changes even when an
+        # unchanged crawl keeps the version, so it is always dropped.
+        local_cache.invalidate(("snapshot", key))
+        for listener in self.listeners:
+            try:
+                listener(key, version)
+            except Exception as e:
+                logger.warning(f"Snapshot publish listener failed: {e}")
+
+    def _reset(self, listening: bool) -> None:
+        self.listening = listening
+        self.generation += 1
+        self._versions.clear()
+
+    async def listen(self, channel: str = SNAPSHOT_CHANNEL) -> None:
+        """Follow snapshot publishes until cancelled, resubscribing on errors."""
+        while True:
+            try:
+                async for message in subscribe(channel):
+                    if message is None:
+                        self._reset(listening=True)
+                        logger.info(f"Listening for snapshot publishes on {channel}")
+                        continue
+                    try:
+                        data = json.loads(message)
+                        self.published(data["key"], int(data["version"]))
+                    except (ValueError, KeyError, TypeError) as e:
+                        logger.warning(f"Ignoring snapshot message {message!r}: {e}")
+            except asyncio.CancelledError:
+                self._reset(listening=False)
+                raise
+            except Exception as e:
+                logger.warning(f"Snapshot subscription failed: {e}")
+            self._reset(listening=False)
+            await asyncio.sleep(LOCAL_CACHE_RETRY)
+
+
+local_cache = LocalCache()
+snapshot_versions = SnapshotVersions()
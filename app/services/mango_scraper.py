@@ -1,148 +1,123 @@
-import json
 import os
-from typing import List
+from typing import List, Optional
 
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
 from app.models.product import Product
-from app.services.redis_cache import get_cache, set_cache
+from app.services.categories import categorise
+from app.services.driver_pool import get_driver_pool
+from app.services.extraction import (
+    ExtractionSpec,
+    FieldSelector,
+    Record,
+    build_products,
+    capture_page,
+    extract_records,
+    parse_records,
+    require,
+)
+from app.services.fetchers import fetch_with_fallback
+from app.services.pricing import discount_percent, parse_price
+from app.services.rendering import render_session
+from app.services.stores import ScraperPlugin
 from app.utils.logger import logger
+from app.utils.metrics import crawl_stage
 
 MANGO_MEN_SALE_URL = os.environ.get('MANGO_MEN_SALE_URL')
-CACHE_KEY = os.environ.get("MANGO_CACHE_KEY")
-SELENIUM_URL = os.environ.get("SELENIUM_URL")
-
-
-def initialize_driver() -> webdriver.Chrome:
-    """Initialize the Selenium WebDriver with Chrome options."""
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-gpu")
-    options.add_argument('--disable-extensions')
-    options.add_argument('--blink-settings=imagesEnabled=false')
-
-    if os.environ.get("USE_REMOTE_DRIVER", "false").lower() == "true":
-        driver = webdriver.Remote(
-            command_executor=SELENIUM_URL,
-            options=options,
-        )
-    else:
-        driver = webdriver.Chrome(options=options)
-
-    logger.info("Selenium WebDriver initialized")
-    return driver
-
-
-async def scrape_mango_discounted_products() -> List[Product]:
+# Prices without a currency marker are read as this currency.
+MANGO_CURRENCY = os.environ.get("MANGO_CURRENCY", "TRY")
+
+PRODUCT_SPEC = ExtractionSpec(
+    item_selector=".virtual-item",
+    fields={
+        "name": FieldSelector(".ProductTitle_productTitle___cM9O"),
+        "url": FieldSelector("a", "href"),
+        "image_url": FieldSelector("img", "src"),
+        "original_price": FieldSelector(".SinglePrice_center__mfcM3"),
+        "final_prices": FieldSelector(".SinglePrice_finalPrice__CGsuZ", many=True),
+    },
+)
+
+
+def crawl_mango_discounted_products() -> List[Product]:
     """
-    Scrape Mango discounted men's clothing products using Selenium.
-
-    Returns:
-        List[Product]: A list of Product objects with attributes:
-            - name: str
-            - original_price: str
-            - discounted_price: str
-            - discount_percent: float
-            - purchase_url: str
-            - image_url: str
-            - store: str
-            - category: str
+    Crawl Mango's sale page, over plain HTTP when the page validates and
+    with Selenium otherwise (see `fetch_with_fallback`).
+
+    This call blocks for the whole crawl, so it must be run through
+    `run_scraper` rather than directly on the event loop.
     """
     products = []
-    driver = None
-
-    cached = await get_cache(CACHE_KEY)
-    if cached:
-        return [Product(**p) for p in json.loads(cached)]
 
     try:
-        driver = initialize_driver()
-        driver.get(MANGO_MEN_SALE_URL)
-
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "virtual-list"))
+        products = fetch_with_fallback(
+            "mango", MANGO_MEN_SALE_URL, parse_mango_page, render_mango_page
         )
-
-        items = driver.find_elements(By.CLASS_NAME, "virtual-item")
-
-        for item in items:
-            try:
-                name = item.find_element(
-                    By.CLASS_NAME, "ProductTitle_productTitle___cM9O"
-                ).text.strip()
-
-                url = item.find_element(By.TAG_NAME, 'a').get_attribute('href')
-                image_url = item.find_element(By.TAG_NAME, 'img').get_attribute('src')
-
-                original_price = item.find_element(
-                    By.CLASS_NAME, "SinglePrice_center__mfcM3"
-                ).text.strip()
-
-                discounted_price = (
-                    item.find_elements(By.CLASS_NAME, "SinglePrice_finalPrice__CGsuZ")[
-                        -1
-                    ].text.strip()
-                    if item.find_elements(
-                        By.CLASS_NAME, "SinglePrice_finalPrice__CGsuZ"
-                    )
-                    else original_price
-                )
-
-                orig = float(original_price.replace(" TL", "").replace(",", "").strip())
-                disc = float(
-                    discounted_price.replace(" TL", "").replace(",", "").strip()
-                )
-                discount_percent = round((orig - disc) / orig * 100, 2)
-
-                if discount_percent < 0:
-                    continue
-
-                products.append(
-                    Product(
-                        name=name,
-                        original_price=original_price,
-                        discounted_price=discounted_price,
-                        discount_percent=discount_percent,
-                        purchase_url=url,
-                        image_url=image_url,
-                        store="mango",
-                        category=guess_category_from_name(name),
-                    )
-                )
-            except Exception as e:
-                logger.error(f"Error processing product in Mango: {e}")
-                continue
-
     except Exception as e:
         logger.error(f"Error scraping Mango page: {e}")
-    finally:
-        if driver:
-            try:
-                driver.quit()
-            except Exception as e:
-                logger.error(f"Error quitting the driver: {e}")
-
-    await set_cache(CACHE_KEY, [p.dict() for p in products])
+
     return products
 
 
-def guess_category_from_name(name: str) -> str:
-    """Guess product category based on Turkish product name keywords."""
-    name_lower = name.lower()
-    if "ceket" in name_lower:
-        return "jacket"
-    if "gömlek" in name_lower:
-        return "shirt"
-    if "pantolon" in name_lower:
-        return "pants"
-    if "sweatshirt" in name_lower:
-        return "sweatshirt"
-    if "mont" in name_lower:
-        return "coat"
-    return "other"
+def parse_mango_page(html: str, base_url: Optional[str] = None) -> List[Product]:
+    """Parse a Mango sale page's HTML into products."""
+    records = parse_records(html, PRODUCT_SPEC, base_url or MANGO_MEN_SALE_URL)
+    return build_products(records, product_from_record, "mango")
+
+
+def render_mango_page() -> List[Product]:
+    """Load Mango's sale page in a pooled browser session and extract its products."""
+    with get_driver_pool().lease("mango") as driver, render_session(driver, "mango"):
+        with crawl_stage("mango", "navigation"):
+            driver.get(MANGO_MEN_SALE_URL)
+
+        with crawl_stage("mango", "wait"):
+            WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.CLASS_NAME, "virtual-list"))
+            )
+
+        capture_page(driver, "mango")
+        with crawl_stage("mango", "extraction"):
+            return build_products(
+                extract_records(driver, PRODUCT_SPEC), product_from_record, "mango"
+            )
+
+
+def product_from_record(record: Record, category: Optional[str] = None) -> Optional[Product]:
+    """
+    Build a Product from a record extracted with PRODUCT_SPEC, categorising
+    its name unless build_products already has.
+    """
+    name = require(record, "name")
+    url = require(record, "url")
+    image_url = require(record, "image_url")
+    original_price = require(record, "original_price")
+
+    final_prices = record.get("final_prices") or []
+    discounted_price = final_prices[-1] if final_prices else original_price
+
+    original = parse_price(original_price, MANGO_CURRENCY)
+    discounted = parse_price(discounted_price, MANGO_CURRENCY)
+    discount = discount_percent(original, discounted)
+
+    if discount < 0:
+        return None
+
+    return Product(
+        name=name,
+        original_price=original_price,
+        discounted_price=discounted_price,
+        discount_percent=discount,
+        purchase_url=url,
+        image_url=image_url,
+        store="mango",
+        category=category or categorise(name),
+        currency=discounted.currency,
+        original_price_minor=original.minor,
+        discounted_price_minor=discounted.minor,
+    )
+
+
+PLUGIN = ScraperPlugin(crawl=crawl_mango_discounted_products, parse=parse_mango_page)
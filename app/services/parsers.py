@@ -0,0 +1,60 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, List, Optional
+
+from app.models.product import Product
+from app.services.stores import PLUGIN_REFERENCES, store_plugin
+
+
+def get_parser(store: str) -> Callable[..., List[Product]]:
+    """Return the offline parser of a store: (html, base_url=None) -> products."""
+    return store_plugin(store).parse
+
+
+def parse_pages(
+    store: str, pages: Iterable[str], max_workers: Optional[int] = None
+) -> List[List[Product]]:
+    """
+    Parse many captured pages of one store in a process pool.
+
+    Returns one product list per page, in input order.
+    """
+    parser = get_parser(store)
+    pages = list(pages)
+    if len(pages) <= 1 or max_workers == 1:
+        return [parser(html) for html in pages]
+
+    workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(pages) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(parser, pages, chunksize=chunksize))
+
+
+def main() -> None:
+    """Re-parse archived pages offline and report parse throughput."""
+    arg_parser = argparse.ArgumentParser(description=main.__doc__)
+    arg_parser.add_argument("store", choices=sorted(PLUGIN_REFERENCES))
+    arg_parser.add_argument("paths", nargs="+", help="Captured HTML files")
+    arg_parser.add_argument("--workers", type=int, default=None)
+    args = arg_parser.parse_args()
+
+    pages = []
+    for path in args.paths:
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+
+    start = time.perf_counter()
+    results = parse_pages(args.store, pages, args.workers)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    items = sum(len(products) for products in results)
+    print(
+        f"Parsed {len(pages)} pages, {items} products in {elapsed:.3f}s "
+        f"({len(pages) / elapsed:.1f} pages/s, {items / elapsed:.1f} products/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.product import Product
+from app.services.deltas import product_identity
+from app.services.pricing import amount
+from app.utils.logger import logger
+from app.utils.metrics import PRICE_HISTORY_OBSERVATIONS, PRICE_HISTORY_WRITE_SECONDS
+
+# SQLite database holding every product ever crawled and its price over
+# time. Empty disables price history.
+PRICE_HISTORY_PATH = os.environ.get("PRICE_HISTORY_PATH", "")
+# Crawls waiting to be written; further crawls are dropped from the history
+# (never delayed) while the writer is this far behind.
+PRICE_HISTORY_QUEUE = int(os.environ.get("PRICE_HISTORY_QUEUE", "100"))
+PRICE_HISTORY_BUSY_TIMEOUT = float(os.environ.get("PRICE_HISTORY_BUSY_TIMEOUT", "10"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    identity TEXT NOT NULL UNIQUE,
+    store TEXT NOT NULL,
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    purchase_url TEXT NOT NULL,
+    image_url TEXT NOT NULL,
+    first_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS products_store ON products (store);
+
+CREATE TABLE IF NOT EXISTS price_observations (
+    product_id INTEGER NOT NULL REFERENCES products (id),
+    observed_at REAL NOT NULL,
+    price REAL,
+    original_price REAL,
+    discount_percent REAL NOT NULL,
+    display_price TEXT NOT NULL,
+    display_original_price TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS price_observations_product
+    ON price_observations (product_id, observed_at);
+CREATE INDEX IF NOT EXISTS price_observations_time ON price_observations (observed_at);
+"""
+
+# The latest observation of every product of a store, found through the
+# (product_id, observed_at) index rather than by scanning its history.
+LATEST_PRICES = """
+SELECT p.identity, p.id, o.rowid AS observation, o.price, o.original_price
+FROM products p
+LEFT JOIN price_observations o ON o.rowid = (
+    SELECT rowid FROM price_observations
+    WHERE product_id = p.id
+    ORDER BY observed_at DESC
+    LIMIT 1
+)
+WHERE p.store = ?
+"""
+
+PRICE_DROPS = """
+WITH recent AS (
+    SELECT DISTINCT o.product_id
+    FROM price_observations o
+    JOIN products p ON p.id = o.product_id
+    WHERE o.observed_at >= :since AND (:store IS NULL OR p.store = :store)
+),
+ranked AS (
+    SELECT
+        o.product_id,
+        o.observed_at,
+        o.price,
+        LAG(o.price) OVER (PARTITION BY o.product_id ORDER BY o.observed_at) AS previous_price,
+        ROW_NUMBER() OVER (PARTITION BY o.product_id ORDER BY o.observed_at DESC) AS recency,
+        MIN(o.price) OVER (PARTITION BY o.product_id) AS lowest_price
+    FROM price_observations o
+    JOIN recent r ON r.product_id = o.product_id
+)
+SELECT
+    p.identity, p.store, p.name, p.category, p.purchase_url, p.image_url,
+    r.observed_at, r.price, r.previous_price, r.lowest_price,
+    100.0 * (r.previous_price - r.price) / r.previous_price AS drop_percent
+FROM ranked r
+JOIN products p ON p.id = r.product_id
+WHERE r.recency = 1
+    AND r.observed_at >= :since
+    AND r.previous_price > r.price
+    AND 100.0 * (r.previous_price - r.price) / r.previous_price >= :min_drop
+ORDER BY drop_percent DESC, r.observed_at DESC
+LIMIT :limit
+"""
+
+PRODUCT_FIELDS = ("identity", "store", "name", "category", "purchase_url", "image_url")
+
+Observation = Tuple[Optional[float], Optional[float]]
+
+
+def _price(minor: Optional[int], currency: Optional[str], display: str) -> Optional[float]:
+    value = amount(minor, currency, display)
+    return value if math.isfinite(value) else None
+
+
+class PriceHistoryStore:
+    """
+    Append-only price history of every crawled product, kept in SQLite.
+
+    Crawls are handed to `record()`, which only queues them: a single
+    writer thread writes queued crawls in batches, each in one transaction,
+    so publishing a snapshot never waits for the disk. An observation is
+    appended only when a product's price differs from the last one recorded,
+    so the history holds price changes rather than a copy of every crawl.
+    """
+
+    def __init__(
+        self, path: str = PRICE_HISTORY_PATH, max_queue: int = PRICE_HISTORY_QUEUE
+    ) -> None:
+        self.path = path
+        self._queue: "queue.Queue[Optional[Tuple[float, List[Product]]]]" = queue.Queue(
+            max_queue
+        )
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def record(self, products: List[Product], observed_at: Optional[float] = None) -> None:
+        """Queue a crawl's products to be written to the history."""
+        if not self.enabled or not products:
+            return
+        self._start_writer()
+        try:
+            self._queue.put_nowait((observed_at or time.time(), products))
+        except queue.Full:
+            logger.warning(
+                f"Price history is behind; dropping a crawl of {len(products)} products"
+            )
+
+    def flush(self) -> None:
+        """Block until every queued crawl has been written."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Write the queued crawls and stop the writer thread."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+
+    def history(self, identity: str) -> Optional[Dict[str, Any]]:
+        """Return a product and every recorded price of it, oldest first."""
+        db = self._connection()
+        product = db.execute(
+            f"SELECT id, first_seen, {', '.join(PRODUCT_FIELDS)} FROM products "
+            "WHERE identity = ?",
+            (identity,),
+        ).fetchone()
+        if product is None:
+            return None
+        rows = db.execute(
+            "SELECT observed_at, price, original_price, discount_percent, display_price, "
+            "display_original_price FROM price_observations WHERE product_id = ? "
+            "ORDER BY observed_at",
+            (product["id"],),
+        ).fetchall()
+        prices = [row["price"] for row in rows if row["price"] is not None]
+        return {
+            **{field: product[field] for field in PRODUCT_FIELDS},
+            "first_seen": product["first_seen"],
+            "lowest_price": min(prices, default=None),
+            "highest_price": max(prices, default=None),
+            "prices": [dict(row) for row in rows],
+        }
+
+    def price_drops(
+        self, since: float, store: Optional[str] = None, min_drop: float = 0, limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """
+        Return products whose latest price was recorded after `since` and is
+        lower than the one before it, largest drop first.
+        """
+        rows = self._connection().execute(
+            PRICE_DROPS, {"since": since, "store": store, "min_drop": min_drop, "limit": limit}
+        )
+        return [dict(row) for row in rows]
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=PRICE_HISTORY_BUSY_TIMEOUT, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        # WAL lets the API read while a crawler writes.
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(SCHEMA)
+        return db
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's read connection."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = self._connect()
+        return db
+
+    def _start_writer(self) -> None:
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._write_forever, name="price-history", daemon=True
+                )
+                self._writer.start()
+
+    def _write_forever(self) -> None:
+        db = self._connect()
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                crawls = [crawl for crawl in batch if crawl is not None]
+                try:
+                    if crawls:
+                        self._write(db, crawls)
+                except Exception as e:
+                    logger.error(f"Failed to write price history: {e}")
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if len(crawls) < len(batch):
+                    return
+        finally:
+            db.close()
+
+    def _write(self, db: sqlite3.Connection, crawls: List[Tuple[float, List[Product]]]) -> None:
+        start = time.perf_counter()
+        latest: Dict[str, Dict[str, Tuple[int, Optional[Observation]]]] = {}
+        added: Dict[str, int] = {}
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            for observed_at, products in crawls:
+                by_identity = {product_identity(p): p for p in products}
+                stores = {p.store for p in by_identity.values()}
+                for store in stores - latest.keys():
+                    latest[store] = self._latest_prices(db, store)
+
+                new = [
+                    (identity, p.store, p.name, p.category, p.purchase_url, p.image_url)
+                    for identity, p in by_identity.items()
+                    if identity not in latest[p.store]
+                ]
+                if new:
+                    db.executemany(
+                        "INSERT OR IGNORE INTO products (identity, store, name, category, "
+                        "purchase_url, image_url, first_seen) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [(*row, observed_at) for row in new],
+                    )
+                    for store in stores:
+                        latest[store] = self._latest_prices(db, store)
+
+                rows = []
+                for identity, p in by_identity.items():
+                    product_id, observation = latest[p.store][identity]
+                    price = (
+                        _price(p.discounted_price_minor, p.currency, p.discounted_price),
+                        _price(p.original_price_minor, p.currency, p.original_price),
+                    )
+                    if price == observation:
+                        continue
+                    rows.append(
+                        (
+                            product_id,
+                            observed_at,
+                            *price,
+                            p.discount_percent,
+                            p.discounted_price,
+                            p.original_price,
+                        )
+                    )
+                    latest[p.store][identity] = (product_id, price)
+                    added[p.store] = added.get(p.store, 0) + 1
+                db.executemany(
+                    "INSERT INTO price_observations (product_id, observed_at, price, "
+                    "original_price, discount_percent, display_price, display_original_price) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+        for store, count in added.items():
+            PRICE_HISTORY_OBSERVATIONS.inc(count, store=store)
+        PRICE_HISTORY_WRITE_SECONDS.observe(time.perf_counter() - start)
+
+    def _latest_prices(
+        self, db: sqlite3.Connection, store: str
+    ) -> Dict[str, Tuple[int, Optional[Observation]]]:
+        """Map each known product of a store to its id and last recorded price, if any."""
+        return {
+            row["identity"]: (
+                row["id"],
+                (row["price"], row["original_price"]) if row["observation"] else None,
+            )
+            for row in db.execute(LATEST_PRICES, (store,))
+        }
+
+
+price_history = PriceHistoryStore()
@@ -0,0 +1,118 @@
+import re
+from typing import NamedTuple, Optional
+
+# Currency markers as they appear in display prices, longest first so that
+# "US$" wins over "$".
+CURRENCY_SYMBOLS = {
+    "US$": "USD",
+    "$": "USD",
+    "€": "EUR",
+    "£": "GBP",
+    "₺": "TRY",
+    "TL": "TRY",
+    "¥": "JPY",
+}
+CURRENCY_CODES = ("USD", "EUR", "GBP", "TRY", "JPY")
+
+# Digits after the decimal mark; currencies not listed have two.
+CURRENCY_EXPONENTS = {"JPY": 0}
+
+_CURRENCY = re.compile(
+    "|".join(
+        re.escape(marker)
+        for marker in sorted([*CURRENCY_SYMBOLS, *CURRENCY_CODES], key=len, reverse=True)
+    )
+)
+
+
+class Price(NamedTuple):
+    """An amount in integer minor units (cents, kuruş) of an ISO 4217 currency."""
+
+    minor: int
+    currency: str
+
+    @property
+    def value(self) -> float:
+        return self.minor / 10 ** exponent(self.currency)
+
+
+def exponent(currency: str) -> int:
+    return CURRENCY_EXPONENTS.get(currency, 2)
+
+
+def currency_of(text: str) -> Optional[str]:
+    """Return the ISO code of the first currency symbol or code in a text."""
+    match = _CURRENCY.search(text)
+    if match is None:
+        return None
+    return CURRENCY_SYMBOLS.get(match.group(), match.group())
+
+
+def parse_price(text: str, currency: Optional[str] = None) -> Price:
+    """
+    Parse a display price such as "$ 29.90", "1.999,99 TL" or "29,90 €".
+
+    When both separators appear the last one is the decimal mark. A single
+    separator, comma or dot alike, is a thousands separator when it appears
+    more than once or is followed by exactly three digits ("1.299 TL"), and
+    a decimal mark otherwise. `currency` is used when the text names none.
+
+    Raises:
+        ValueError: If the text holds no amount or no currency.
+    """
+    currency = currency_of(text) or currency
+    if currency is None:
+        raise ValueError(f"no currency in price {text!r}")
+
+    digits = "".join(c for c in text if c.isdigit() or c in ".,").strip(".,")
+    if "," in digits and "." in digits:
+        decimal = "," if digits.rfind(",") > digits.rfind(".") else "."
+        digits = digits.replace("." if decimal == "," else ",", "")
+    else:
+        separator = "," if "," in digits else "."
+        if digits.count(separator) > 1 or len(digits) - digits.rfind(separator) == 4:
+            digits = digits.replace(separator, "")
+        decimal = separator
+
+    whole, _, fraction = digits.partition(decimal)
+    if not whole and not fraction or not (whole + fraction).isdigit():
+        raise ValueError(f"invalid price {text!r}")
+
+    places = exponent(currency)
+    fraction = fraction[:places].ljust(places, "0")
+    return Price(int(whole or "0") * 10**places + int(fraction or "0"), currency)
+
+
+def price_value(text: str) -> float:
+    """Return a display price as a number for sorting; unparseable prices sort last."""
+    try:
+        return parse_price(text, currency="USD").value
+    except ValueError:
+        return float("inf")
+
+
+def amount(minor: Optional[int], currency: Optional[str], display: str) -> float:
+    """
+    Return a price as a number, from its minor units when they are known and
+    otherwise parsed from its display string (products cached before prices
+    were normalised); unparseable prices sort last.
+    """
+    if minor is not None and currency:
+        return Price(minor, currency).value
+    return price_value(display)
+
+
+def discount_percent(original: Price, discounted: Price) -> float:
+    """
+    Return how much cheaper `discounted` is than `original`, in percent,
+    rounded to two decimals. Negative for price rises.
+
+    Raises:
+        ValueError: If the prices are in different currencies or the
+            original price is zero.
+    """
+    if original.currency != discounted.currency:
+        raise ValueError(f"cannot compare {original.currency} and {discounted.currency}")
+    if original.minor <= 0:
+        raise ValueError("original price is zero")
+    return round((original.minor - discounted.minor) * 100 / original.minor, 2)
@@ -0,0 +1,270 @@
+import os
+from bisect import bisect_right
+from collections import OrderedDict
+from heapq import merge
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.services.snapshot import Snapshot
+
+INDEX_HISTORY_SIZE = int(os.environ.get("INDEX_HISTORY_SIZE", "8"))
+INDEX_ORDER_CACHE_SIZE = int(os.environ.get("INDEX_ORDER_CACHE_SIZE", "64"))
+
+# Supported values of the `sort` query parameter. Discounts sort descending,
+# prices and names ascending, prices grouped by currency since amounts in
+# different currencies are not comparable.
+SORTS = ("discount_percent", "price", "name")
+
+# (store, row index) pairs identify a product across all indexed snapshots.
+Match = Tuple[str, int]
+Ordering = Tuple[List, List[Match]]
+
+
+class StoreIndex:
+    """
+    Posting lists for one store snapshot.
+
+    For every lowercased category (and for the whole store, under None) it
+    keeps the row indices in crawl order and in each sort order, together
+    with the sort keys of the latter for merging and bisecting.
+    """
+
+    def __init__(self, store: str, snapshot: Snapshot) -> None:
+        self.store = store
+        self.snapshot = snapshot
+        self.version = snapshot.version
+
+        category_names = [name.lower() for name in snapshot.categories]
+        natural: Dict[Optional[str], List[int]] = {None: list(range(len(snapshot)))}
+        for index, category_id in enumerate(snapshot.category_ids):
+            natural.setdefault(category_names[category_id], []).append(index)
+        self.natural = natural
+
+        sort_keys = {
+            "discount_percent": [-d for d in snapshot.discounts],
+            "price": list(zip(snapshot.currencies, snapshot.prices)),
+            "name": snapshot.names,
+        }
+        self.ordered: Dict[str, Dict[Optional[str], List[int]]] = {}
+        self.keys: Dict[str, Dict[Optional[str], List]] = {}
+        for sort, values in sort_keys.items():
+            self.ordered[sort] = {}
+            self.keys[sort] = {}
+            for category, indices in natural.items():
+                ordered = sorted(indices, key=values.__getitem__)
+                self.ordered[sort][category] = ordered
+                self.keys[sort][category] = [values[i] for i in ordered]
+
+
+class ProductIndex:
+    """
+    In-memory query index over the latest snapshot of every store.
+
+    A store's posting lists are rebuilt only when its snapshot version
+    changes. The previous INDEX_HISTORY_SIZE versions are kept so that
+    cursors issued against them keep paging through the same view.
+    Cross-store orderings are merged lazily and cached per set of versions.
+    """
+
+    def __init__(self) -> None:
+        self.stores: Dict[str, StoreIndex] = {}
+        self._history: "OrderedDict[Tuple[str, int], StoreIndex]" = OrderedDict()
+        self._orderings: "OrderedDict[tuple, Ordering]" = OrderedDict()
+
+    def version(self, store: str) -> Optional[int]:
+        index = self.stores.get(store)
+        return index.version if index is not None else None
+
+    def versions(self, stores: Sequence[str]) -> Dict[str, int]:
+        return {s: self.stores[s].version for s in stores if s in self.stores}
+
+    def snapshot(self, store: str, version: Optional[int] = None) -> Optional[Snapshot]:
+        index = self.get(store, version)
+        return index.snapshot if index is not None else None
+
+    def get(self, store: str, version: Optional[int] = None) -> Optional[StoreIndex]:
+        """Return the current index of a store, or the index of a given version."""
+        index = self.stores.get(store)
+        if version is None or (index is not None and index.version == version):
+            return index
+        index = self._history.get((store, version))
+        if index is not None:
+            self._history.move_to_end((store, version))
+        return index
+
+    def update(self, store: str, snapshot: Optional[Snapshot]) -> bool:
+        """Index a store's snapshot, returning True if anything was rebuilt."""
+        previous = self.stores.get(store)
+        if snapshot is None:
+            if previous is None:
+                return False
+            del self.stores[store]
+        elif previous is not None and previous.version == snapshot.version:
+            return False
+        else:
+            self.stores[store] = StoreIndex(store, snapshot)
+
+        if previous is not None:
+            self._remember(previous)
+        return True
+
+    def add_version(self, store: str, snapshot: Snapshot) -> None:
+        """Index a superseded snapshot version without making it current."""
+        if self.get(store, snapshot.version) is None:
+            self._remember(StoreIndex(store, snapshot))
+
+    def _remember(self, index: StoreIndex) -> None:
+        self._history[(index.store, index.version)] = index
+        self._history.move_to_end((index.store, index.version))
+        while len(self._history) > INDEX_HISTORY_SIZE:
+            self._history.popitem(last=False)
+
+    def query(
+        self,
+        stores: Sequence[str],
+        category: Optional[str] = None,
+        min_discount: Optional[float] = None,
+        start: int = 0,
+        end: Optional[int] = None,
+        sort: Optional[str] = None,
+        versions: Optional[Dict[str, int]] = None,
+    ) -> Tuple[int, List[Match]]:
+        """
+        Return the total number of matches and the matches in [start, end).
+
+        Without a sort, results are in store order and then crawl order, or
+        in descending discount order when min_discount is given. `versions`
+        pins stores to specific snapshot versions; stores missing from it
+        are read at their current version.
+
+        Raises:
+            KeyError: If a pinned version is not in the index.
+        """
+        category = category.lower() if category else None
+        indexes = []
+        for store in stores:
+            version = (versions or {}).get(store)
+            index = self.get(store, version)
+            if index is None and version is not None:
+                raise KeyError((store, version))
+            if index is not None:
+                indexes.append(index)
+
+        if sort is None and min_discount is None:
+            return self._query_natural(indexes, category, start, end)
+
+        sort = sort or "discount_percent"
+        if min_discount is not None and sort != "discount_percent":
+            matches = self._filtered(indexes, category, sort, min_discount)
+            end = len(matches) if end is None else min(end, len(matches))
+            return len(matches), matches[start:end]
+
+        if len(indexes) == 1:
+            # A single store's posting list is already in order: slice it
+            # before building matches, so a page costs O(log n + page size).
+            index = indexes[0]
+            keys = index.keys[sort].get(category, [])
+        else:
+            keys, matches = self._ordering(indexes, category, sort)
+        total = len(keys) if min_discount is None else bisect_right(keys, -min_discount)
+
+        end = total if end is None else min(end, total)
+        if len(indexes) == 1:
+            rows = index.ordered[sort].get(category, [])
+            return total, [(index.store, row) for row in rows[start:end]]
+        return total, matches[start:end]
+
+    def _query_natural(
+        self,
+        indexes: List[StoreIndex],
+        category: Optional[str],
+        start: int,
+        end: Optional[int],
+    ) -> Tuple[int, List[Match]]:
+        postings = [(index.store, index.natural.get(category, [])) for index in indexes]
+        total = sum(len(rows) for _, rows in postings)
+        end = total if end is None else min(end, total)
+
+        matches: List[Match] = []
+        offset = 0
+        for store, rows in postings:
+            if offset + len(rows) > start and offset < end:
+                lo = max(0, start - offset)
+                hi = min(len(rows), end - offset)
+                matches.extend((store, row) for row in rows[lo:hi])
+            offset += len(rows)
+            if offset >= end:
+                break
+        return total, matches
+
+    def _cached(self, cache_key: tuple) -> Optional[Ordering]:
+        ordering = self._orderings.get(cache_key)
+        if ordering is not None:
+            self._orderings.move_to_end(cache_key)
+        return ordering
+
+    def _cache(self, cache_key: tuple, ordering: Ordering) -> Ordering:
+        self._orderings[cache_key] = ordering
+        while len(self._orderings) > INDEX_ORDER_CACHE_SIZE:
+            self._orderings.popitem(last=False)
+        return ordering
+
+    def _ordering(
+        self, indexes: List[StoreIndex], category: Optional[str], sort: str
+    ) -> Ordering:
+        """Return the sort keys and matches of all rows in a sort order."""
+        if len(indexes) == 1:
+            index = indexes[0]
+            rows = index.ordered[sort].get(category, [])
+            return index.keys[sort].get(category, []), [(index.store, r) for r in rows]
+
+        cache_key = (tuple((i.store, i.version) for i in indexes), category, sort)
+        ordering = self._cached(cache_key)
+        if ordering is None:
+            streams = [
+                [
+                    (key, position, row)
+                    for key, row in zip(
+                        index.keys[sort].get(category, []),
+                        index.ordered[sort].get(category, []),
+                    )
+                ]
+                for position, index in enumerate(indexes)
+            ]
+            entries = list(merge(*streams))
+            ordering = self._cache(
+                cache_key,
+                (
+                    [key for key, _, _ in entries],
+                    [(indexes[position].store, row) for _, position, row in entries],
+                ),
+            )
+        return ordering
+
+    def _filtered(
+        self,
+        indexes: List[StoreIndex],
+        category: Optional[str],
+        sort: str,
+        min_discount: float,
+    ) -> List[Match]:
+        """Return a sort order restricted to min_discount, computed once per query shape."""
+        cache_key = (
+            tuple((i.store, i.version) for i in indexes),
+            category,
+            sort,
+            min_discount,
+        )
+        ordering = self._cached(cache_key)
+        if ordering is None:
+            discounts = {index.store: index.snapshot.discounts for index in indexes}
+            _, matches = self._ordering(indexes, category, sort)
+            filtered = [
+                (store, row)
+                for store, row in matches
+                if discounts[store][row] >= min_discount
+            ]
+            ordering = self._cache(cache_key, ([], filtered))
+        return ordering[1]
+
+
+product_index = ProductIndex()
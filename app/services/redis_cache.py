@@ -1,32 +1,371 @@
+import asyncio
+import functools
 import json
 import logging
 import os
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, TypeVar
 
+import redis as sync_redis
 import redis.asyncio as redis
 
+from app.utils.metrics import REDIS_CIRCUIT_OPEN, REDIS_SECONDS, timed_async
+
 logger = logging.getLogger(__name__)
 
 REDIS_HOST = os.environ.get("REDIS_HOST", "localhost")
-REDIS_PORT = 6379
-REDIS_DB = 0
+REDIS_PORT = int(os.environ.get("REDIS_PORT", "6379"))
+REDIS_DB = int(os.environ.get("REDIS_DB", "0"))
+REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", "50"))
+# How long a command waits for a free pooled connection before failing.
+REDIS_POOL_TIMEOUT = float(os.environ.get("REDIS_POOL_TIMEOUT", "1"))
+REDIS_CONNECT_TIMEOUT = float(os.environ.get("REDIS_CONNECT_TIMEOUT", "1"))
+REDIS_SOCKET_TIMEOUT = float(os.environ.get("REDIS_SOCKET_TIMEOUT", "2"))
+REDIS_BREAKER_FAILURES = int(os.environ.get("REDIS_BREAKER_FAILURES", "5"))
+REDIS_BREAKER_RESET = float(os.environ.get("REDIS_BREAKER_RESET", "10"))
+# JSON values at least this long are stored zlib-compressed (0: never).
+# Snapshots are always stored raw: they are read with byte ranges.
+REDIS_COMPRESS_THRESHOLD = int(os.environ.get("REDIS_COMPRESS_THRESHOLD", "4096"))
+
+COMPRESSED_MAGIC = b"\x00ZL1"
+
+T = TypeVar("T")
+
+
+def _pool(pool_class: type = redis.BlockingConnectionPool, **kwargs: Any) -> Any:
+    return pool_class(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        db=REDIS_DB,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=REDIS_POOL_TIMEOUT,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        **kwargs,
+    )
 
-redis_client = redis.Redis(
-    host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True
+
+redis_client = redis.Redis(connection_pool=_pool(decode_responses=True))
+
+# Binary snapshots must not be decoded as UTF-8, so they use their own client.
+redis_bytes_client = redis.Redis(connection_pool=_pool())
+
+# Crawl threads have no event loop; they use a blocking client of their own.
+redis_sync_client = sync_redis.Redis(
+    connection_pool=_pool(sync_redis.BlockingConnectionPool, decode_responses=True)
 )
 
 
-async def set_cache(key: str, value: str, ttl: int = 3600):
-    try:
-        if isinstance(value, (dict, list)):
-            value = json.dumps(value, default=str)
-        await redis_client.setex(key, ttl, value)
-    except Exception as e:
-        logger.warning(f"Redis error: {e}")
+class CircuitBreaker:
+    """
+    Stops calling Redis for a while after repeated failures.
 
+    After `failures` consecutive errors the circuit opens and every call
+    fails fast for `reset_after` seconds, so a slow or unreachable Redis
+    costs requests nothing instead of a timeout each. Then one trial call
+    is let through; if it succeeds the circuit closes again.
+    """
 
-async def get_cache(key: str) -> str:
-    try:
-        return await redis_client.get(key)
-    except Exception as e:
-        logger.warning(f"Redis error: {e}")
+    def __init__(
+        self, failures: int = REDIS_BREAKER_FAILURES, reset_after: float = REDIS_BREAKER_RESET
+    ) -> None:
+        self.failures = failures
+        self.reset_after = reset_after
+        self._errors = 0
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_after:
+                return False
+            # Let one trial call through; until it reports back, the circuit
+            # counts as freshly opened so concurrent calls still fail fast.
+            self._opened_at = time.monotonic()
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Redis circuit closed")
+            self._errors = 0
+            self._opened_at = None
+            REDIS_CIRCUIT_OPEN.set(0)
+
+    def failure(self) -> None:
+        with self._lock:
+            self._errors += 1
+            if self._opened_at is None and self._errors >= self.failures:
+                logger.warning(f"Redis circuit opened after {self._errors} errors")
+                REDIS_CIRCUIT_OPEN.set(1)
+            if self._opened_at is not None or self._errors >= self.failures:
+                self._opened_at = time.monotonic()
+
+
+breaker = CircuitBreaker()
+
+
+def guarded(fallback: Any = None) -> Callable:
+    """
+    Decorate a Redis helper so that errors are logged and `fallback` is
+    returned instead, and so that it fails fast while the circuit is open.
+    A callable fallback is called to build the value. Blocking helpers
+    (using `redis_sync_client`) are decorated the same way.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        if not asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            def sync_wrapper(*args, **kwargs):
+                if breaker.allow():
+                    try:
+                        result = func(*args, **kwargs)
+                    except Exception as e:
+                        breaker.failure()
+                        logger.warning(f"Redis error: {e}")
+                    else:
+                        breaker.success()
+                        return result
+                return fallback() if callable(fallback) else fallback
+
+            return sync_wrapper
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if breaker.allow():
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception as e:
+                    breaker.failure()
+                    logger.warning(f"Redis error: {e}")
+                else:
+                    breaker.success()
+                    return result
+            return fallback() if callable(fallback) else fallback
+
+        return wrapper
+
+    return decorator
+
+
+def compress_value(value: str) -> bytes:
+    """Encode a JSON value, compressing it if it reaches the threshold."""
+    data = value.encode("utf-8")
+    if REDIS_COMPRESS_THRESHOLD and len(data) >= REDIS_COMPRESS_THRESHOLD:
+        return COMPRESSED_MAGIC + zlib.compress(data)
+    return data
+
+
+def decompress_value(data: Optional[bytes]) -> Optional[str]:
+    if data is None:
         return None
+    if data.startswith(COMPRESSED_MAGIC):
+        data = zlib.decompress(data[len(COMPRESSED_MAGIC) :])
+    return data.decode("utf-8")
+
+
+@timed_async(REDIS_SECONDS, operation="set_cache_bytes")
+@guarded()
+async def set_cache_bytes(key: str, value: bytes, ttl: int = 3600):
+    await redis_bytes_client.setex(key, ttl, value)
+
+
+@timed_async(REDIS_SECONDS, operation="set_cache_bytes_many")
+@guarded(fallback=False)
+async def set_cache_bytes_many(
+    items: List[Tuple[str, bytes, int]],
+    append: Optional[Tuple[str, str, int, int]] = None,
+) -> bool:
+    """
+    Write several (key, value, ttl) entries atomically in one MULTI pipeline,
+    returning False if the write failed.
+
+    `append` = (key, value, max_length, ttl) also prepends a JSON value to a
+    capped list in the same transaction, so readers never see the entries
+    without it or the other way round.
+    """
+    async with redis_bytes_client.pipeline(transaction=True) as pipe:
+        for key, value, ttl in items:
+            pipe.setex(key, ttl, value)
+        if append is not None:
+            list_key, list_value, max_length, list_ttl = append
+            pipe.lpush(list_key, compress_value(list_value))
+            pipe.ltrim(list_key, 0, max_length - 1)
+            pipe.expire(list_key, list_ttl)
+        await pipe.execute()
+    return True
+
+
+@timed_async(REDIS_SECONDS, operation="get_cache_bytes")
+@guarded()
+async def get_cache_bytes(key: str) -> Optional[bytes]:
+    return await redis_bytes_client.get(key)
+
+
+@timed_async(REDIS_SECONDS, operation="get_cache_bytes_many")
+@guarded()
+async def get_cache_bytes_many(keys: List[str]) -> Optional[List[Optional[bytes]]]:
+    """Read several values in one MGET round trip."""
+    if not keys:
+        return []
+    return await redis_bytes_client.mget(keys)
+
+
+@timed_async(REDIS_SECONDS, operation="get_cache_ranges")
+@guarded()
+async def get_cache_ranges(
+    key: str, ranges: List[Tuple[int, int]]
+) -> Optional[List[bytes]]:
+    """
+    Read several [start, end) byte ranges of one value in a single round trip.
+
+    The reads run in a MULTI transaction, so they all see the same value even
+    if it is being replaced concurrently.
+    """
+    async with redis_bytes_client.pipeline(transaction=True) as pipe:
+        for start, end in ranges:
+            pipe.getrange(key, start, end - 1)
+        return await pipe.execute()
+
+
+@timed_async(REDIS_SECONDS, operation="get_cache_prefixes")
+@guarded()
+async def get_cache_prefixes(keys: List[str], length: int) -> Optional[List[bytes]]:
+    """Read the first `length` bytes of several values in a single round trip."""
+    async with redis_bytes_client.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.getrange(key, 0, length - 1)
+        return await pipe.execute()
+
+
+# Overwrites part of a value and renews its expiry, but only if the value
+# still exists; SETRANGE on a missing key would create a zero-padded one.
+PATCH_SCRIPT = """
+if redis.call("exists", KEYS[1]) == 1 then
+    redis.call("setrange", KEYS[1], ARGV[1], ARGV[2])
+    return redis.call("expire", KEYS[1], ARGV[3])
+end
+return 0
+"""
+
+
+@timed_async(REDIS_SECONDS, operation="patch_cache_bytes")
+@guarded(fallback=False)
+async def patch_cache_bytes(key: str, offset: int, value: bytes, ttl: int) -> bool:
+    """Overwrite bytes of an existing value in place, returning False if it is gone."""
+    return bool(await redis_bytes_client.eval(PATCH_SCRIPT, 1, key, offset, value, ttl))
+
+
+@timed_async(REDIS_SECONDS, operation="get_cache_list")
+@guarded(fallback=list)
+async def get_cache_list(key: str) -> List[str]:
+    """Return a whole list of JSON values, newest entry first."""
+    return [decompress_value(entry) for entry in await redis_bytes_client.lrange(key, 0, -1)]
+
+
+@guarded()
+def update_json(key: str, update: Callable[[Dict[str, Any]], T], ttl: int) -> Optional[T]:
+    """
+    Apply `update` to a JSON document in place and return its result.
+
+    Blocking, for crawl threads. The document is read under WATCH and
+    written back in a MULTI transaction, which is retried with a fresh read
+    whenever another client changed the document in between, so concurrent
+    updates from several workers are never lost. A missing document is
+    passed as {}.
+    """
+
+    def apply(pipe: Any) -> T:
+        raw = pipe.get(key)
+        document = json.loads(raw) if raw else {}
+        result = update(document)
+        pipe.multi()
+        pipe.set(key, json.dumps(document), ex=ttl)
+        return result
+
+    with REDIS_SECONDS.time(operation="update_json"):
+        return redis_sync_client.transaction(apply, key, value_from_callable=True)
+
+
+# Deletes the lock only if it still holds our token, so a lock that expired
+# and was taken by another worker is never released by mistake.
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+@timed_async(REDIS_SECONDS, operation="acquire_lock")
+async def acquire_lock(key: str, ttl: int) -> Optional[str]:
+    """
+    Try to take a Redis lock, returning its token or None if it is held.
+
+    If Redis is unreachable the lock is granted, so callers degrade to
+    in-process locking instead of never refreshing.
+    """
+    token = uuid.uuid4().hex
+
+    @guarded(fallback=True)
+    async def take() -> bool:
+        return bool(await redis_client.set(f"lock:{key}", token, nx=True, ex=ttl))
+
+    return token if await take() else None
+
+
+@timed_async(REDIS_SECONDS, operation="release_lock")
+@guarded()
+async def release_lock(key: str, token: str):
+    await redis_client.eval(RELEASE_LOCK_SCRIPT, 1, f"lock:{key}", token)
+
+
+@timed_async(REDIS_SECONDS, operation="is_locked")
+@guarded(fallback=False)
+async def is_locked(key: str) -> bool:
+    return bool(await redis_client.exists(f"lock:{key}"))
+
+
+@timed_async(REDIS_SECONDS, operation="publish_message")
+@guarded()
+async def publish_message(channel: str, message: str):
+    await redis_client.publish(channel, message)
+
+
+async def subscribe(channel: str) -> AsyncIterator[Optional[str]]:
+    """
+    Yield the messages published on a channel.
+
+    None is yielded once the subscription is confirmed. Unlike the other
+    helpers this raises on Redis errors, so the caller knows that messages
+    may have been missed. The subscription holds its own connection, which
+    is not subject to the socket timeout.
+    """
+    client = redis.Redis(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        db=REDIS_DB,
+        decode_responses=True,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+    )
+    pubsub = client.pubsub()
+    try:
+        await pubsub.subscribe(channel)
+        async for message in pubsub.listen():
+            if message["type"] == "subscribe":
+                yield None
+            elif message["type"] == "message":
+                yield message["data"]
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
@@ -0,0 +1,173 @@
+from typing import Dict, List, Optional
+
+from app.services.redis_cache import guarded, redis_client
+from app.utils.metrics import REDIS_SECONDS, timed_async
+
+# Pending jobs are JSON documents with an "id" field, pushed on the left of a
+# list and claimed from the right. A claimed job is kept by id in a hash and
+# its lease deadline in a sorted set, so it can be requeued if the worker
+# that claimed it stops heartbeating.
+CLAIM_SCRIPT = """
+local job = redis.call("rpop", KEYS[1])
+if not job then
+    return false
+end
+local id = cjson.decode(job)["id"]
+redis.call("hset", KEYS[3], id, job)
+redis.call("zadd", KEYS[2], ARGV[1], id)
+return job
+"""
+
+# Extends a lease, but only if the job is still leased: once it has been
+# requeued, the lease belongs to whichever worker claims it next.
+RENEW_SCRIPT = """
+if redis.call("zscore", KEYS[1], ARGV[1]) then
+    redis.call("zadd", KEYS[1], ARGV[2], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+# Moves jobs whose lease ran out back to the front of the queue, counting
+# the lost lease as an attempt.
+REQUEUE_SCRIPT = """
+local ids = redis.call("zrangebyscore", KEYS[1], "-inf", ARGV[1])
+for _, id in ipairs(ids) do
+    local job = redis.call("hget", KEYS[2], id)
+    redis.call("zrem", KEYS[1], id)
+    redis.call("hdel", KEYS[2], id)
+    if job then
+        local data = cjson.decode(job)
+        data["attempts"] = data["attempts"] + 1
+        redis.call("rpush", KEYS[3], cjson.encode(data))
+    end
+end
+return #ids
+"""
+
+# Drops a lease and, if it was still held, optionally pushes a job (a retry
+# or a dead letter) onto a list capped at ARGV[3] entries (0: uncapped).
+RELEASE_SCRIPT = """
+local held = redis.call("zrem", KEYS[1], ARGV[1])
+redis.call("hdel", KEYS[2], ARGV[1])
+if held == 1 and ARGV[2] ~= "" then
+    redis.call("lpush", KEYS[3], ARGV[2])
+    if tonumber(ARGV[3]) > 0 then
+        redis.call("ltrim", KEYS[3], 0, tonumber(ARGV[3]) - 1)
+    end
+end
+return held
+"""
+
+# Stores one part's result once, enqueues the jobs it spawned and returns
+# how many parts of the run are still outstanding, or -1 if the part had
+# already been completed (by a worker whose lease had run out).
+COMPLETE_PART_SCRIPT = """
+if redis.call("hsetnx", KEYS[1], ARGV[1], ARGV[2]) == 0 then
+    return -1
+end
+for i = 4, #ARGV do
+    redis.call("lpush", KEYS[3], ARGV[i])
+end
+redis.call("expire", KEYS[1], ARGV[3])
+local remaining = redis.call("incrby", KEYS[2], #ARGV - 4)
+redis.call("expire", KEYS[2], ARGV[3])
+return remaining
+"""
+
+
+@timed_async(REDIS_SECONDS, operation="start_job_run")
+@guarded(fallback=False)
+async def start_job_run(queue: str, job: str, counter: str, ttl: int) -> bool:
+    """Enqueue the first job of a run whose outstanding parts are counted in `counter`."""
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.set(counter, 1, ex=ttl)
+        pipe.lpush(queue, job)
+        await pipe.execute()
+    return True
+
+
+@timed_async(REDIS_SECONDS, operation="claim_job")
+@guarded()
+async def claim_job(queue: str, leases: str, jobs: str, lease_until: float) -> Optional[str]:
+    """Pop the oldest pending job and lease it until `lease_until`."""
+    return await redis_client.eval(CLAIM_SCRIPT, 3, queue, leases, jobs, lease_until)
+
+
+@timed_async(REDIS_SECONDS, operation="renew_job_lease")
+@guarded(fallback=False)
+async def renew_job_lease(leases: str, job_id: str, lease_until: float) -> bool:
+    """Extend a job's lease, returning False if it is no longer leased."""
+    return bool(await redis_client.eval(RENEW_SCRIPT, 1, leases, job_id, lease_until))
+
+
+@timed_async(REDIS_SECONDS, operation="requeue_expired_jobs")
+@guarded(fallback=0)
+async def requeue_expired_jobs(leases: str, jobs: str, queue: str, now: float) -> int:
+    """Requeue every job whose lease expired before `now`."""
+    return int(await redis_client.eval(REQUEUE_SCRIPT, 3, leases, jobs, queue, now))
+
+
+@timed_async(REDIS_SECONDS, operation="release_job")
+@guarded(fallback=False)
+async def release_job(
+    leases: str,
+    jobs: str,
+    job_id: str,
+    target: str = "",
+    job: str = "",
+    max_length: int = 0,
+) -> bool:
+    """Drop a job's lease, pushing `job` onto `target` if the lease was still held."""
+    return bool(
+        await redis_client.eval(
+            RELEASE_SCRIPT, 3, leases, jobs, target or leases, job_id, job, max_length
+        )
+    )
+
+
+@timed_async(REDIS_SECONDS, operation="complete_job_part")
+@guarded()
+async def complete_job_part(
+    results: str,
+    counter: str,
+    queue: str,
+    part: int,
+    data: str,
+    children: List[str],
+    ttl: int,
+) -> Optional[int]:
+    """
+    Record a part's result and enqueue its child jobs atomically.
+
+    Returns the number of parts still outstanding, -1 if the part was already
+    recorded, or None if Redis could not be reached.
+    """
+    return int(
+        await redis_client.eval(
+            COMPLETE_PART_SCRIPT, 3, results, counter, queue, part, data, ttl, *children
+        )
+    )
+
+
+@timed_async(REDIS_SECONDS, operation="pop_job_results")
+@guarded()
+async def pop_job_results(results: str, counter: str) -> Optional[Dict[str, str]]:
+    """Read and delete every part result of a finished run."""
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.hgetall(results)
+        pipe.delete(results, counter)
+        parts, _ = await pipe.execute()
+    return parts
+
+
+@timed_async(REDIS_SECONDS, operation="queue_lengths")
+@guarded()
+async def queue_lengths(queue: str, leases: str, dead: str) -> Optional[Dict[str, int]]:
+    """Return the number of pending, leased and dead jobs."""
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.llen(queue)
+        pipe.zcard(leases)
+        pipe.llen(dead)
+        pending, leased, failed = await pipe.execute()
+    return {"pending": pending, "leased": leased, "dead": failed}
@@ -0,0 +1,173 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from app.utils.logger import logger
+
+if TYPE_CHECKING:
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.remote.webdriver import WebDriver
+
+DRIVER_HEADLESS = os.environ.get("DRIVER_HEADLESS", "true").lower() == "true"
+RENDER_PAGE_LOAD_STRATEGY = os.environ.get("RENDER_PAGE_LOAD_STRATEGY", "eager")
+RENDER_WINDOW_SIZE = os.environ.get("RENDER_WINDOW_SIZE", "1280,800")
+RENDER_BLOCKING = os.environ.get("RENDER_BLOCKING", "true").lower() == "true"
+RENDER_BLOCK_TYPES = os.environ.get("RENDER_BLOCK_TYPES", "image,media,font")
+RENDER_BLOCK_URLS = os.environ.get(
+    "RENDER_BLOCK_URLS",
+    "*doubleclick.net*,*googlesyndication.com*,*google-analytics.com*,"
+    "*googletagmanager.com*,*amazon-adsystem.com*,*facebook.net*,*hotjar.com*,"
+    "*criteo.com*,*scorecardresearch.com*,*tiktok.com*,*pinterest.com*",
+)
+
+# Chrome's Network.setBlockedURLs matches URLs, not resource types, so each
+# blockable type maps to the URL patterns of its usual file extensions.
+RESOURCE_TYPE_PATTERNS: Dict[str, Tuple[str, ...]] = {
+    "image": ("*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.avif*", "*.ico*"),
+    "media": ("*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*"),
+    "font": ("*.woff*", "*.woff2*", "*.ttf*", "*.otf*"),
+    "stylesheet": ("*.css*",),
+}
+
+# Sums what the page reports as transferred through the Resource Timing API.
+# Cross-origin resources without Timing-Allow-Origin report 0, so this is a
+# lower bound, but it is consistent between profiles.
+TRANSFERRED_BYTES_SCRIPT = """
+return performance.getEntriesByType("navigation")
+    .concat(performance.getEntriesByType("resource"))
+    .reduce((total, entry) => total + (entry.transferSize || 0), 0);
+"""
+
+
+class RenderingProfile(NamedTuple):
+    """How a browser session loads pages for a store."""
+
+    headless: bool
+    page_load_strategy: str
+    window_size: str
+    blocked_urls: Tuple[str, ...]
+
+
+def _split(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def rendering_profile(store: Optional[str] = None) -> RenderingProfile:
+    """
+    Return the rendering profile of a store, or the shared default profile.
+
+    Blocked resource types and URL patterns can be overridden per store as
+    e.g. `ZARA_RENDER_BLOCK_TYPES` and `ZARA_RENDER_BLOCK_URLS`.
+    """
+    prefix = f"{store.upper()}_" if store else ""
+    blocking = (
+        os.environ.get(f"{prefix}RENDER_BLOCKING", str(RENDER_BLOCKING)).lower() == "true"
+    )
+
+    blocked_urls: List[str] = []
+    if blocking:
+        for resource_type in _split(
+            os.environ.get(f"{prefix}RENDER_BLOCK_TYPES", RENDER_BLOCK_TYPES)
+        ):
+            blocked_urls.extend(RESOURCE_TYPE_PATTERNS.get(resource_type.lower(), ()))
+        blocked_urls.extend(
+            _split(os.environ.get(f"{prefix}RENDER_BLOCK_URLS", RENDER_BLOCK_URLS))
+        )
+
+    return RenderingProfile(
+        headless=DRIVER_HEADLESS,
+        page_load_strategy=RENDER_PAGE_LOAD_STRATEGY,
+        window_size=RENDER_WINDOW_SIZE,
+        blocked_urls=tuple(blocked_urls),
+    )
+
+
+def chrome_options(profile: RenderingProfile) -> "Options":
+    """
+    Build Chrome options for a profile.
+
+    These are fixed when a session starts, so pooled sessions share the
+    default profile's launch options; per-store blocking is applied to a
+    session on every lease by `render_session()`.
+    """
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    if profile.headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-extensions")
+    options.add_argument(f"--window-size={profile.window_size}")
+    options.page_load_strategy = profile.page_load_strategy
+    if any(pattern in profile.blocked_urls for pattern in RESOURCE_TYPE_PATTERNS["image"]):
+        options.add_argument("--blink-settings=imagesEnabled=false")
+    return options
+
+
+def apply_blocking(driver: "WebDriver", profile: RenderingProfile) -> bool:
+    """Block a profile's URL patterns in a session through the DevTools protocol."""
+    if not hasattr(driver, "execute_cdp_cmd"):
+        return False
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd(
+            "Network.setBlockedURLs", {"urls": list(profile.blocked_urls)}
+        )
+        return True
+    except Exception as e:
+        logger.warning(f"Error applying request blocking: {e}")
+        return False
+
+
+class RenderStats:
+    """Per-store page render times and transferred bytes."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stores: Dict[str, Dict[str, float]] = {}
+
+    def record(self, store: str, seconds: float, transferred: int) -> None:
+        with self._lock:
+            stats = self._stores.setdefault(
+                store, {"renders": 0, "seconds_total": 0.0, "bytes_total": 0}
+            )
+            stats["renders"] += 1
+            stats["seconds_total"] += seconds
+            stats["bytes_total"] += transferred
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                store: {
+                    "renders": stats["renders"],
+                    "seconds_total": round(stats["seconds_total"], 4),
+                    "seconds_avg": round(stats["seconds_total"] / stats["renders"], 4),
+                    "bytes_total": stats["bytes_total"],
+                    "bytes_avg": round(stats["bytes_total"] / stats["renders"]),
+                }
+                for store, stats in self._stores.items()
+            }
+
+
+render_stats = RenderStats()
+
+
+@contextmanager
+def render_session(driver: "WebDriver", store: str) -> Iterator["WebDriver"]:
+    """
+    Apply a store's rendering profile to a leased session and measure the
+    pages rendered inside the `with` block.
+    """
+    apply_blocking(driver, rendering_profile(store))
+    start = time.perf_counter()
+    yield driver
+
+    try:
+        transferred = int(driver.execute_script(TRANSFERRED_BYTES_SCRIPT) or 0)
+    except Exception:
+        transferred = 0
+    render_stats.record(store, time.perf_counter() - start, transferred)
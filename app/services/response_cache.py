@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import threading
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from app.services.local_cache import LocalCache, local_cache
+from app.services.snapshot import FIELDS
+
+# How long clients and proxies may reuse a page without revalidating it.
+RESPONSE_CACHE_MAX_AGE = int(os.environ.get("RESPONSE_CACHE_MAX_AGE", "30"))
+# How many of the most requested first pages are rendered again as soon as
+# a snapshot they include is published (0: none).
+RESPONSE_PRECOMPUTE_PAGES = int(os.environ.get("RESPONSE_PRECOMPUTE_PAGES", "20"))
+# Distinct queries whose popularity is tracked; the least requested half is
+# forgotten when the limit is reached.
+RESPONSE_TRACKED_QUERIES = int(os.environ.get("RESPONSE_TRACKED_QUERIES", "1000"))
+
+
+class PageKey(NamedTuple):
+    """A normalised product listing query."""
+
+    stores: Tuple[str, ...]
+    category: Optional[str]
+    min_discount: Optional[float]
+    sort: Optional[str]
+    start: int
+    end: int
+
+    @classmethod
+    def of(
+        cls,
+        stores: List[str],
+        category: Optional[str],
+        min_discount: Optional[float],
+        sort: Optional[str],
+        start: int,
+        end: int,
+    ) -> "PageKey":
+        return cls(
+            tuple(stores),
+            category.lower() if category else None,
+            float(min_discount) if min_discount is not None else None,
+            sort,
+            start,
+            end,
+        )
+
+
+class CachedPage(NamedTuple):
+    """A rendered page of products, ready to be sent as is."""
+
+    body: bytes
+    total: int
+
+
+Versions = Tuple[Tuple[str, int], ...]
+
+
+def page_versions(versions: Dict[str, int]) -> Versions:
+    return tuple(sorted(versions.items()))
+
+
+def page_etag(key: PageKey, versions: Dict[str, int]) -> str:
+    """Return the ETag of a page: it changes only when the query or a snapshot does."""
+    digest = hashlib.sha1(
+        json.dumps([page_versions(versions), key]).encode("utf-8")
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def encode_records(records: List[Dict[str, Any]]) -> bytes:
+    """
+    Encode snapshot records as the JSON list of products the API returns.
+
+    Fields missing from rows cached before they were added are sent as null.
+    """
+    return json.dumps(
+        [{field: record.get(field) for field in FIELDS} for record in records],
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class PageCache:
+    """
+    Rendered product pages in the in-process cache, tagged with the snapshot
+    versions they were rendered from, and how often each query is asked.
+    """
+
+    def __init__(
+        self, cache: LocalCache = local_cache, tracked: int = RESPONSE_TRACKED_QUERIES
+    ) -> None:
+        self.cache = cache
+        self.tracked = tracked
+        self._requests: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def get(self, key: PageKey, versions: Dict[str, int]) -> Optional[CachedPage]:
+        with self._lock:
+            self._requests[key] += 1
+            if len(self._requests) > self.tracked:
+                self._requests = Counter(dict(self._requests.most_common(self.tracked // 2)))
+        return self.cache.get(("page", key), page_versions(versions), kind="page")
+
+    def put(self, key: PageKey, versions: Dict[str, int], page: CachedPage) -> None:
+        self.cache.put(("page", key), page_versions(versions), page, len(page.body))
+
+    def popular(self, store: str, count: int = RESPONSE_PRECOMPUTE_PAGES) -> List[PageKey]:
+        """Return the most requested first pages that include a store."""
+        with self._lock:
+            ranked = self._requests.most_common()
+        return [
+            key for key, _ in ranked if key.start == 0 and store in key.stores
+        ][:count]
+
+
+page_cache = PageCache()
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import random
+import time
+from typing import Dict, List, Optional
+
+from app.services.driver_pool import close_driver_pool
+from app.services.executor import shutdown_executor
+from app.services.fetchers import close_http_fetcher
+from app.services.price_history import price_history
+from app.services.store_cache import get_fetched_at, refresh_now
+from app.services.stores import Store, store_mapping
+from app.utils.logger import logger
+
+# "app" runs the scheduler inside the API process, "external" expects a
+# separate `python -m app.services.scheduler` worker, and "off" crawls on
+# demand from the API request path.
+CRAWL_SCHEDULER = os.environ.get("CRAWL_SCHEDULER", "app").lower()
+API_READ_ONLY = CRAWL_SCHEDULER != "off"
+
+CRAWL_JITTER = float(os.environ.get("CRAWL_JITTER", "60"))
+CRAWL_MAX_RETRIES = int(os.environ.get("CRAWL_MAX_RETRIES", "3"))
+CRAWL_BACKOFF_BASE = float(os.environ.get("CRAWL_BACKOFF_BASE", "5"))
+CRAWL_BACKOFF_MAX = float(os.environ.get("CRAWL_BACKOFF_MAX", "300"))
+
+
+class CrawlScheduler:
+    """
+    Re-crawls every store on its own interval and publishes fresh snapshots.
+
+    Each store runs in its own task. Failed crawls are retried with
+    exponential backoff; if every retry fails the previous snapshot is kept
+    and the store is tried again on its next interval.
+    """
+
+    def __init__(
+        self,
+        stores: Optional[List[Store]] = None,
+        jitter: float = CRAWL_JITTER,
+        max_retries: int = CRAWL_MAX_RETRIES,
+        backoff_base: float = CRAWL_BACKOFF_BASE,
+        backoff_max: float = CRAWL_BACKOFF_MAX,
+    ) -> None:
+        self.stores = stores if stores is not None else list(store_mapping.values())
+        self.jitter = jitter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def start(self) -> None:
+        for store in self.stores:
+            if store.name not in self._tasks:
+                self._tasks[store.name] = asyncio.create_task(
+                    self._run_store(store), name=f"crawl-{store.name}"
+                )
+        logger.info(f"Crawl scheduler started for {', '.join(self._tasks)}")
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def crawl(self, store: Store) -> bool:
+        """Crawl one store with retries, returning True if a snapshot was published."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                products = await refresh_now(store.cache_key, store.refresh)
+                if products is None:
+                    logger.info(f"Skipping {store.name} crawl, another worker holds the lock")
+                    return False
+                logger.info(f"Published {len(products)} {store.name} products")
+                return True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Crawl for {store.name} failed, keeping last snapshot: {e}")
+                    return False
+                delay = self._backoff(attempt)
+                logger.warning(
+                    f"Crawl for {store.name} failed (attempt {attempt + 1}), "
+                    f"retrying in {delay:.1f}s: {e}"
+                )
+                await asyncio.sleep(delay)
+        return False
+
+    async def _run_store(self, store: Store) -> None:
+        await asyncio.sleep(await self._initial_delay(store))
+        while True:
+            await self.crawl(store)
+            await asyncio.sleep(self._next_delay(store))
+
+    async def _initial_delay(self, store: Store) -> float:
+        """Wait out the rest of the interval if the cached snapshot is still recent."""
+        fetched_at = await get_fetched_at(store.cache_key)
+        if fetched_at is None:
+            return 0.0
+        remaining = max(0.0, store.crawl_interval - (time.time() - fetched_at))
+        return remaining + random.uniform(0, self.jitter)
+
+    def _next_delay(self, store: Store) -> float:
+        return max(0.0, store.crawl_interval + random.uniform(-self.jitter, self.jitter))
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        return delay * random.uniform(0.5, 1.5)
+
+
+async def run_forever() -> None:
+    """Run the scheduler until cancelled."""
+    scheduler = CrawlScheduler()
+    scheduler.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await scheduler.stop()
+
+
+def main() -> None:
+    """Run the crawl scheduler as a standalone worker process."""
+    try:
+        asyncio.run(run_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutdown_executor()
+        close_driver_pool()
+        close_http_fetcher()
+        price_history.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Compact, versioned binary encoding for a store's cached product list.
+
+Layout (little-endian):
+
+    header    magic, format version, snapshot version, fetched_at,
+              item count, metadata length
+    metadata  discount_percent column   count x float64
+              price column              count x float64
+              category id column        count x uint16
+              row offsets               (count + 1) x uint32
+              schema                    JSON {"fields": [...], "categories": [...],
+                                              "names": [...], "currencies": [...]}
+    rows      one compact JSON array per product, in schema field order
+
+Everything a filter or sort needs lives in the metadata, so queries can be answered
+without decoding any row, and only the rows on the requested page are ever
+turned into dicts. Because the metadata comes first, a reader can fetch it
+with a ranged read and then fetch just the rows it needs.
+"""
+
+import json
+import struct
+import sys
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.models.product import Product
+from app.services.pricing import amount
+
+MAGIC = b"PSNP"
+FORMAT_VERSION = 2
+
+HEADER = struct.Struct("<4sBQdII")
+
+# fetched_at can be rewritten in place without touching the rest of a snapshot.
+FETCHED_AT = struct.Struct("<d")
+FETCHED_AT_OFFSET = struct.calcsize("<4sBQ")
+
+FIELDS: Tuple[str, ...] = tuple(Product.model_fields)
+
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+class SnapshotFormatError(ValueError):
+    """Raised when bytes are not a snapshot this code can read."""
+
+
+def _pack(typecode: str, values: Iterable) -> bytes:
+    column = array(typecode, values)
+    if _BIG_ENDIAN:
+        column.byteswap()
+    return column.tobytes()
+
+
+def _unpack(typecode: str, data: bytes) -> array:
+    column = array(typecode)
+    column.frombytes(data)
+    if _BIG_ENDIAN:
+        column.byteswap()
+    return column
+
+
+def encode_snapshot(
+    products: Sequence[Product], version: int, fetched_at: float
+) -> bytes:
+    """Encode products into a snapshot blob."""
+    categories: List[str] = []
+    category_ids: Dict[str, int] = {}
+    rows = []
+    offsets = [0]
+
+    for product in products:
+        data = product.model_dump()
+        if data["category"] not in category_ids:
+            category_ids[data["category"]] = len(categories)
+            categories.append(data["category"])
+        row = json.dumps(
+            [data[field] for field in FIELDS],
+            separators=(",", ":"),
+            ensure_ascii=False,
+            default=str,
+        ).encode("utf-8")
+        rows.append(row)
+        offsets.append(offsets[-1] + len(row))
+
+    schema = json.dumps(
+        {
+            "fields": FIELDS,
+            "categories": categories,
+            "names": [p.name.casefold() for p in products],
+            "currencies": [p.currency or "" for p in products],
+        },
+        separators=(",", ":"),
+        ensure_ascii=False,
+    ).encode("utf-8")
+    metadata = b"".join(
+        [
+            _pack("d", (p.discount_percent for p in products)),
+            _pack(
+                "d",
+                (
+                    amount(p.discounted_price_minor, p.currency, p.discounted_price)
+                    for p in products
+                ),
+            ),
+            _pack("H", (category_ids[p.category] for p in products)),
+            _pack("I", offsets),
+            schema,
+        ]
+    )
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, version, fetched_at, len(products), len(metadata)
+    )
+    return header + metadata + b"".join(rows)
+
+
+def touch_snapshot(data: bytes, fetched_at: float) -> bytes:
+    """Return a copy of a snapshot blob with a new fetched_at."""
+    patched = bytearray(data)
+    FETCHED_AT.pack_into(patched, FETCHED_AT_OFFSET, fetched_at)
+    return bytes(patched)
+
+
+def is_snapshot(data: Optional[bytes]) -> bool:
+    return bool(data) and data[:4] == MAGIC
+
+
+class Snapshot:
+    """
+    A decoded snapshot header and metadata, with rows decoded on demand.
+
+    `prefix` may be just the leading metadata bytes of a snapshot. Rows are
+    then not available locally, and `record()` needs the row bytes passed in
+    by the caller (see `row_span()`).
+    """
+
+    def __init__(self, prefix: bytes) -> None:
+        if not is_snapshot(prefix) or len(prefix) < HEADER.size:
+            raise SnapshotFormatError("not a product snapshot")
+
+        (
+            _,
+            format_version,
+            self.version,
+            self.fetched_at,
+            self.count,
+            metadata_length,
+        ) = HEADER.unpack_from(prefix)
+        if format_version != FORMAT_VERSION:
+            raise SnapshotFormatError(f"unsupported snapshot format {format_version}")
+
+        self.rows_start = HEADER.size + metadata_length
+        if len(prefix) < self.rows_start:
+            raise SnapshotFormatError("truncated snapshot metadata")
+
+        position = HEADER.size
+        count = self.count
+        self.discounts = _unpack("d", prefix[position : position + 8 * count])
+        position += 8 * count
+        self.prices = _unpack("d", prefix[position : position + 8 * count])
+        position += 8 * count
+        self.category_ids = _unpack("H", prefix[position : position + 2 * count])
+        position += 2 * count
+        self.offsets = _unpack("I", prefix[position : position + 4 * (count + 1)])
+        position += 4 * (count + 1)
+
+        schema = json.loads(prefix[position : self.rows_start])
+        self.fields: Tuple[str, ...] = tuple(schema["fields"])
+        self.categories: List[str] = schema["categories"]
+        self.names: List[str] = schema["names"]
+        # Prices are only comparable within one currency. Snapshots written
+        # before the column was added read as having none.
+        self.currencies: List[str] = schema.get("currencies") or [""] * count
+
+        self._data = prefix
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Snapshot":
+        return cls(data)
+
+    @staticmethod
+    def metadata_length(prefix: bytes) -> int:
+        """Return how many leading bytes are needed to decode the metadata."""
+        if not is_snapshot(prefix) or len(prefix) < HEADER.size:
+            raise SnapshotFormatError("not a product snapshot")
+        return HEADER.size + HEADER.unpack_from(prefix)[5]
+
+    @staticmethod
+    def version_of(prefix: bytes) -> Optional[int]:
+        """Return the snapshot version from the first HEADER.size bytes."""
+        if not is_snapshot(prefix) or len(prefix) < HEADER.size:
+            return None
+        return HEADER.unpack_from(prefix)[2]
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def size(self) -> int:
+        """Bytes of the snapshot held in memory."""
+        return len(self._data)
+
+    @property
+    def has_rows(self) -> bool:
+        return len(self._data) >= self.rows_start + self.offsets[-1]
+
+    def category(self, index: int) -> str:
+        return self.categories[self.category_ids[index]]
+
+    def row_span(self, index: int) -> Tuple[int, int]:
+        """Return the absolute [start, end) byte range of a row in the blob."""
+        return (
+            self.rows_start + self.offsets[index],
+            self.rows_start + self.offsets[index + 1],
+        )
+
+    def record(self, index: int, row: Optional[bytes] = None) -> Dict[str, Any]:
+        """Decode a single row into a plain dict."""
+        if row is None:
+            if not self.has_rows:
+                raise SnapshotFormatError("snapshot rows were not loaded")
+            start, end = self.row_span(index)
+            row = self._data[start:end]
+        return dict(zip(self.fields, json.loads(row)))
+
+    def records(self, indices: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        """Decode the given rows (all rows by default) into plain dicts."""
+        if indices is None:
+            indices = range(self.count)
+        return [self.record(i) for i in indices]
+
+    def products(self, indices: Optional[Iterable[int]] = None) -> List[Product]:
+        """Decode the given rows (all rows by default) into Product objects."""
+        return [Product(**record) for record in self.records(indices)]
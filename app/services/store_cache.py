@@ -0,0 +1,526 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from app.models.product import Product
+from app.services.deltas import diff_products
+from app.services.local_cache import SNAPSHOT_CHANNEL, local_cache, snapshot_versions
+from app.services.price_history import price_history
+from app.services.product_index import ProductIndex
+from app.services.redis_cache import (
+    acquire_lock,
+    get_cache_bytes,
+    get_cache_bytes_many,
+    get_cache_list,
+    get_cache_prefixes,
+    get_cache_ranges,
+    is_locked,
+    patch_cache_bytes,
+    publish_message,
+    release_lock,
+    set_cache_bytes_many,
+)
+from app.services.snapshot import (
+    FETCHED_AT,
+    FETCHED_AT_OFFSET,
+    HEADER,
+    Snapshot,
+    SnapshotFormatError,
+    encode_snapshot,
+    is_snapshot,
+    touch_snapshot,
+)
+from app.utils.logger import logger
+from app.utils.metrics import CACHE_REQUESTS, CACHE_WRITE_SECONDS
+
+CACHE_SOFT_TTL = int(os.environ.get("CACHE_SOFT_TTL", "3600"))
+CACHE_HARD_TTL = int(os.environ.get("CACHE_HARD_TTL", "86400"))
+CACHE_LOCK_TTL = int(os.environ.get("CACHE_LOCK_TTL", "300"))
+CACHE_WAIT_INTERVAL = float(os.environ.get("CACHE_WAIT_INTERVAL", "0.5"))
+SNAPSHOT_PREFETCH = int(os.environ.get("SNAPSHOT_PREFETCH", "65536"))
+SNAPSHOT_RETENTION = int(os.environ.get("SNAPSHOT_RETENTION", "3600"))
+CHANGES_RETENTION = int(os.environ.get("CHANGES_RETENTION", "100"))
+
+Refresh = Callable[[], Awaitable[List[Product]]]
+
+EMPTY_SNAPSHOT = Snapshot.from_bytes(encode_snapshot([], version=0, fetched_at=0.0))
+
+_inflight: Dict[str, "asyncio.Task[Snapshot]"] = {}
+_background: Set["asyncio.Task[Snapshot]"] = set()
+
+
+class EmptyCrawlError(Exception):
+    """Raised when a crawl returns no products, so the last snapshot is kept."""
+
+
+class SnapshotChangedError(Exception):
+    """Raised when a snapshot is replaced between reading its metadata and its rows."""
+
+
+def version_key(key: str, version: int) -> str:
+    """Return the key under which a specific snapshot version is retained."""
+    return f"{key}:v:{version}"
+
+
+def changes_key(key: str) -> str:
+    """Return the key of a store's feed of published deltas."""
+    return f"{key}:changes"
+
+
+def _decode(data: Optional[bytes]) -> Optional[Snapshot]:
+    """Decode a cache entry, including JSON entries written before snapshots."""
+    if not data:
+        return None
+    if is_snapshot(data):
+        try:
+            return Snapshot.from_bytes(data)
+        except SnapshotFormatError as e:
+            # Snapshots in an older format are treated as missing and re-crawled.
+            logger.warning(f"Ignoring cached snapshot: {e}")
+            return None
+
+    legacy = json.loads(data)
+    if isinstance(legacy, list):
+        legacy = {"fetched_at": 0.0, "products": legacy}
+    products = [Product(**p) for p in legacy["products"]]
+    return Snapshot.from_bytes(
+        encode_snapshot(products, legacy.get("version", 0), legacy["fetched_at"])
+    )
+
+
+async def publish(key: str, products: List[Product]) -> Snapshot:
+    """
+    Publish a new snapshot of a store's products.
+
+    The crawl is compared with the current snapshot product by product.
+    If nothing was added, changed or removed, the current snapshot is kept
+    and only its fetched_at and expiry are renewed in place, so its version,
+    the indexes built on it and any cursors into it stay valid.
+
+    Otherwise the snapshot replaces the current one with a single SETEX, so
+    readers see either the previous snapshot or the new one, never a mix. A
+    copy is also kept under its version key for SNAPSHOT_RETENTION seconds
+    so that cursors issued against it stay valid after the next publish, and
+    the delta is appended to the store's changes feed.
+
+    Either way the crawl is queued for the price history. If the snapshot
+    could not be written, e.g. while Redis is down, it is still returned but
+    neither announced to other processes nor recorded in the price history.
+    """
+    with CACHE_WRITE_SECONDS.time(key=key):
+        snapshot, written = await _publish(key, products)
+    if written:
+        price_history.record(products, snapshot.fetched_at)
+    return snapshot
+
+
+async def _publish(key: str, products: List[Product]) -> Tuple[Snapshot, bool]:
+    now = time.time()
+    data = await get_cache_bytes(key)
+    previous = _decode(data)
+    delta = diff_products(previous.products() if previous is not None else [], products)
+
+    if previous is not None and previous.version and delta.empty:
+        fetched_at = FETCHED_AT.pack(now)
+        if await patch_cache_bytes(key, FETCHED_AT_OFFSET, fetched_at, CACHE_HARD_TTL):
+            await patch_cache_bytes(
+                version_key(key, previous.version),
+                FETCHED_AT_OFFSET,
+                fetched_at,
+                SNAPSHOT_RETENTION,
+            )
+            await _announce(key, previous.version, now)
+            return Snapshot.from_bytes(touch_snapshot(data, now)), True
+
+    snapshot_version = time.time_ns()
+    data = encode_snapshot(products, version=snapshot_version, fetched_at=now)
+    entry = {
+        "version": snapshot_version,
+        "previous_version": previous.version if previous is not None else None,
+        "published_at": now,
+        "added": [p.model_dump() for p in delta.added],
+        "changed": [p.model_dump() for p in delta.changed],
+        "removed": [p.model_dump() for p in delta.removed],
+    }
+    # The snapshot, its versioned copy and its delta are written in one
+    # transaction, so the changes feed always matches the current snapshot.
+    written = await set_cache_bytes_many(
+        [
+            (key, data, CACHE_HARD_TTL),
+            (version_key(key, snapshot_version), data, SNAPSHOT_RETENTION),
+        ],
+        append=(
+            changes_key(key),
+            json.dumps(entry, default=str),
+            CHANGES_RETENTION,
+            CACHE_HARD_TTL,
+        ),
+    )
+    if not written:
+        logger.warning(f"Could not write {key} v{snapshot_version}, not publishing it")
+        return Snapshot.from_bytes(data), False
+    await _announce(key, snapshot_version, now)
+    logger.info(
+        f"Published {key} v{snapshot_version}: {len(delta.added)} added, "
+        f"{len(delta.changed)} changed, {len(delta.removed)} removed"
+    )
+    return Snapshot.from_bytes(data), True
+
+
+async def _announce(key: str, version: int, fetched_at: float):
+    """Tell every API process that a key's snapshot was (re)published."""
+    await publish_message(
+        SNAPSHOT_CHANNEL,
+        json.dumps({"key": key, "version": version, "fetched_at": fetched_at}),
+    )
+
+
+async def read_changes(key: str, since: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    Return the deltas published for a key after version `since`, oldest first.
+
+    Returns None if the retained feed no longer reaches back to `since`, in
+    which case the consumer has to re-sync from a full export.
+    """
+    prefixes = await get_cache_prefixes([key], HEADER.size)
+    current = Snapshot.version_of(prefixes[0]) if prefixes else None
+    entries = [json.loads(entry) for entry in reversed(await get_cache_list(changes_key(key)))]
+    newer = [entry for entry in entries if entry["version"] > since]
+
+    if current is None or current <= since:
+        return newer
+    if not newer or newer[-1]["version"] != current:
+        return None
+    first = newer[0]["previous_version"]
+    if first is not None and first > since:
+        return None
+    return newer
+
+
+async def read_snapshot(key: str) -> Optional[Snapshot]:
+    """Read a whole snapshot, rows included."""
+    return _decode(await get_cache_bytes(key))
+
+
+async def read_current_snapshots(keys: List[str]) -> List[Optional[Snapshot]]:
+    """
+    Read whole snapshots of several keys in one MGET round trip, serving
+    those the snapshot pub/sub channel confirms are current from the
+    in-process cache.
+    """
+    snapshots: Dict[str, Optional[Snapshot]] = {}
+    if local_cache.enabled:
+        for key in keys:
+            version = snapshot_versions.get(key)
+            if version is not None:
+                cached = local_cache.get(("snapshot", key), version, kind="snapshot")
+                if cached is not None:
+                    snapshots[key] = cached
+
+    missing = [key for key in keys if key not in snapshots]
+    if missing:
+        generation = snapshot_versions.generation
+        values = await get_cache_bytes_many(missing) or [None] * len(missing)
+        for key, data in zip(missing, values):
+            snapshot = snapshots[key] = _decode(data)
+            if snapshot is not None and local_cache.enabled:
+                snapshot_versions.seen(key, snapshot.version, generation)
+                if snapshot_versions.get(key) == snapshot.version:
+                    local_cache.put(
+                        ("snapshot", key), snapshot.version, snapshot, snapshot.size
+                    )
+    return [snapshots[key] for key in keys]
+
+
+async def read_current_snapshot(key: str) -> Optional[Snapshot]:
+    """Read a whole snapshot, from the in-process cache while it is current."""
+    return (await read_current_snapshots([key]))[0]
+
+
+async def read_snapshot_metadata(key: str) -> Optional[Snapshot]:
+    """
+    Read only a snapshot's header and metadata with ranged reads.
+
+    The first SNAPSHOT_PREFETCH bytes are read speculatively; small
+    snapshots therefore arrive whole in one round trip. Rows of larger
+    snapshots are fetched later, page by page, with `load_records()`.
+    """
+    chunks = await get_cache_ranges(key, [(0, SNAPSHOT_PREFETCH)])
+    if not chunks or not chunks[0]:
+        return None
+
+    prefix = chunks[0]
+    if not is_snapshot(prefix):
+        return await read_snapshot(key)
+
+    try:
+        needed = Snapshot.metadata_length(prefix)
+        if len(prefix) < needed:
+            rest = await get_cache_ranges(key, [(len(prefix), needed)])
+            if not rest:
+                return None
+            prefix += rest[0]
+        return Snapshot(prefix)
+    except SnapshotFormatError as e:
+        logger.warning(f"Ignoring cached snapshot: {e}")
+        return None
+
+
+async def sync_index(index: ProductIndex, keys: Dict[str, str]):
+    """
+    Bring an index up to date with the published snapshots of some stores.
+
+    `keys` maps store names to cache keys. Only snapshot headers are read
+    for stores whose version has not changed, so an unchanged catalog costs
+    one pipelined round trip and no rebuild, and none at all while the
+    snapshot channel reports the current versions.
+    """
+    names = list(keys)
+    # Stores whose current version is known from the snapshot channel need
+    # no Redis read at all unless it differs from the indexed one.
+    known = {name: snapshot_versions.get(keys[name]) for name in names}
+    changed = [
+        name
+        for name in names
+        if known[name] is not None and known[name] != index.version(name)
+    ]
+
+    unknown = [name for name in names if known[name] is None]
+    generation = snapshot_versions.generation
+    prefixes: Optional[List[bytes]] = []
+    if unknown:
+        prefixes = await get_cache_prefixes([keys[name] for name in unknown], HEADER.size)
+
+    for name, prefix in zip(unknown, prefixes or []):
+        version = Snapshot.version_of(prefix)
+        if version is None and prefix:
+            # A legacy JSON entry; read and convert it whole.
+            index.update(name, await read_snapshot(keys[name]))
+        elif version is None:
+            index.update(name, None)
+        else:
+            snapshot_versions.seen(keys[name], version, generation)
+            if version != index.version(name):
+                changed.append(name)
+
+    snapshots = await asyncio.gather(
+        *[read_snapshot_metadata(keys[name]) for name in changed]
+    )
+    for name, snapshot in zip(changed, snapshots):
+        index.update(name, snapshot)
+
+
+async def load_version(index: ProductIndex, name: str, key: str, version: int) -> bool:
+    """
+    Make a specific, possibly superseded, snapshot version available in an index.
+
+    Returns False if that version is no longer retained.
+    """
+    if index.get(name, version) is not None:
+        return True
+    snapshot = await read_snapshot_metadata(version_key(key, version))
+    if snapshot is None or snapshot.version != version:
+        return False
+    index.add_version(name, snapshot)
+    return True
+
+
+async def load_records(
+    key: str, snapshot: Snapshot, indices: List[int]
+) -> List[Dict[str, Any]]:
+    """
+    Decode the given rows of a snapshot, fetching only those rows if needed.
+
+    Raises:
+        SnapshotChangedError: If the cached snapshot is no longer `snapshot`.
+    """
+    if snapshot.has_rows or not indices:
+        return snapshot.records(indices)
+
+    # Decoded rows are cached in process by snapshot version, so pages read
+    # before are served without touching Redis.
+    records: Dict[int, Dict[str, Any]] = {}
+    if local_cache.enabled:
+        for index in indices:
+            record = local_cache.get(
+                ("row", snapshot.version, index), snapshot.version, kind="row"
+            )
+            if record is not None:
+                records[index] = record
+    missing = [index for index in indices if index not in records]
+    if not missing:
+        return [records[index] for index in indices]
+
+    # Consecutive rows are fetched as one range.
+    groups: List[List[int]] = []
+    for index in missing:
+        if groups and index == groups[-1][-1] + 1:
+            groups[-1].append(index)
+        else:
+            groups.append([index])
+
+    ranges = [(0, HEADER.size)] + [
+        (snapshot.row_span(group[0])[0], snapshot.row_span(group[-1])[1])
+        for group in groups
+    ]
+    chunks = await get_cache_ranges(key, ranges)
+    if not chunks or Snapshot.version_of(chunks[0]) != snapshot.version:
+        raise SnapshotChangedError(f"Snapshot for {key} changed while reading")
+
+    for group, chunk in zip(groups, chunks[1:]):
+        base = snapshot.row_span(group[0])[0]
+        for index in group:
+            start, end = snapshot.row_span(index)
+            records[index] = snapshot.record(index, chunk[start - base : end - base])
+            if local_cache.enabled:
+                local_cache.put(
+                    ("row", snapshot.version, index),
+                    snapshot.version,
+                    records[index],
+                    end - start,
+                )
+    return [records[index] for index in indices]
+
+
+async def _wait_for_other_worker(key: str) -> Optional[Snapshot]:
+    """Poll the cache while another worker holds the refresh lock."""
+    deadline = time.monotonic() + CACHE_LOCK_TTL
+    while time.monotonic() < deadline:
+        await asyncio.sleep(CACHE_WAIT_INTERVAL)
+        snapshot = await read_snapshot(key)
+        if snapshot is not None:
+            return snapshot
+        if not await is_locked(key):
+            return None
+    return None
+
+
+async def _refresh(key: str, refresh: Refresh, wait: bool) -> Snapshot:
+    token = await acquire_lock(key, CACHE_LOCK_TTL)
+    if token is None:
+        if not wait:
+            return EMPTY_SNAPSHOT
+        snapshot = await _wait_for_other_worker(key)
+        if snapshot is not None:
+            return snapshot
+        token = await acquire_lock(key, CACHE_LOCK_TTL)
+        if token is None:
+            return EMPTY_SNAPSHOT
+
+    try:
+        products = await refresh()
+        if not products:
+            # Scrapers return nothing when a crawl fails; keep serving the
+            # last snapshot rather than publishing an empty one over it.
+            raise EmptyCrawlError(f"Crawl for {key} returned no products")
+        return await publish(key, products)
+    finally:
+        await release_lock(key, token)
+
+
+async def refresh_now(key: str, refresh: Refresh) -> Optional[List[Product]]:
+    """
+    Crawl a store and publish the result, regardless of the cached entry's age.
+
+    Returns None without crawling if another worker holds the refresh lock.
+
+    Raises:
+        EmptyCrawlError: If the crawl returned no products.
+    """
+    token = await acquire_lock(key, CACHE_LOCK_TTL)
+    if token is None:
+        return None
+
+    try:
+        products = await refresh()
+        if not products:
+            raise EmptyCrawlError(f"Crawl for {key} returned no products")
+        await publish(key, products)
+        return products
+    finally:
+        await release_lock(key, token)
+
+
+async def read_cached(key: str) -> List[Product]:
+    """Return the cached products for a key without ever crawling."""
+    snapshot = await read_snapshot(key)
+    return snapshot.products() if snapshot is not None else []
+
+
+async def get_fetched_at(key: str) -> Optional[float]:
+    """Return when the cached entry for a key was fetched, if there is one."""
+    snapshot = await read_snapshot_metadata(key)
+    return snapshot.fetched_at if snapshot is not None else None
+
+
+def _single_flight(key: str, refresh: Refresh, wait: bool) -> "asyncio.Task[Snapshot]":
+    """Return the in-process refresh task for a key, starting one if needed."""
+    task = _inflight.get(key)
+    if task is None or task.done():
+        task = asyncio.ensure_future(_refresh(key, refresh, wait))
+        _inflight[key] = task
+
+        def _forget(done: "asyncio.Task[Snapshot]"):
+            if _inflight.get(key) is done:
+                del _inflight[key]
+
+        task.add_done_callback(_forget)
+    return task
+
+
+def _log_background_failure(task: "asyncio.Task[Snapshot]"):
+    _background.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.error(f"Background cache refresh failed: {task.exception()}")
+
+
+async def get_or_refresh(key: str, refresh: Refresh) -> Snapshot:
+    """
+    Return the cached snapshot for a key, refreshing it with stale-while-revalidate.
+
+    - fresh (younger than CACHE_SOFT_TTL): returned as is
+    - stale (older than CACHE_SOFT_TTL, kept until CACHE_HARD_TTL): returned
+      immediately while one background refresh runs
+    - missing: the caller waits for the refresh
+
+    Concurrent refreshes of the same key are collapsed into one task per
+    process and guarded by a Redis lock across workers, so only one crawl
+    per store runs at a time.
+    """
+    return await _serve(key, refresh, await read_current_snapshot(key))
+
+
+async def get_or_refresh_many(
+    entries: List[Tuple[str, Refresh]]
+) -> List[Union[Snapshot, BaseException]]:
+    """
+    `get_or_refresh()` for several (key, refresh) pairs, reading every cached
+    snapshot in one round trip. A refresh that fails is returned as its
+    exception in place of the snapshot.
+    """
+    snapshots = await read_current_snapshots([key for key, _ in entries])
+    return await asyncio.gather(
+        *[
+            _serve(key, refresh, snapshot)
+            for (key, refresh), snapshot in zip(entries, snapshots)
+        ],
+        return_exceptions=True,
+    )
+
+
+async def _serve(key: str, refresh: Refresh, snapshot: Optional[Snapshot]) -> Snapshot:
+    if snapshot is not None:
+        if time.time() - snapshot.fetched_at < CACHE_SOFT_TTL:
+            CACHE_REQUESTS.inc(key=key, result="hit")
+            return snapshot
+        CACHE_REQUESTS.inc(key=key, result="stale")
+        if key not in _inflight:
+            task = _single_flight(key, refresh, wait=False)
+            _background.add(task)
+            task.add_done_callback(_log_background_failure)
+        return snapshot
+
+    CACHE_REQUESTS.inc(key=key, result="miss")
+    return await asyncio.shield(_single_flight(key, refresh, wait=True))
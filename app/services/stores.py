@@ -0,0 +1,133 @@
+import functools
+import importlib
+import os
+from importlib.metadata import entry_points
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from app.models.product import Product
+from app.services.executor import run_scraper
+from app.utils.logger import logger
+
+CRAWL_INTERVAL = int(os.environ.get("CRAWL_INTERVAL", "1800"))
+
+# Store scrapers, as "module:attribute" of a ScraperPlugin. More can be
+# installed by any package under the STORE_PLUGIN_GROUP entry point group,
+# or listed as "name=module:attribute,..." in STORE_PLUGINS, which also
+# replaces plugins of the same name; "name=" removes a store.
+BUILTIN_PLUGINS = {
+    "zara": "app.services.zara_scraper:PLUGIN",
+    "amazon": "app.services.amazon_scraper:PLUGIN",
+    "mango": "app.services.mango_scraper:PLUGIN",
+}
+STORE_PLUGIN_GROUP = "discounted_products.stores"
+STORE_PLUGINS = os.environ.get("STORE_PLUGINS", "")
+
+
+class ScraperPlugin(NamedTuple):
+    """
+    A store's scraper. Its functions block, and are run in the scraper pool.
+    """
+
+    crawl: Callable[[], List[Product]]
+    # Parses a captured page offline: (html, base_url=None) -> products.
+    parse: Callable[..., List[Product]]
+    # Stores with paginated results can be crawled in page ranges by
+    # distributed workers: (first_page, last_page) -> (products, page_count).
+    crawl_pages: Optional[Callable[[int, int], Tuple[List[Product], int]]] = None
+
+
+class Store(NamedTuple):
+    """A crawlable store, its cache key and the functions that crawl it."""
+
+    name: str
+    cache_key: str
+    refresh: Callable[[], Awaitable[List[Product]]]
+    crawl_interval: int
+    # Stores with paginated results can be crawled in page ranges by
+    # distributed workers: (first_page, last_page) -> (products, page_count).
+    crawl_pages: Optional[Callable[[int, int], Awaitable[Tuple[List[Product], int]]]] = None
+
+
+def _crawl_interval(name: str) -> int:
+    value = os.environ.get(f"{name.upper()}_CRAWL_INTERVAL")
+    return int(value) if value else CRAWL_INTERVAL
+
+
+def _cache_key(name: str) -> str:
+    return os.environ.get(f"{name.upper()}_CACHE_KEY") or f"{name}_discounted_products"
+
+
+@functools.lru_cache(maxsize=None)
+def load_plugin(reference: str) -> ScraperPlugin:
+    """
+    Import a scraper plugin from its "module:attribute" reference.
+
+    Store modules, and Selenium with them, are imported only here, on a
+    store's first crawl, so processes that only serve cached products never
+    import them.
+
+    Raises:
+        TypeError: If the reference does not name a ScraperPlugin.
+    """
+    module_name, _, attribute = reference.partition(":")
+    plugin = getattr(importlib.import_module(module_name), attribute or "PLUGIN")
+    if not isinstance(plugin, ScraperPlugin):
+        raise TypeError(f"{reference} is not a ScraperPlugin")
+    return plugin
+
+
+def _crawl(reference: str) -> List[Product]:
+    return load_plugin(reference).crawl()
+
+
+def _crawl_pages(reference: str, first_page: int, last_page: int) -> Tuple[List[Product], int]:
+    plugin = load_plugin(reference)
+    if plugin.crawl_pages is None:
+        # Unpaginated stores are crawled whole, as their only page.
+        return plugin.crawl(), 1
+    return plugin.crawl_pages(first_page, last_page)
+
+
+def plugin_store(name: str, reference: str) -> Store:
+    """Build a store whose plugin is loaded, in the scraper pool, when first crawled."""
+    cache_key = _cache_key(name)
+
+    async def refresh() -> List[Product]:
+        return await run_scraper(name, _crawl, reference)
+
+    async def crawl_pages(first_page: int, last_page: int) -> Tuple[List[Product], int]:
+        return await run_scraper(name, _crawl_pages, reference, first_page, last_page)
+
+    return Store(
+        name=name,
+        cache_key=cache_key,
+        refresh=refresh,
+        crawl_interval=_crawl_interval(name),
+        crawl_pages=crawl_pages,
+    )
+
+
+def plugin_references(configured: str = STORE_PLUGINS) -> Dict[str, str]:
+    """Return the plugin reference of every store: built in, installed, then configured."""
+    references = dict(BUILTIN_PLUGINS)
+    for entry_point in entry_points(group=STORE_PLUGIN_GROUP):
+        references[entry_point.name.lower()] = entry_point.value
+    for item in filter(None, (item.strip() for item in configured.split(","))):
+        name, separator, reference = item.partition("=")
+        if not separator:
+            logger.error(f"Ignoring store plugin {item!r}: expected name=module:attribute")
+            continue
+        references[name.strip().lower()] = reference.strip()
+    return {name: reference for name, reference in references.items() if reference}
+
+
+def store_plugin(name: str) -> ScraperPlugin:
+    """Return a store's scraper plugin, importing it if needed."""
+    return load_plugin(PLUGIN_REFERENCES[name])
+
+
+PLUGIN_REFERENCES = plugin_references()
+
+store_mapping: Dict[str, Store] = {
+    name: plugin_store(name, reference) for name, reference in PLUGIN_REFERENCES.items()
+}
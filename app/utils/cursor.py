@@ -0,0 +1,83 @@
+import base64
+import json
+import math
+from typing import Any, Dict, NamedTuple, Optional
+
+from app.services.product_index import SORTS
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+class Cursor(NamedTuple):
+    """
+    Position in a result set pinned to specific store snapshot versions.
+
+    Snapshots are immutable, so an offset into a pinned ordering always
+    points at the same product no matter what has been published since.
+    """
+
+    versions: Dict[str, int]
+    store: Optional[str]
+    category: Optional[str]
+    min_discount: Optional[float]
+    sort: Optional[str]
+    offset: int
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    payload: Dict[str, Any] = {
+        "v": cursor.versions,
+        "st": cursor.store,
+        "c": cursor.category,
+        "d": cursor.min_discount,
+        "s": cursor.sort,
+        "o": cursor.offset,
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(token: str) -> Cursor:
+    """
+    Decode a cursor, checking that it is one the API could have issued.
+
+    Raises:
+        InvalidCursorError: If the token is malformed or has been tampered
+            with, e.g. an unknown sort, a negative offset or a filter of
+            the wrong type.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        cursor = Cursor(
+            versions={str(k): int(v) for k, v in payload["v"].items()},
+            store=payload["st"],
+            category=payload["c"],
+            min_discount=payload["d"],
+            sort=payload["s"],
+            offset=int(payload["o"]),
+        )
+    except Exception as e:
+        raise InvalidCursorError(f"Invalid cursor: {e}") from e
+
+    for name, value in (("store", cursor.store), ("category", cursor.category)):
+        if value is not None and not isinstance(value, str):
+            raise InvalidCursorError(f"Invalid cursor: {name} {value!r} is not a string")
+    min_discount = cursor.min_discount
+    if min_discount is not None:
+        if (
+            isinstance(min_discount, bool)
+            or not isinstance(min_discount, (int, float))
+            or not math.isfinite(min_discount)
+        ):
+            raise InvalidCursorError(
+                f"Invalid cursor: min_discount {min_discount!r} is not a number"
+            )
+        cursor = cursor._replace(min_discount=float(min_discount))
+    if cursor.sort is not None and cursor.sort not in SORTS:
+        raise InvalidCursorError(f"Invalid cursor: unknown sort {cursor.sort!r}")
+    if cursor.offset < 0:
+        raise InvalidCursorError(f"Invalid cursor: negative offset {cursor.offset}")
+    return cursor
@@ -0,0 +1,277 @@
+"""
+A small, dependency-free metrics registry rendered in the Prometheus text
+exposition format.
+
+Metrics are module-level singletons registered on import; `render()`
+returns every sample for the `/metrics` endpoint.
+"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Per label set: bucket counts (not cumulative), sum and count.
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, totals = self._values.setdefault(
+                key, ([0] * len(self.buckets), [0.0, 0.0])
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            totals[0] += value
+            totals[1] += 1
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            values = self._values.get(self._key(labels))
+            return int(values[1][1]) if values else 0
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the duration of the `with` block, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(
+                (key, (list(counts), list(totals)))
+                for key, (counts, totals) in self._values.items()
+            )
+
+        lines = []
+        names = self.labelnames + ("le",)
+        for key, (counts, (total, count)) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(names, key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {int(count)}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+CRAWL_SECONDS = histogram(
+    "crawl_duration_seconds", "Wall time of a whole store crawl.", ["store", "outcome"]
+)
+CRAWL_STAGE_SECONDS = histogram(
+    "crawl_stage_seconds",
+    "Time spent in each stage of a store crawl "
+    "(driver, navigation, wait, extraction, http_fetch).",
+    ["store", "stage"],
+)
+CRAWL_ITEMS = counter("crawl_items_total", "Products extracted by crawls.", ["store"])
+CRAWL_PARSE_ERRORS = counter(
+    "crawl_parse_errors_total", "Extracted items that failed to parse.", ["store"]
+)
+CRAWL_REQUESTS = counter(
+    "crawl_requests_total",
+    "Page loads through the crawl governor by outcome (ok, error, blocked).",
+    ["store", "outcome"],
+)
+CRAWL_CONCURRENCY_LIMIT = gauge(
+    "crawl_concurrency_limit", "Adaptive limit of concurrent page loads per store.", ["store"]
+)
+CRAWL_GOVERNOR_WAIT_SECONDS = histogram(
+    "crawl_governor_wait_seconds",
+    "Time page loads waited for the crawl governor to let them through.",
+    ["store"],
+)
+CACHE_REQUESTS = counter(
+    "cache_requests_total",
+    "Store cache lookups by result (hit, stale, miss).",
+    ["key", "result"],
+)
+CACHE_WRITE_SECONDS = histogram(
+    "cache_write_seconds", "Time to diff and publish a store snapshot.", ["key"]
+)
+LOCAL_CACHE_REQUESTS = counter(
+    "local_cache_requests_total",
+    "In-process cache lookups by kind (snapshot, row) and result (hit, miss).",
+    ["kind", "result"],
+)
+LOCAL_CACHE_BYTES = gauge("local_cache_bytes", "Bytes held by the in-process cache.")
+REDIS_SECONDS = histogram(
+    "redis_operation_seconds",
+    "Latency of Redis cache operations.",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+REDIS_CIRCUIT_OPEN = gauge(
+    "redis_circuit_open", "1 while the Redis circuit breaker is failing calls fast."
+)
+PRICE_HISTORY_OBSERVATIONS = counter(
+    "price_history_observations_total",
+    "Price changes appended to the price history.",
+    ["store"],
+)
+PRICE_HISTORY_WRITE_SECONDS = histogram(
+    "price_history_write_seconds", "Time to write a batch of crawls to the price history."
+)
+HTTP_REQUEST_SECONDS = histogram(
+    "http_request_duration_seconds",
+    "API request latency by route, status and the filters used.",
+    ["method", "route", "status", "filters"],
+)
+DRIVER_POOL_SESSIONS = gauge(
+    "driver_pool_sessions", "WebDriver sessions in the pool by state.", ["state"]
+)
+
+
+def crawl_stage(store: str, stage: str):
+    """Time one stage of a crawl: `with crawl_stage("zara", "navigation"): ...`"""
+    return CRAWL_STAGE_SECONDS.time(store=store, stage=stage)
+
+
+def timed_async(histogram_metric: Histogram, **labels: str) -> Callable:
+    """Decorate a coroutine function to observe its duration."""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with histogram_metric.time(**labels):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,48 @@
+import asyncio
+import os
+
+from dotenv import load_dotenv
+
+from app.services.crawl_queue import CrawlDispatcher, CrawlWorker
+from app.services.driver_pool import DRIVER_POOL_WARM, close_driver_pool, get_driver_pool
+from app.services.executor import shutdown_executor
+from app.services.fetchers import close_http_fetcher
+from app.services.price_history import price_history
+
+load_dotenv()
+
+# Every worker also enqueues due crawl runs by default; runs are
+# deduplicated in Redis, so this is safe with any number of workers.
+CRAWL_WORKER_DISPATCH = os.environ.get("CRAWL_WORKER_DISPATCH", "true").lower() == "true"
+
+
+async def run_forever() -> None:
+    """Run a crawl worker, and optionally a dispatcher, until cancelled."""
+    if DRIVER_POOL_WARM:
+        asyncio.get_running_loop().run_in_executor(None, get_driver_pool().warm)
+
+    dispatcher = CrawlDispatcher() if CRAWL_WORKER_DISPATCH else None
+    if dispatcher is not None:
+        dispatcher.start()
+    try:
+        await CrawlWorker().run_forever()
+    finally:
+        if dispatcher is not None:
+            await dispatcher.stop()
+
+
+def main() -> None:
+    """Run a distributed crawl worker: `python -m app.worker`."""
+    try:
+        asyncio.run(run_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutdown_executor()
+        close_driver_pool()
+        close_http_fetcher()
+        price_history.close()
+
+
+if __name__ == "__main__":
+    main()
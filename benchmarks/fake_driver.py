@@ -0,0 +1,94 @@
+from typing import Any, List, Optional
+
+import requests
+from bs4 import BeautifulSoup
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+from app.services.extraction import (
+    EXTRACT_SCRIPT,
+    HTML_PARSER,
+    ExtractionSpec,
+    FieldSelector,
+    parse_records,
+)
+from app.services.rendering import TRANSFERRED_BYTES_SCRIPT
+
+
+class FakeElement:
+    def __init__(self, node) -> None:
+        self.node = node
+
+    @property
+    def text(self) -> str:
+        return self.node.get_text().strip()
+
+    def click(self) -> None:
+        pass
+
+
+class FakeDriver:
+    """
+    A WebDriver stand-in that loads pages over HTTP and answers the
+    scrapers' calls from the static HTML.
+
+    It exercises the whole browser code path (pool leases, readiness
+    waits, the single-script extraction) without starting Chrome, so
+    benchmarks measure the crawler's own overhead.
+    """
+
+    def __init__(self) -> None:
+        self.session = requests.Session()
+        self.current_url = "about:blank"
+        self.page_source = ""
+        self._soup: Optional[BeautifulSoup] = None
+
+    def get(self, url: str) -> None:
+        if url == "about:blank":
+            self.page_source, self._soup = "", None
+        else:
+            response = self.session.get(url, timeout=30)
+            response.raise_for_status()
+            self.page_source = response.text
+            self._soup = BeautifulSoup(self.page_source, HTML_PARSER)
+        self.current_url = url
+
+    def _selector(self, by: str, value: str) -> str:
+        if by == By.ID:
+            return f"#{value}"
+        if by == By.CLASS_NAME:
+            return f".{value}"
+        if by == By.CSS_SELECTOR:
+            return value
+        raise NotImplementedError(by)
+
+    def find_elements(self, by: str, value: str) -> List[FakeElement]:
+        if self._soup is None:
+            return []
+        return [FakeElement(node) for node in self._soup.select(self._selector(by, value))]
+
+    def find_element(self, by: str, value: str) -> FakeElement:
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"{by}={value}")
+        return elements[0]
+
+    def execute_script(self, script: str, *args: Any) -> Any:
+        if script == EXTRACT_SCRIPT:
+            item_selector, fields = args
+            spec = ExtractionSpec(
+                item_selector, {k: FieldSelector(**v) for k, v in fields.items()}
+            )
+            return parse_records(self._soup or "", spec, self.current_url)
+        if script == TRANSFERRED_BYTES_SCRIPT:
+            return len(self.page_source.encode("utf-8"))
+        return None
+
+    def execute_cdp_cmd(self, cmd: str, params: dict) -> dict:
+        return {}
+
+    def delete_all_cookies(self) -> None:
+        self.session.cookies.clear()
+
+    def quit(self) -> None:
+        self.session.close()
@@ -0,0 +1,67 @@
+class FakeRedis:
+    """
+    In-memory stand-in for the redis_cache helpers used by store_cache,
+    for benchmarks and tests that run without a Redis server.
+    """
+
+    def __init__(self) -> None:
+        self.values = {}
+        self.locks = {}
+        self.messages = []
+        self.bytes_read = 0
+
+    async def get_cache_bytes(self, key):
+        value = self.values.get(key)
+        self.bytes_read += len(value or b"")
+        return value
+
+    async def set_cache_bytes(self, key, value, ttl=3600):
+        self.values[key] = value
+
+    async def set_cache_bytes_many(self, items, append=None):
+        for key, value, _ in items:
+            self.values[key] = value
+        if append is not None:
+            key, value, max_length, _ = append
+            self.values[key] = ([value] + self.values.get(key, []))[:max_length]
+        return True
+
+    async def get_cache_bytes_many(self, keys):
+        return [await self.get_cache_bytes(key) for key in keys]
+
+    async def patch_cache_bytes(self, key, offset, value, ttl):
+        if key not in self.values:
+            return False
+        current = self.values[key]
+        self.values[key] = current[:offset] + value + current[offset + len(value) :]
+        return True
+
+    async def get_cache_list(self, key):
+        return list(self.values.get(key, []))
+
+    async def publish_message(self, channel, message):
+        self.messages.append((channel, message))
+
+    async def get_cache_prefixes(self, keys, length):
+        chunks = [self.values.get(key, b"")[:length] for key in keys]
+        self.bytes_read += sum(len(chunk) for chunk in chunks)
+        return chunks
+
+    async def get_cache_ranges(self, key, ranges):
+        value = self.values.get(key, b"")
+        chunks = [value[start:end] for start, end in ranges]
+        self.bytes_read += sum(len(chunk) for chunk in chunks)
+        return chunks
+
+    async def acquire_lock(self, key, ttl):
+        if key in self.locks:
+            return None
+        self.locks[key] = "token"
+        return "token"
+
+    async def release_lock(self, key, token):
+        if self.locks.get(key) == token:
+            del self.locks[key]
+
+    async def is_locked(self, key):
+        return key in self.locks
@@ -0,0 +1,104 @@
+import gzip
+import os
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "tests", "fixtures")
+
+# Path served for each store; query strings (e.g. Amazon's `page`) are ignored,
+# so every result page of a store returns the same recorded listing.
+STORE_PAGES = {
+    "zara": ("/zara/man-special-prices.html", "zara_sale.html"),
+    "amazon": ("/amazon/s", "amazon_sale.html"),
+    "mango": ("/mango/men/sale", "mango_sale.html"),
+}
+
+# The live Zara page always opens with a cookie banner, and the scraper waits
+# for it before anything else; without one every browser crawl would spend
+# the whole banner timeout waiting.
+COOKIE_BANNERS = {
+    "zara": b'<button id="onetrust-reject-all-handler">Reject all</button>',
+}
+
+
+def load_pages(pages_dir: Optional[str] = None) -> Dict[str, bytes]:
+    """
+    Load one recorded listing page per store.
+
+    Pages are read from `pages_dir` when it holds a `<store>.html` file (for
+    example a page saved with PAGE_CAPTURE_DIR), otherwise from the test
+    fixtures.
+    """
+    pages = {}
+    for store, (_, fixture) in STORE_PAGES.items():
+        path = os.path.join(FIXTURES_DIR, fixture)
+        if pages_dir and os.path.exists(os.path.join(pages_dir, f"{store}.html")):
+            path = os.path.join(pages_dir, f"{store}.html")
+        with open(path, "rb") as f:
+            page = f.read()
+        banner = COOKIE_BANNERS.get(store)
+        if banner and banner not in page:
+            page = page.replace(b"</body>", banner + b"</body>", 1)
+        pages[store] = page
+    return pages
+
+
+class MockStoreServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, pages: Dict[str, bytes], latency: float = 0.0) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.routes = {STORE_PAGES[store][0]: body for store, body in pages.items()}
+        self.latency = latency
+        self.requests = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def url(self, store: str) -> str:
+        return self.base_url + STORE_PAGES[store][0]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MockStoreServer
+
+    def do_GET(self) -> None:
+        self.server.requests += 1
+        body = self.server.routes.get(urlsplit(self.path).path)
+        if body is None:
+            self.send_error(404)
+            return
+        if self.server.latency:
+            threading.Event().wait(self.server.latency)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@contextmanager
+def serve_pages(
+    pages: Dict[str, bytes], latency: float = 0.0
+) -> Iterator[MockStoreServer]:
+    """Serve recorded store pages on a free local port for the `with` block."""
+    server = MockStoreServer(pages, latency)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
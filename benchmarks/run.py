@@ -0,0 +1,310 @@
+"""
+Reproducible benchmarks for the scraper and API hot paths.
+
+Recorded listing pages are served from a local mock store server, so no
+live site is contacted. Crawls run against a fake driver by default (the
+whole browser code path without Chrome), a local Chrome with
+`--driver chrome`, or the plain HTTP fetch path with `--driver http`.
+
+    python -m benchmarks.run --output benchmarks/results/latest.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+
+With `--baseline`, metrics that regressed by more than `--tolerance` are
+listed and the command exits with status 1.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import ExitStack
+from typing import Any, Callable, Dict, List
+from unittest import mock
+
+from app.models.product import Product
+from app.routers import products as products_router
+from app.services import (
+    amazon_scraper,
+    driver_pool,
+    fetchers,
+    mango_scraper,
+    store_cache,
+    zara_scraper,
+)
+from app.services.crawl_governor import CrawlGovernor
+from app.services.parsers import get_parser
+from app.services.product_index import ProductIndex
+from app.services.stores import Store
+from benchmarks.fake_driver import FakeDriver
+from benchmarks.fake_redis import FakeRedis
+from benchmarks.mock_store import load_pages, serve_pages
+
+STORES = ("zara", "amazon", "mango")
+
+CRAWLERS: Dict[str, Callable[[], List[Product]]] = {
+    "zara": zara_scraper.crawl_zara_discounted_products,
+    "amazon": amazon_scraper.crawl_amazon_discounted_products,
+    "mango": mango_scraper.crawl_mango_discounted_products,
+}
+
+URL_SETTINGS = {
+    "zara": (zara_scraper, "ZARA_MEN_SALE_URL"),
+    "amazon": (amazon_scraper, "AMAZON_MEN_SALE_URL"),
+    "mango": (mango_scraper, "MANGO_MEN_SALE_URL"),
+}
+
+API_QUERIES = [
+    {},
+    {"category": "shirt"},
+    {"min_discount": 30.0},
+    {"sort": "price", "page": 3},
+    {"store": "zara", "category": "jacket", "sort": "name"},
+]
+
+Results = Dict[str, Dict[str, Any]]
+
+
+def _metric(results: Results, name: str, value: float, unit: str, better: str) -> None:
+    results[name] = {"value": round(value, 6), "unit": unit, "better": better}
+
+
+def _percentile(samples: List[float], percent: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def bench_extraction(pages: Dict[str, bytes], repeat: int, results: Results) -> None:
+    """Parse each recorded page `repeat` times with the store's parser."""
+    for store in STORES:
+        html = pages[store].decode("utf-8")
+        parser = get_parser(store)
+        items = 0
+        start = time.perf_counter()
+        for _ in range(repeat):
+            items += len(parser(html))
+        elapsed = time.perf_counter() - start
+
+        _metric(results, f"extraction.{store}.pages_per_second", repeat / elapsed, "pages/s", "higher")
+        _metric(results, f"extraction.{store}.items_per_second", items / elapsed, "items/s", "higher")
+
+
+def bench_crawl(
+    pages: Dict[str, bytes], driver: str, repeat: int, latency: float, results: Results
+) -> None:
+    """Run whole store crawls against the mock store server."""
+    factory = FakeDriver if driver == "fake" else driver_pool.initialize_driver
+    with serve_pages(pages, latency) as server, ExitStack() as stack:
+        for store, (module, setting) in URL_SETTINGS.items():
+            stack.enter_context(mock.patch.object(module, setting, server.url(store)))
+        stack.enter_context(
+            mock.patch.object(fetchers, "FETCH_MODE", "http" if driver == "http" else "browser")
+        )
+        stack.enter_context(mock.patch.object(amazon_scraper, "AMAZON_MAX_PAGES", 3))
+        # The mock store never throttles; pacing it would only measure the governor.
+        stack.enter_context(mock.patch.object(fetchers, "governor", CrawlGovernor("off")))
+        driver_pool._driver_pool = driver_pool.DriverPool(factory=factory)
+
+        try:
+            for store in STORES:
+                crawl = CRAWLERS[store]
+                crawl()  # warm-up: starts sessions and opens connections
+
+                samples = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    products = crawl()
+                    samples.append(time.perf_counter() - start)
+                if not products:
+                    raise RuntimeError(f"{store} crawl returned no products")
+
+                tracemalloc.start()
+                crawl()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                _metric(results, f"crawl.{store}.p50_seconds", _percentile(samples, 50), "s", "lower")
+                _metric(results, f"crawl.{store}.p95_seconds", _percentile(samples, 95), "s", "lower")
+                _metric(results, f"crawl.{store}.peak_memory_kib", peak / 1024, "KiB", "lower")
+        finally:
+            driver_pool.close_driver_pool()
+            fetchers.close_http_fetcher()
+
+
+def _catalog(store: str, size: int) -> List[Product]:
+    categories = ("shirt", "jacket", "pants", "hoodie", "socks", "shorts", "other")
+    return [
+        Product(
+            name=f"{store} product {i}",
+            original_price=f"$ {20 + i % 80}.00",
+            discounted_price=f"$ {10 + i % 60}.50",
+            discount_percent=float(i % 90),
+            purchase_url=f"https://{store}.test/p{i}",
+            image_url=f"https://{store}.test/p{i}.jpg",
+            store=store,
+            category=categories[i % len(categories)],
+        )
+        for i in range(size)
+    ]
+
+
+async def bench_api(
+    catalog_size: int, concurrency: int, requests_per_worker: int, results: Results
+) -> None:
+    """Serve cache-hit queries to concurrent callers from published snapshots."""
+    # The in-memory Redis stand-in keeps the numbers about the API's own
+    # work rather than the network.
+    redis = FakeRedis()
+
+    async def no_crawl():
+        raise RuntimeError("the benchmark must not crawl")
+
+    stores = {
+        name: Store(name=name, cache_key=name, refresh=no_crawl, crawl_interval=0)
+        for name in STORES
+    }
+    patches = [
+        mock.patch.multiple(
+            store_cache,
+            get_cache_bytes=redis.get_cache_bytes,
+            get_cache_bytes_many=redis.get_cache_bytes_many,
+            set_cache_bytes_many=redis.set_cache_bytes_many,
+            get_cache_ranges=redis.get_cache_ranges,
+            get_cache_prefixes=redis.get_cache_prefixes,
+            patch_cache_bytes=redis.patch_cache_bytes,
+            get_cache_list=redis.get_cache_list,
+            publish_message=redis.publish_message,
+        ),
+        mock.patch.object(products_router, "store_mapping", stores),
+        mock.patch.object(products_router, "API_READ_ONLY", True),
+        mock.patch.object(products_router, "product_index", ProductIndex()),
+    ]
+    with ExitStack() as stack:
+        for patcher in patches:
+            stack.enter_context(patcher)
+        for name in STORES:
+            await store_cache.publish(name, _catalog(name, catalog_size))
+
+        async def query(params: Dict[str, Any]) -> float:
+            arguments = {
+                "store": None,
+                "category": None,
+                "min_discount": None,
+                "sort": None,
+                "page": 1,
+                "page_size": 20,
+                "cursor": None,
+                "if_none_match": None,
+                **params,
+            }
+            start = time.perf_counter()
+            await products_router.get_discounted_products(**arguments)
+            return time.perf_counter() - start
+
+        for params in API_QUERIES:
+            await query(params)  # warm the index and ordering caches
+
+        async def worker(offset: int) -> List[float]:
+            return [
+                await query(API_QUERIES[(offset + i) % len(API_QUERIES)])
+                for i in range(requests_per_worker)
+            ]
+
+        start = time.perf_counter()
+        batches = await asyncio.gather(*[worker(i) for i in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    samples = [sample for batch in batches for sample in batch]
+    _metric(results, "api.requests_per_second", len(samples) / elapsed, "req/s", "higher")
+    for percent in (50, 95, 99):
+        _metric(
+            results, f"api.p{percent}_seconds", _percentile(samples, percent), "s", "lower"
+        )
+
+
+def compare(results: Results, baseline: Results, tolerance: float) -> List[str]:
+    """Return a description of every metric that regressed beyond `tolerance`."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None or not previous["value"]:
+            continue
+        change = (current["value"] - previous["value"]) / previous["value"]
+        if current["better"] == "higher":
+            change = -change
+        if change > tolerance:
+            regressions.append(
+                f"{name}: {previous['value']} -> {current['value']} {current['unit']} "
+                f"({change:+.0%} worse)"
+            )
+    return regressions
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Benchmark the scraper and API hot paths.")
+    arg_parser.add_argument("--driver", choices=("fake", "chrome", "http"), default="fake")
+    arg_parser.add_argument("--pages-dir", help="Directory of <store>.html pages to serve")
+    arg_parser.add_argument("--repeat", type=int, default=20)
+    arg_parser.add_argument("--latency", type=float, default=0.0, help="Mock server delay (s)")
+    arg_parser.add_argument("--catalog-size", type=int, default=2000)
+    arg_parser.add_argument("--concurrency", type=int, default=50)
+    arg_parser.add_argument("--requests", type=int, default=20, help="Requests per caller")
+    arg_parser.add_argument("--output", default="benchmarks/results/latest.json")
+    arg_parser.add_argument("--baseline")
+    arg_parser.add_argument("--tolerance", type=float, default=0.2)
+    args = arg_parser.parse_args()
+
+    pages = load_pages(args.pages_dir)
+    results: Results = {}
+    bench_extraction(pages, args.repeat * 10, results)
+    bench_crawl(pages, args.driver, args.repeat, args.latency, results)
+    asyncio.run(bench_api(args.catalog_size, args.concurrency, args.requests, results))
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "driver": args.driver,
+            "settings": vars(args),
+        },
+        "metrics": results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    width = max(len(name) for name in results)
+    for name, metric in results.items():
+        print(f"{name:<{width}}  {metric['value']:>14.6f} {metric['unit']}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["metrics"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import unittest
+from unittest import mock
+
+from app.services import amazon_scraper
+from tests.test_snapshot import make_product
+
+
+def fake_pages(page_count, per_page=2, failing=()):
+    def crawl_page(page):
+        if page in failing:
+            raise RuntimeError(f"page {page} failed")
+        products = [
+            make_product(page * 100 + i).model_copy(
+                update={"purchase_url": f"https://www.amazon.com/dp/{page}-{i}"}
+            )
+            for i in range(per_page)
+        ]
+        return products, page_count
+
+    return crawl_page
+
+
+class TestAmazonCrawl(unittest.TestCase):
+
+    def crawl(self, crawl_page, **settings):
+        settings = {"AMAZON_MAX_PAGES": 5, "AMAZON_MAX_ITEMS": 0, **settings}
+        with mock.patch.multiple(amazon_scraper, crawl_amazon_page=crawl_page, **settings):
+            return amazon_scraper.crawl_amazon_discounted_products()
+
+    def test_page_url(self) -> None:
+        """Later pages should set the page query parameter"""
+        url = "https://www.amazon.com/s?i=fashion&page=1&ref=sr"
+
+        self.assertEqual(amazon_scraper.page_url(url, 1), url)
+        self.assertEqual(
+            amazon_scraper.page_url(url, 3),
+            "https://www.amazon.com/s?i=fashion&ref=sr&page=3",
+        )
+
+    def test_last_page_number(self) -> None:
+        """Non-numeric pagination labels should be ignored"""
+        self.assertEqual(amazon_scraper.last_page_number(["1", "2", "...", " 7 "]), 7)
+        self.assertEqual(amazon_scraper.last_page_number([]), 1)
+
+    def test_crawls_pages_in_order(self) -> None:
+        """Products should be collected from every page up to the page budget"""
+        products = self.crawl(fake_pages(page_count=20), AMAZON_MAX_PAGES=3)
+
+        self.assertEqual(
+            [p.name for p in products],
+            [f"Product {n}" for n in (100, 101, 200, 201, 300, 301)],
+        )
+
+    def test_stops_at_advertised_page_count(self) -> None:
+        """Pages past the last advertised page should not be requested"""
+        crawl_page = mock.Mock(side_effect=fake_pages(page_count=2))
+
+        self.crawl(crawl_page)
+
+        self.assertEqual(sorted(c.args[0] for c in crawl_page.call_args_list), [1, 2])
+
+    def test_item_budget(self) -> None:
+        """The crawl should stop once the item budget is reached"""
+        products = self.crawl(fake_pages(page_count=5), AMAZON_MAX_ITEMS=3)
+
+        self.assertEqual(len(products), 3)
+
+    def test_failed_page_is_skipped(self) -> None:
+        """A failing page should not discard the other pages"""
+        products = self.crawl(fake_pages(page_count=3, failing={2}))
+
+        self.assertEqual(len(products), 4)
+
+    def test_page_range_fails_with_any_page(self) -> None:
+        """A page range crawled as a job should fail if one of its pages fails"""
+        with mock.patch.multiple(
+            amazon_scraper, crawl_amazon_page=fake_pages(20, failing={3}), AMAZON_MAX_PAGES=5
+        ):
+            products, page_count = amazon_scraper.crawl_amazon_pages(1, 2)
+            with self.assertRaises(RuntimeError):
+                amazon_scraper.crawl_amazon_pages(2, 4)
+
+        self.assertEqual(len(products), 4)
+        self.assertEqual(page_count, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
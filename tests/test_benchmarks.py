@@ -0,0 +1,46 @@
+import unittest
+from unittest import mock
+
+from app.services import driver_pool, fetchers, mango_scraper
+from app.services.crawl_governor import CrawlGovernor
+from benchmarks.fake_driver import FakeDriver
+from benchmarks.mock_store import load_pages, serve_pages
+from benchmarks.run import compare
+
+
+class TestBenchmarkHarness(unittest.TestCase):
+
+    def test_browser_crawl_against_mock_store(self) -> None:
+        """A browser crawl through the fake driver should parse the served page"""
+        with serve_pages(load_pages()) as server, \
+                mock.patch.object(mango_scraper, "MANGO_MEN_SALE_URL", server.url("mango")), \
+                mock.patch.object(fetchers, "FETCH_MODE", "browser"), \
+                mock.patch.object(fetchers, "governor", CrawlGovernor("off")), \
+                mock.patch.object(
+                    driver_pool, "_driver_pool", driver_pool.DriverPool(factory=FakeDriver)
+                ):
+            try:
+                products = mango_scraper.crawl_mango_discounted_products()
+            finally:
+                driver_pool.close_driver_pool()
+
+        self.assertTrue(products)
+        self.assertEqual(server.requests, 1)
+
+    def test_compare_respects_metric_direction(self) -> None:
+        """Only changes in the worse direction beyond the tolerance are regressions"""
+        baseline = {
+            "latency": {"value": 1.0, "unit": "s", "better": "lower"},
+            "throughput": {"value": 100.0, "unit": "req/s", "better": "higher"},
+        }
+        results = {
+            "latency": {"value": 0.5, "unit": "s", "better": "lower"},
+            "throughput": {"value": 70.0, "unit": "req/s", "better": "higher"},
+        }
+        regressions = compare(results, baseline, tolerance=0.2)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("throughput"))
+
+
+if __name__ == "__main__":
+    unittest.main()
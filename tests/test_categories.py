@@ -0,0 +1,51 @@
+import unittest
+
+from app.services.categories import Categoriser, categorise
+
+
+class TestCategories(unittest.TestCase):
+
+    def test_multilingual_names(self) -> None:
+        """English and Turkish names should map to the same categories"""
+        self.assertEqual(categorise("LINEN BLEND SHIRT"), "shirt")
+        self.assertEqual(categorise("Keten gömlek"), "shirt")
+        self.assertEqual(categorise("Men's Crew Neck Tee"), "shirt")
+        self.assertEqual(categorise("Su itici ceket"), "jacket")
+        self.assertEqual(categorise("Regular fit PANTOLON"), "pants")
+        self.assertEqual(categorise("Fleece Sweatshirt"), "hoodie")
+        self.assertEqual(categorise("Scarf"), "other")
+
+    def test_upper_case_turkish(self) -> None:
+        """Upper case Turkish names should match despite the dotted and dotless i"""
+        self.assertEqual(categorise("TİŞÖRT"), "shirt")
+        self.assertEqual(categorise("Pamuklu tişört"), "shirt")
+        self.assertEqual(categorise("YÜN KARIŞIMLI KABANI"), "coat")
+        self.assertEqual(categorise("KAPÜŞONLU SWEATSHIRT"), "hoodie")
+
+    def test_priority_and_word_starts(self) -> None:
+        """The first category in the table should win and keywords should start words"""
+        self.assertEqual(categorise("Shirt jacket"), "jacket")
+        self.assertEqual(categorise("Cotton T-Shirts"), "shirt")
+        self.assertEqual(categorise("Steel watch"), "other")
+
+    def test_keywords_end_words(self) -> None:
+        """Keywords should not match the start of longer words"""
+        self.assertEqual(categorise("Montana Tee"), "shirt")
+        self.assertEqual(categorise("Montana graphic print"), "other")
+        self.assertEqual(categorise("Shirtdress"), "other")
+        self.assertEqual(categorise("Wool blend coats"), "coat")
+        self.assertEqual(categorise("Yün karışımlı montu"), "coat")
+
+    def test_custom_table_and_batch(self) -> None:
+        """A custom table should be matched longest keyword first, with memoised lookups"""
+        categoriser = Categoriser({"bag": ["bag"], "backpack": ["backpack", "bagpack"]})
+        names = ["Bagpack", "BAG", "bagpack", "hat"]
+
+        self.assertEqual(
+            categoriser.categorise_many(names), ["backpack", "bag", "backpack", "other"]
+        )
+        self.assertEqual(categoriser._lookup.cache_info().misses, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
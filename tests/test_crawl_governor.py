@@ -0,0 +1,121 @@
+import os
+import unittest
+from unittest import mock
+
+import requests
+
+from app.services import crawl_governor, fetchers
+from app.services.crawl_governor import (
+    CrawlGovernor,
+    CrawlThrottled,
+    StoreLimits,
+    acquire,
+    release,
+)
+from tests.test_fetchers import FakeFetcher
+
+LIMITS = StoreLimits(
+    rate=1.0,
+    burst=2.0,
+    min_concurrency=1,
+    max_concurrency=4,
+    target_latency=5.0,
+    block_cooldown=30.0,
+)
+
+
+def http_error(status: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+class TestGovernorState(unittest.TestCase):
+
+    def test_token_bucket(self) -> None:
+        """A burst should be let through at once, then one page load per 1/rate seconds"""
+        state = {"limit": 4.0}
+        self.assertEqual(acquire(state, LIMITS, "a", 100.0), 0)
+        self.assertEqual(acquire(state, LIMITS, "b", 100.0), 0)
+        self.assertAlmostEqual(acquire(state, LIMITS, "c", 100.0), 1.0)
+        self.assertAlmostEqual(acquire(state, LIMITS, "c", 100.5), 0.5)
+        self.assertEqual(acquire(state, LIMITS, "c", 101.0), 0)
+
+    def test_concurrency_slots(self) -> None:
+        """Page loads beyond the limit should wait until a slot is released"""
+        state = {}
+        self.assertEqual(acquire(state, LIMITS, "a", 100.0), 0)
+        self.assertGreater(acquire(state, LIMITS, "b", 100.0), 0)
+
+        release(state, LIMITS, "a", 101.0, 1.0, "ok")
+        self.assertEqual(acquire(state, LIMITS, "b", 101.0), 0)
+
+    def test_expired_slots_are_reclaimed(self) -> None:
+        """A slot never released, e.g. by a dead worker, should be freed after its TTL"""
+        state = {}
+        acquire(state, LIMITS, "a", 100.0)
+        later = 100.0 + crawl_governor.CRAWL_SLOT_TTL + 1
+        self.assertEqual(acquire(state, LIMITS, "b", later), 0)
+
+    def test_additive_increase_multiplicative_decrease(self) -> None:
+        """Fast successes should grow the limit slowly and slow loads should halve it"""
+        state = {}
+        for now in range(1, 4):
+            limit = release(state, LIMITS, "", float(now), 1.0, "ok")
+        self.assertAlmostEqual(limit, 2.9)
+
+        self.assertAlmostEqual(release(state, LIMITS, "", 10.0, 9.0, "ok"), limit / 2)
+        # Failures of page loads sent together halve the limit only once.
+        self.assertAlmostEqual(release(state, LIMITS, "", 11.0, 1.0, "error"), limit / 2)
+        self.assertEqual(release(state, LIMITS, "", 20.0, 1.0, "error"), 1)
+
+    def test_block_pauses_store(self) -> None:
+        """A block should drop to the minimum limit and pause the store for its cooldown"""
+        state = {"limit": 4.0}
+        self.assertEqual(release(state, LIMITS, "", 100.0, 1.0, "blocked"), 1)
+        self.assertAlmostEqual(acquire(state, LIMITS, "a", 110.0), 20.0)
+        self.assertEqual(acquire(state, LIMITS, "a", 130.0), 0)
+
+
+class TestCrawlGovernor(unittest.TestCase):
+
+    def test_refused_request_counts_as_block(self) -> None:
+        """A 429 should pause the store, and waits beyond the limit should fail fast"""
+        governor = CrawlGovernor("local")
+
+        with self.assertRaises(requests.HTTPError):
+            with governor.request("shop"):
+                raise http_error(429)
+
+        with mock.patch.object(crawl_governor, "CRAWL_GOVERNOR_MAX_WAIT", 1.0):
+            with self.assertRaises(CrawlThrottled):
+                with governor.request("shop"):
+                    pass
+
+    def test_redis_outage_falls_back_to_local_state(self) -> None:
+        """Without Redis the governor should keep limiting within the process"""
+        governor = CrawlGovernor("redis")
+        with mock.patch.object(crawl_governor.redis_cache, "update_json", return_value=None):
+            with governor.request("shop"):
+                pass
+        self.assertIn("shop", governor._states)
+
+    def test_bot_check_page_is_reported(self) -> None:
+        """A bot-check page served over HTTP should count as a block"""
+        governor = CrawlGovernor("local")
+        with mock.patch.object(fetchers, "governor", governor), \
+                mock.patch.dict(os.environ, {"SHOP_CRAWL_BLOCK_COOLDOWN": "0"}), \
+                mock.patch.object(
+                    fetchers, "get_http_fetcher",
+                    return_value=FakeFetcher("<p>Enter the captcha</p>"),
+                ):
+            result = fetchers.fetch_with_fallback(
+                "shop", "https://shop.test/sale", lambda html: [], lambda: ["rendered"]
+            )
+
+        self.assertEqual(result, ["rendered"])
+        self.assertGreater(governor._states["shop"]["cooldown_until"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
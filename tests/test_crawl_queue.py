@@ -0,0 +1,196 @@
+import json
+import unittest
+from collections import defaultdict
+from unittest import mock
+
+from app.services import crawl_queue, store_cache
+from app.services.crawl_queue import (
+    DEAD_KEY,
+    JOBS_KEY,
+    LEASES_KEY,
+    PENDING_KEY,
+    CrawlDispatcher,
+    CrawlJob,
+    CrawlWorker,
+    enqueue_run,
+    split_pages,
+)
+from app.services.stores import Store
+from benchmarks.fake_redis import FakeRedis
+from tests.test_store_cache import PRODUCT
+
+
+def page_product(page: int):
+    return PRODUCT.model_copy(update={"purchase_url": f"https://www.amazon.com/p{page}"})
+
+
+class FakeQueue:
+    """In-memory stand-in for the redis_queue helpers used by crawl_queue."""
+
+    def __init__(self) -> None:
+        self.lists = defaultdict(list)  # index 0 is the left end
+        self.hashes = defaultdict(dict)
+        self.leases = defaultdict(dict)
+        self.counters = {}
+
+    async def start_job_run(self, queue, job, counter, ttl):
+        self.counters[counter] = 1
+        self.lists[queue].insert(0, job)
+        return True
+
+    async def claim_job(self, queue, leases, jobs, lease_until):
+        if not self.lists[queue]:
+            return None
+        job = self.lists[queue].pop()
+        job_id = json.loads(job)["id"]
+        self.hashes[jobs][job_id] = job
+        self.leases[leases][job_id] = lease_until
+        return job
+
+    async def renew_job_lease(self, leases, job_id, lease_until):
+        if job_id not in self.leases[leases]:
+            return False
+        self.leases[leases][job_id] = lease_until
+        return True
+
+    async def requeue_expired_jobs(self, leases, jobs, queue, now):
+        expired = [i for i, deadline in self.leases[leases].items() if deadline <= now]
+        for job_id in expired:
+            del self.leases[leases][job_id]
+            data = json.loads(self.hashes[jobs].pop(job_id))
+            data["attempts"] += 1
+            self.lists[queue].append(json.dumps(data))
+        return len(expired)
+
+    async def release_job(self, leases, jobs, job_id, target="", job="", max_length=0):
+        held = self.leases[leases].pop(job_id, None) is not None
+        self.hashes[jobs].pop(job_id, None)
+        if held and job:
+            self.lists[target].insert(0, job)
+            if max_length:
+                del self.lists[target][max_length:]
+        return held
+
+    async def complete_job_part(self, results, counter, queue, part, data, children, ttl):
+        if str(part) in self.hashes[results]:
+            return -1
+        self.hashes[results][str(part)] = data
+        for child in children:
+            self.lists[queue].insert(0, child)
+        self.counters[counter] += len(children) - 1
+        return self.counters[counter]
+
+    async def pop_job_results(self, results, counter):
+        self.counters.pop(counter, None)
+        return self.hashes.pop(results, {})
+
+
+class TestCrawlQueue(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.redis = FakeRedis()
+        self.queue = FakeQueue()
+        patchers = [
+            mock.patch.multiple(
+                store_cache,
+                get_cache_bytes=self.redis.get_cache_bytes,
+                get_cache_bytes_many=self.redis.get_cache_bytes_many,
+                set_cache_bytes_many=self.redis.set_cache_bytes_many,
+                patch_cache_bytes=self.redis.patch_cache_bytes,
+                get_cache_list=self.redis.get_cache_list,
+                publish_message=self.redis.publish_message,
+                get_cache_ranges=self.redis.get_cache_ranges,
+            ),
+            mock.patch.multiple(
+                crawl_queue,
+                acquire_lock=self.redis.acquire_lock,
+                release_lock=self.redis.release_lock,
+                start_job_run=self.queue.start_job_run,
+                claim_job=self.queue.claim_job,
+                renew_job_lease=self.queue.renew_job_lease,
+                requeue_expired_jobs=self.queue.requeue_expired_jobs,
+                release_job=self.queue.release_job,
+                complete_job_part=self.queue.complete_job_part,
+                pop_job_results=self.queue.pop_job_results,
+            ),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_store(self, page_count: int = 0, fail: bool = False) -> Store:
+        self.crawled = []
+
+        async def refresh():
+            if fail:
+                raise RuntimeError("blocked")
+            return [PRODUCT]
+
+        async def crawl_pages(first_page, last_page):
+            self.crawled.append((first_page, last_page))
+            pages = range(first_page, last_page + 1)
+            return [page_product(page) for page in pages], page_count
+
+        return Store(
+            name="amazon",
+            cache_key="amazon",
+            refresh=refresh,
+            crawl_interval=60,
+            crawl_pages=crawl_pages if page_count else None,
+        )
+
+    async def drain(self, worker: CrawlWorker) -> None:
+        while await worker.run_once():
+            pass
+
+    async def test_paged_run_is_split_and_published_in_order(self) -> None:
+        """A paged store should be crawled in page ranges and merged in page order"""
+        store = self.make_store(page_count=5)
+        await enqueue_run(store)
+        await self.drain(CrawlWorker([store], pages_per_job=2))
+
+        self.assertEqual(sorted(self.crawled), [(1, 1), (2, 3), (4, 5)])
+        products = await store_cache.read_cached("amazon")
+        self.assertEqual(products, [page_product(page) for page in range(1, 6)])
+        self.assertIsNotNone(await enqueue_run(store))
+
+    async def test_failing_job_is_retried_then_dead_lettered(self) -> None:
+        """A job that keeps failing should end up in the dead-letter list"""
+        store = self.make_store(fail=True)
+        await enqueue_run(store)
+        await self.drain(CrawlWorker([store], max_attempts=2))
+
+        self.assertEqual(len(self.queue.lists[DEAD_KEY]), 1)
+        self.assertEqual(json.loads(self.queue.lists[DEAD_KEY][0])["attempts"], 2)
+        self.assertFalse(self.queue.lists[PENDING_KEY])
+        self.assertEqual(await store_cache.read_cached("amazon"), [])
+        self.assertIsNotNone(await enqueue_run(store))
+
+    async def test_expired_lease_is_requeued(self) -> None:
+        """A job claimed by a worker that died should be picked up by another"""
+        store = self.make_store()
+        await enqueue_run(store)
+        await self.queue.claim_job(PENDING_KEY, LEASES_KEY, JOBS_KEY, lease_until=0)
+
+        await self.drain(CrawlWorker([store]))
+        self.assertEqual(await store_cache.read_cached("amazon"), [PRODUCT])
+
+    async def test_dispatcher_enqueues_one_run_at_a_time(self) -> None:
+        """Dispatchers should not start a run while one is in progress or fresh"""
+        store = self.make_store()
+        dispatcher = CrawlDispatcher([store], jitter=0)
+
+        self.assertTrue(await dispatcher.crawl(store))
+        self.assertFalse(await dispatcher.crawl(store))
+        await self.drain(CrawlWorker([store]))
+        self.assertFalse(await dispatcher.crawl(store))
+
+    def test_split_pages(self) -> None:
+        """Pages after the first should be split into contiguous ranges"""
+        job = CrawlJob(id="r:0", run_id="r", store="amazon", lock_token="t")
+        ranges = [(j.part, j.first_page, j.last_page) for j in split_pages(job, 6, 2)]
+        self.assertEqual(ranges, [(1, 2, 3), (2, 4, 5), (3, 6, 6)])
+
+
+if __name__ == "__main__":
+    unittest.main()
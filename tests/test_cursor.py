@@ -0,0 +1,34 @@
+import unittest
+
+from app.utils.cursor import Cursor, InvalidCursorError, decode_cursor, encode_cursor
+
+
+class TestCursor(unittest.TestCase):
+
+    def test_round_trip(self) -> None:
+        """A cursor should decode to exactly what was encoded"""
+        cursor = Cursor({"zara": 12, "mango": 34}, None, "shirt", 20.0, "price", 40)
+
+        self.assertEqual(decode_cursor(encode_cursor(cursor)), cursor)
+
+    def test_invalid(self) -> None:
+        """Garbage tokens should raise InvalidCursorError"""
+        for token in ["", "not-a-cursor", encode_cursor.__name__]:
+            with self.assertRaises(InvalidCursorError):
+                decode_cursor(token)
+
+    def test_tampered(self) -> None:
+        """Cursors with an unknown sort, a negative offset or a mistyped filter should be rejected"""
+        for cursor in [
+            Cursor({"zara": 1}, None, None, None, "stock", 0),
+            Cursor({"zara": 1}, None, None, None, "price", -10),
+            Cursor({"zara": 1}, None, None, "abc", None, 0),
+            Cursor({"zara": 1}, None, 5, None, None, 0),
+            Cursor({"zara": 1}, 7, None, None, None, 0),
+        ]:
+            with self.assertRaises(InvalidCursorError):
+                decode_cursor(encode_cursor(cursor))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+from app.services.deltas import content_hash, diff_products, product_identity
+from tests.test_snapshot import make_product
+
+
+def with_url(i, url, **update):
+    return make_product(i).model_copy(update={"purchase_url": url, **update})
+
+
+class TestDeltas(unittest.TestCase):
+
+    def test_amazon_identity_uses_asin(self) -> None:
+        """Amazon links to the same ASIN should share an identity"""
+        first = with_url(1, "https://www.amazon.com/Mens-Tee/dp/B0ABCDEF12/ref=sr_1_3?qid=1")
+        second = with_url(1, "https://www.amazon.com/dp/B0ABCDEF12?th=1")
+
+        self.assertEqual(product_identity(first), product_identity(second))
+
+    def test_url_identity_ignores_tracking(self) -> None:
+        """Tracking parameters and trailing slashes should not change identity"""
+        first = with_url(1, "https://www.zara.com/p1.html?v1=5&utm_source=x")
+        second = with_url(1, "https://WWW.zara.com/p1.html/?v1=5")
+        variant = with_url(1, "https://www.zara.com/p1.html?v1=6")
+
+        self.assertEqual(product_identity(first), product_identity(second))
+        self.assertNotEqual(product_identity(first), product_identity(variant))
+
+    def test_diff(self) -> None:
+        """Products should be classified as added, changed or removed"""
+        kept, repriced, dropped = make_product(1), make_product(2), make_product(3)
+        new = make_product(4)
+        cheaper = repriced.model_copy(update={"discount_percent": 50.0})
+
+        delta = diff_products([kept, repriced, dropped], [kept, cheaper, new])
+
+        self.assertEqual(delta.added, [new])
+        self.assertEqual(delta.changed, [cheaper])
+        self.assertEqual(delta.removed, [dropped])
+        self.assertNotEqual(content_hash(repriced), content_hash(cheaper))
+        self.assertTrue(diff_products([kept], [kept]).empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import threading
+import unittest
+
+from app.services.driver_pool import DriverPool
+
+
+class FakeDriver:
+    def __init__(self) -> None:
+        self.alive = True
+        self.quit_called = False
+        self.cookies_cleared = 0
+
+    @property
+    def current_url(self) -> str:
+        if not self.alive:
+            raise RuntimeError("session crashed")
+        return "about:blank"
+
+    def delete_all_cookies(self) -> None:
+        self.cookies_cleared += 1
+
+    def execute_script(self, script: str) -> None:
+        pass
+
+    def get(self, url: str) -> None:
+        if not self.alive:
+            raise RuntimeError("session crashed")
+
+    def quit(self) -> None:
+        self.quit_called = True
+
+
+class TestDriverPool(unittest.TestCase):
+
+    def test_warm_starts_sessions(self) -> None:
+        """warm() should start sessions up to the pool size"""
+        pool = DriverPool(size=3, factory=FakeDriver)
+        pool.warm()
+
+        stats = pool.stats()
+        self.assertEqual(stats["open"], 3)
+        self.assertEqual(stats["idle"], 3)
+
+    def test_lease_reuses_and_resets_session(self) -> None:
+        """A returned session should be reset and handed out again"""
+        pool = DriverPool(size=1, factory=FakeDriver)
+
+        with pool.lease() as first:
+            pass
+        with pool.lease() as second:
+            pass
+
+        self.assertIs(first, second)
+        self.assertEqual(first.cookies_cleared, 2)
+        self.assertEqual(pool.stats()["created"], 1)
+
+    def test_recycle_after_max_uses(self) -> None:
+        """A session should be replaced after max_uses leases"""
+        pool = DriverPool(size=1, max_uses=2, factory=FakeDriver)
+
+        drivers = []
+        for _ in range(3):
+            with pool.lease() as driver:
+                drivers.append(driver)
+
+        self.assertIs(drivers[0], drivers[1])
+        self.assertIsNot(drivers[1], drivers[2])
+        self.assertTrue(drivers[0].quit_called)
+
+    def test_crashed_session_is_replaced(self) -> None:
+        """A session that crashes during a lease should not be reused"""
+        pool = DriverPool(size=1, factory=FakeDriver)
+
+        with pool.lease() as crashed:
+            crashed.alive = False
+        with pool.lease() as driver:
+            pass
+
+        self.assertIsNot(crashed, driver)
+        self.assertEqual(pool.stats()["recycled"], 1)
+
+    def test_lease_waits_for_returned_session(self) -> None:
+        """Leases beyond the pool size should wait for a returned session"""
+        pool = DriverPool(size=1, lease_timeout=2, factory=FakeDriver)
+        leased = threading.Event()
+        release = threading.Event()
+
+        def hold() -> None:
+            with pool.lease():
+                leased.set()
+                release.wait()
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        leased.wait()
+        threading.Timer(0.1, release.set).start()
+
+        with pool.lease():
+            pass
+        thread.join()
+
+        stats = pool.stats()
+        self.assertEqual(stats["created"], 1)
+        self.assertGreater(stats["wait_seconds_max"], 0.05)
+
+    def test_lease_timeout(self) -> None:
+        """Leasing from an exhausted pool should time out"""
+        pool = DriverPool(size=1, lease_timeout=0.05, factory=FakeDriver)
+
+        with pool.lease():
+            with self.assertRaises(TimeoutError):
+                with pool.lease():
+                    pass
+
+
+if __name__ == "__main__":
+    unittest.main()
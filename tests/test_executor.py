@@ -0,0 +1,60 @@
+import asyncio
+import time
+import unittest
+
+from app.services import executor
+from app.services.executor import run_scraper
+
+
+def slow_crawl(delay: float) -> float:
+    time.sleep(delay)
+    return delay
+
+
+class TestScraperExecutor(unittest.IsolatedAsyncioTestCase):
+
+    def tearDown(self) -> None:
+        executor._store_semaphores.clear()
+
+    async def test_stores_crawl_in_parallel(self) -> None:
+        """Different stores should not wait for each other"""
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            run_scraper("zara", slow_crawl, 0.2),
+            run_scraper("amazon", slow_crawl, 0.2),
+            run_scraper("mango", slow_crawl, 0.2),
+        )
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(results, [0.2, 0.2, 0.2])
+        self.assertLess(elapsed, 0.5)
+
+    async def test_store_concurrency_limit(self) -> None:
+        """Crawls for the same store should be serialised by default"""
+        start = time.perf_counter()
+        await asyncio.gather(
+            run_scraper("zara", slow_crawl, 0.1),
+            run_scraper("zara", slow_crawl, 0.1),
+        )
+        elapsed = time.perf_counter() - start
+
+        self.assertGreaterEqual(elapsed, 0.2)
+
+    async def test_timeout(self) -> None:
+        """A crawl that exceeds its timeout should raise TimeoutError"""
+        with self.assertRaises(asyncio.TimeoutError):
+            await run_scraper("mango", slow_crawl, 0.3, timeout=0.05)
+
+    async def test_event_loop_stays_responsive(self) -> None:
+        """The event loop should keep running while a crawl blocks"""
+        crawl = asyncio.ensure_future(run_scraper("amazon", slow_crawl, 0.3))
+
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        self.assertLess(time.perf_counter() - start, 0.1)
+
+        await crawl
+
+
+if __name__ == "__main__":
+    unittest.main()
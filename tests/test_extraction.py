@@ -0,0 +1,97 @@
+import unittest
+
+from app.models.product import Product
+from app.services import amazon_scraper, mango_scraper, zara_scraper
+from app.services.extraction import EXTRACT_SCRIPT, build_products, extract_records
+
+
+class FakeDriver:
+    def __init__(self, records) -> None:
+        self.records = records
+        self.calls = []
+
+    def execute_script(self, script, *args):
+        self.calls.append((script, args))
+        return self.records
+
+
+class TestExtraction(unittest.TestCase):
+
+    def test_extract_records_single_round_trip(self) -> None:
+        """The whole grid should be extracted with one execute_script call"""
+        driver = FakeDriver([{"name": "Shirt"}])
+
+        records = extract_records(driver, zara_scraper.PRODUCT_SPEC)
+
+        self.assertEqual(records, [{"name": "Shirt"}])
+        self.assertEqual(len(driver.calls), 1)
+        script, (item_selector, fields) = driver.calls[0]
+        self.assertEqual(script, EXTRACT_SCRIPT)
+        self.assertEqual(item_selector, "._product")
+        self.assertEqual(fields["prices"]["many"], True)
+
+    def test_build_products_skips_bad_records(self) -> None:
+        """Malformed records should be skipped without failing the page"""
+        records = [
+            {
+                "name": "Linen Shirt",
+                "url": "https://www.zara.com/p1",
+                "image_url": "https://static.zara.net/p1.jpg",
+                "prices": ["$ 50.00", "$ 25.00"],
+            },
+            {"name": "Broken", "url": None, "image_url": None, "prices": []},
+        ]
+
+        products = build_products(records, zara_scraper.product_from_record, "zara")
+
+        self.assertEqual(len(products), 1)
+        self.assertIsInstance(products[0], Product)
+        self.assertEqual(products[0].discount_percent, 50.0)
+        self.assertEqual(products[0].category, "shirt")
+
+    def test_amazon_record(self) -> None:
+        """Amazon records should combine whole and fraction prices"""
+        record = {
+            "index": "7",
+            "title": "Men's Hoodie",
+            "name": "Men's Hoodie",
+            "url": "https://www.amazon.com/dp/B01",
+            "image_url": "https://m.media-amazon.com/B01.jpg",
+            "price_whole": "30",
+            "price_fraction": "00",
+            "original_prices": ["$40.00"],
+            "price_symbols": ["$"],
+        }
+
+        product = amazon_scraper.product_from_record(record)
+
+        self.assertEqual(product.discounted_price, "$30.00")
+        self.assertEqual(product.original_price, "$40.00")
+        self.assertEqual(product.discount_percent, 25.0)
+
+    def test_amazon_record_without_title_is_skipped(self) -> None:
+        """Amazon placeholders without a title should be skipped"""
+        self.assertIsNone(amazon_scraper.product_from_record({"title": ""}))
+
+    def test_mango_record(self) -> None:
+        """Mango records should parse Turkish lira prices"""
+        record = {
+            "name": "Keten gömlek",
+            "url": "https://shop.mango.com/p1",
+            "image_url": "https://st.mngbcn.com/p1.jpg",
+            "original_price": "1,999.99 TL",
+            "final_prices": ["999.99 TL"],
+        }
+
+        product = mango_scraper.product_from_record(record)
+
+        self.assertEqual(product.discounted_price, "999.99 TL")
+        self.assertEqual(product.currency, "TRY")
+        self.assertEqual(product.original_price_minor, 199999)
+        self.assertEqual(product.discounted_price_minor, 99999)
+        self.assertEqual(product.category, "shirt")
+        self.assertAlmostEqual(product.discount_percent, 50.0, places=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
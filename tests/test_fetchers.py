@@ -0,0 +1,77 @@
+import os
+import unittest
+from unittest import mock
+
+from app.services import fetchers
+from app.services.amazon_scraper import parse_amazon_page
+from app.services.crawl_governor import CrawlGovernor
+from tests.test_parsers import load_fixture
+
+
+class FakeFetcher:
+    def __init__(self, body=None, error=None) -> None:
+        self.body = body
+        self.error = error
+        self.urls = []
+
+    def fetch(self, url):
+        self.urls.append(url)
+        if self.error:
+            raise self.error
+        return self.body
+
+
+class TestFetchWithFallback(unittest.TestCase):
+
+    def fetch(self, fetcher, mode="auto"):
+        self.browser_calls = 0
+
+        def browser():
+            self.browser_calls += 1
+            return ["rendered"]
+
+        with mock.patch.object(fetchers, "get_http_fetcher", return_value=fetcher), \
+                mock.patch.object(fetchers, "governor", CrawlGovernor("local")), \
+                mock.patch.dict(os.environ, {"SHOP_FETCH_MODE": mode}):
+            return fetchers.fetch_with_fallback(
+                "shop", "https://shop.test/sale", lambda html: html.split(), browser
+            )
+
+    def test_valid_http_result_skips_browser(self) -> None:
+        """A page that validates over HTTP should never open a browser"""
+        self.assertEqual(self.fetch(FakeFetcher("a b")), ["a", "b"])
+        self.assertEqual(self.browser_calls, 0)
+
+    def test_invalid_http_result_falls_back(self) -> None:
+        """An empty parse result should fall back to the browser"""
+        self.assertEqual(self.fetch(FakeFetcher("")), ["rendered"])
+        self.assertEqual(self.browser_calls, 1)
+
+    def test_http_error_falls_back(self) -> None:
+        """A failed request should fall back to the browser"""
+        self.assertEqual(self.fetch(FakeFetcher(error=OSError("reset"))), ["rendered"])
+
+    def test_http_mode_never_renders(self) -> None:
+        """In http mode failures should surface instead of opening a browser"""
+        self.assertEqual(self.fetch(FakeFetcher(""), mode="http"), [])
+        with self.assertRaises(OSError):
+            self.fetch(FakeFetcher(error=OSError("reset")), mode="http")
+        self.assertEqual(self.browser_calls, 0)
+
+    def test_browser_mode_skips_http(self) -> None:
+        """In browser mode no HTTP request should be made"""
+        fetcher = FakeFetcher("a")
+
+        self.assertEqual(self.fetch(fetcher, mode="browser"), ["rendered"])
+        self.assertEqual(fetcher.urls, [])
+
+    def test_amazon_page_count_from_html(self) -> None:
+        """The Amazon HTML path should read the page count from the pagination bar"""
+        products, page_count = parse_amazon_page(load_fixture("amazon_sale.html"))
+
+        self.assertEqual(len(products), 3)
+        self.assertEqual(page_count, 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+from app.services import local_cache as local_cache_module
+from app.services import store_cache
+from app.services.local_cache import LocalCache, SnapshotVersions
+from app.services.product_index import ProductIndex
+from benchmarks.fake_redis import FakeRedis
+from tests.test_snapshot import make_product
+
+
+class TestLocalCache(unittest.TestCase):
+
+    def test_lookup_requires_matching_version(self) -> None:
+        """An entry tagged with another snapshot version should not be returned"""
+        cache = LocalCache(max_bytes=100)
+        cache.put("zara", 1, "v1", 10)
+
+        self.assertEqual(cache.get("zara", 1), "v1")
+        self.assertIsNone(cache.get("zara", 2))
+
+    def test_least_recently_used_entries_are_evicted(self) -> None:
+        """The cache should stay within its size by evicting the oldest entries"""
+        cache = LocalCache(max_bytes=25)
+        cache.put("a", 1, "a", 10)
+        cache.put("b", 1, "b", 10)
+        cache.get("a", 1)
+        cache.put("c", 1, "c", 10)
+
+        self.assertIsNone(cache.get("b", 1))
+        self.assertEqual(cache.get("a", 1), "a")
+        self.assertEqual(cache.size, 20)
+
+
+class TestSnapshotVersions(unittest.IsolatedAsyncioTestCase):
+
+    async def test_versions_follow_the_channel(self) -> None:
+        """Published versions should be known only while subscribed"""
+        versions = SnapshotVersions()
+        messages = asyncio.Queue()
+
+        async def subscribe(channel):
+            yield None
+            while True:
+                message = await messages.get()
+                if isinstance(message, Exception):
+                    raise message
+                yield message
+
+        with mock.patch.object(local_cache_module, "subscribe", subscribe), \
+                mock.patch.object(local_cache_module, "LOCAL_CACHE_RETRY", 60):
+            task = asyncio.create_task(versions.listen())
+            await messages.put(json.dumps({"key": "zara", "version": 7}))
+            while versions.get("zara") is None:
+                await asyncio.sleep(0)
+            self.assertEqual(versions.get("zara"), 7)
+
+            await messages.put(ConnectionError("gone"))
+            while versions.listening:
+                await asyncio.sleep(0)
+            self.assertIsNone(versions.get("zara"))
+            task.cancel()
+
+    def test_read_does_not_override_newer_publish(self) -> None:
+        """A version read before a publish arrived should not replace it"""
+        versions = SnapshotVersions()
+        versions.listening = True
+        generation = versions.generation
+
+        versions.published("zara", 8)
+        versions.seen("zara", 7, generation)
+
+        self.assertEqual(versions.get("zara"), 8)
+
+
+class TestTwoTierReads(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.redis = FakeRedis()
+        self.versions = SnapshotVersions()
+        self.versions.listening = True
+        patchers = [
+            mock.patch.multiple(
+                store_cache,
+                get_cache_bytes=self.redis.get_cache_bytes,
+                get_cache_bytes_many=self.redis.get_cache_bytes_many,
+                set_cache_bytes_many=self.redis.set_cache_bytes_many,
+                patch_cache_bytes=self.redis.patch_cache_bytes,
+                get_cache_list=self.redis.get_cache_list,
+                publish_message=self.redis.publish_message,
+                get_cache_ranges=self.redis.get_cache_ranges,
+                get_cache_prefixes=mock.AsyncMock(side_effect=self.redis.get_cache_prefixes),
+                snapshot_versions=self.versions,
+                local_cache=LocalCache(max_bytes=1 << 20),
+                SNAPSHOT_PREFETCH=64,
+            ),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def publish(self, products):
+        snapshot = await store_cache.publish("zara", products)
+        channel, message = self.redis.messages[-1]
+        data = json.loads(message)
+        self.versions.published(data["key"], data["version"])
+        return snapshot
+
+    async def test_hot_reads_stay_in_process(self) -> None:
+        """Once versions are known, syncing and reading a page should not touch Redis"""
+        await self.publish([make_product(i) for i in range(50)])
+        index = ProductIndex()
+
+        await store_cache.sync_index(index, {"zara": "zara"})
+        snapshot = index.snapshot("zara", index.version("zara"))
+        self.assertFalse(snapshot.has_rows)
+        first = await store_cache.load_records("zara", snapshot, [1, 2, 3])
+
+        reads = self.redis.bytes_read
+        await store_cache.sync_index(index, {"zara": "zara"})
+        again = await store_cache.load_records("zara", snapshot, [1, 2, 3])
+
+        self.assertEqual(again, first)
+        self.assertEqual(self.redis.bytes_read, reads)
+        store_cache.get_cache_prefixes.assert_not_called()
+
+    async def test_publish_invalidates_cached_snapshot(self) -> None:
+        """A new publish should be visible on the next read"""
+        await self.publish([make_product(1)])
+        first = await store_cache.read_current_snapshot("zara")
+        self.assertIs(await store_cache.read_current_snapshot("zara"), first)
+
+        await self.publish([make_product(2)])
+        second = await store_cache.read_current_snapshot("zara")
+        self.assertNotEqual(second.version, first.version)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import time
+import unittest
+from unittest import mock
+
+from app.services import store_cache
+from app.services.extraction import build_products
+from app.utils import metrics
+from benchmarks.fake_redis import FakeRedis
+from tests.test_store_cache import PRODUCT
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_counter_exposition(self) -> None:
+        """Counters should render HELP, TYPE and one line per label set"""
+        counter = metrics.Counter("things_total", "Things.", ["kind"])
+        counter.inc(kind="a")
+        counter.inc(2, kind='b"')
+
+        self.assertEqual(
+            counter.render().splitlines(),
+            [
+                "# HELP things_total Things.",
+                "# TYPE things_total counter",
+                'things_total{kind="a"} 1.0',
+                'things_total{kind="b\\""} 2.0',
+            ],
+        )
+
+    def test_histogram_buckets_are_cumulative(self) -> None:
+        """Histogram buckets should count every observation at or below them"""
+        histogram = metrics.Histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value)
+
+        lines = histogram.render().splitlines()[2:]
+        self.assertEqual(
+            lines,
+            [
+                'latency_seconds_bucket{le="0.1"} 1',
+                'latency_seconds_bucket{le="1.0"} 2',
+                'latency_seconds_bucket{le="+Inf"} 3',
+                "latency_seconds_sum 5.55",
+                "latency_seconds_count 3",
+            ],
+        )
+
+    def test_wrong_labels(self) -> None:
+        """Observations with the wrong labels should be rejected"""
+        with self.assertRaises(ValueError):
+            metrics.Counter("x_total", "X.", ["store"]).inc(shop="zara")
+
+    def test_build_products_counts_items_and_errors(self) -> None:
+        """Extracted items and parse errors should be counted per store"""
+        items = metrics.CRAWL_ITEMS.value(store="metrics-test")
+
+        def builder(record, category):
+            if record.get("broken"):
+                raise ValueError("broken")
+            return PRODUCT
+
+        build_products([{}, {"broken": True}, {}], builder, "metrics-test")
+
+        self.assertEqual(metrics.CRAWL_ITEMS.value(store="metrics-test") - items, 2)
+        self.assertEqual(metrics.CRAWL_PARSE_ERRORS.value(store="metrics-test"), 1)
+
+
+class TestCacheMetrics(unittest.IsolatedAsyncioTestCase):
+
+    async def test_hit_stale_and_miss(self) -> None:
+        """Cache lookups should be counted as hits, stale hits or misses"""
+        redis = FakeRedis()
+        patcher = mock.patch.multiple(
+            store_cache,
+            get_cache_bytes=redis.get_cache_bytes,
+            get_cache_bytes_many=redis.get_cache_bytes_many,
+            set_cache_bytes_many=redis.set_cache_bytes_many,
+            patch_cache_bytes=redis.patch_cache_bytes,
+            get_cache_list=redis.get_cache_list,
+            publish_message=redis.publish_message,
+            acquire_lock=redis.acquire_lock,
+            release_lock=redis.release_lock,
+            is_locked=redis.is_locked,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        async def crawl():
+            return [PRODUCT]
+
+        def count(result):
+            return metrics.CACHE_REQUESTS.value(key="metrics-test", result=result)
+
+        await store_cache.get_or_refresh("metrics-test", crawl)
+        await store_cache.get_or_refresh("metrics-test", crawl)
+        with mock.patch.object(store_cache.time, "time", return_value=time.time() + 10**6):
+            await store_cache.get_or_refresh("metrics-test", crawl)
+
+        self.assertEqual((count("miss"), count("hit"), count("stale")), (1, 1, 1))
+        self.assertIn('cache_requests_total{key="metrics-test",result="hit"} 1.0', metrics.render())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import unittest
+
+from app.models.product import Product
+from app.services.parsers import get_parser, parse_pages
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+class TestParsing(unittest.TestCase):
+
+    def assert_products(self, products) -> None:
+        for product in products:
+            self.assertIsInstance(product, Product)
+            self.assertIsInstance(product.name, str)
+            self.assertIsInstance(product.original_price, str)
+            self.assertIsInstance(product.discounted_price, str)
+            self.assertIsInstance(product.discount_percent, float)
+            self.assertIsInstance(product.purchase_url, str)
+            self.assertIsInstance(product.image_url, str)
+
+    def test_parse_zara(self) -> None:
+        """Test the Zara parser against a captured sale page"""
+        products = get_parser("zara")(
+            load_fixture("zara_sale.html"),
+            base_url="https://www.zara.com/us/en/man-special-prices-l806.html",
+        )
+
+        self.assertEqual(len(products), 3)
+        self.assert_products(products)
+        self.assertEqual(products[0].name, "LINEN BLEND SHIRT")
+        self.assertEqual(
+            products[0].purchase_url,
+            "https://www.zara.com/us/en/linen-blend-shirt-p101.html",
+        )
+        self.assertEqual(products[0].discount_percent, 40.08)
+        self.assertEqual(
+            [p.category for p in products], ["shirt", "jacket", "pants"]
+        )
+
+    def test_parse_amazon(self) -> None:
+        """Test the Amazon parser against a captured results page"""
+        products = get_parser("amazon")(
+            load_fixture("amazon_sale.html"), base_url="https://www.amazon.com/s"
+        )
+
+        self.assertEqual(len(products), 3)
+        self.assert_products(products)
+        self.assertEqual(products[0].name, "Men's Crew Neck Tee")
+        # data-index 12 is past the leading slots, though "12" < "5" as text.
+        self.assertEqual(products[2].name, "Slim Fit Jeans")
+        self.assertEqual(products[0].original_price, "$19.99")
+        self.assertEqual(products[0].discounted_price, "$12.99")
+        self.assertEqual(
+            products[1].purchase_url,
+            "https://www.amazon.com/Pullover-Hoodie/dp/B0HOOD0002",
+        )
+
+    def test_parse_mango(self) -> None:
+        """Test the Mango parser against a captured sale page"""
+        products = get_parser("mango")(load_fixture("mango_sale.html"))
+
+        self.assertEqual(len(products), 3)
+        self.assert_products(products)
+        self.assertEqual(products[1].category, "jacket")
+        self.assertEqual(products[2].discount_percent, 0.0)
+
+    def test_parse_pages_in_process_pool(self) -> None:
+        """Parsing across a process pool should match serial parsing"""
+        html = load_fixture("mango_sale.html")
+
+        results = parse_pages("mango", [html] * 4, max_workers=2)
+
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[0], get_parser("mango")(html))
+        self.assertEqual(results[3], results[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
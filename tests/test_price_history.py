@@ -0,0 +1,92 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from fastapi import HTTPException
+
+from app.routers import prices as prices_router
+from app.services.price_history import PriceHistoryStore
+from tests.test_snapshot import make_product
+
+
+def priced(i: int, price: str):
+    return make_product(i).model_copy(update={"discounted_price": price})
+
+
+class TestPriceHistory(unittest.TestCase):
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.history = PriceHistoryStore(os.path.join(directory.name, "prices.db"))
+        self.addCleanup(self.history.close)
+
+    def record(self, observed_at, *products) -> None:
+        self.history.record(list(products), observed_at)
+        self.history.flush()
+
+    def test_only_price_changes_are_appended(self) -> None:
+        """Crawls that leave a price unchanged should not add observations"""
+        self.record(100.0, priced(1, "$ 18.00"), priced(2, "$ 9.00"))
+        self.record(200.0, priced(1, "$ 18.00"), priced(2, "$ 9.00"))
+        self.record(300.0, priced(1, "$ 12.00"))
+
+        history = self.history.history("zara:example.com/p1")
+        self.assertEqual([p["observed_at"] for p in history["prices"]], [100.0, 300.0])
+        self.assertEqual([p["price"] for p in history["prices"]], [18.0, 12.0])
+        self.assertEqual((history["lowest_price"], history["highest_price"]), (12.0, 18.0))
+        self.assertEqual(history["first_seen"], 100.0)
+        self.assertIsNone(self.history.history("zara:example.com/p3"))
+
+    def test_price_drops(self) -> None:
+        """Recent drops should be listed largest first, with the lowest price ever"""
+        self.record(100.0, priced(1, "$ 10.00"), priced(2, "$ 20.00"), priced(3, "$ 30.00"))
+        self.record(200.0, priced(1, "$ 20.00"), priced(2, "$ 10.00"), priced(3, "$ 27.00"))
+        self.record(300.0, priced(1, "$ 15.00"))
+
+        drops = self.history.price_drops(since=150.0)
+        self.assertEqual(
+            [(d["identity"], d["previous_price"], d["price"]) for d in drops],
+            [
+                ("zara:example.com/p2", 20.0, 10.0),
+                ("zara:example.com/p1", 20.0, 15.0),
+                ("zara:example.com/p3", 30.0, 27.0),
+            ],
+        )
+        self.assertEqual(drops[1]["lowest_price"], 10.0)
+        self.assertEqual(len(self.history.price_drops(since=150.0, min_drop=20)), 2)
+        self.assertEqual(self.history.price_drops(since=250.0, store="mango"), [])
+
+
+class TestPriceRoutes(unittest.IsolatedAsyncioTestCase):
+
+    async def test_history_by_store_and_url(self) -> None:
+        """The history should be found from a purchase URL with tracking parameters"""
+        with tempfile.TemporaryDirectory() as directory:
+            history = PriceHistoryStore(os.path.join(directory, "prices.db"))
+            history.record([priced(1, "$ 18.00")], time.time())
+            history.close()
+
+            with mock.patch.object(prices_router, "price_history", history):
+                result = await prices_router.get_price_history(
+                    store="Zara", url="https://example.com/p1?utm_source=mail"
+                )
+                drops = await prices_router.get_price_drops(
+                    store=None, hours=24, min_drop=0, limit=50
+                )
+
+        self.assertEqual(result["prices"][0]["display_price"], "$ 18.00")
+        self.assertEqual(drops, [])
+
+    async def test_disabled_history(self) -> None:
+        """Querying a disabled history should fail with 503"""
+        with mock.patch.object(prices_router, "price_history", PriceHistoryStore("")):
+            with self.assertRaises(HTTPException) as raised:
+                await prices_router.get_price_drops(store=None, hours=24, min_drop=0, limit=50)
+        self.assertEqual(raised.exception.status_code, 503)
+
+
+if __name__ == "__main__":
+    unittest.main()
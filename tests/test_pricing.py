@@ -0,0 +1,42 @@
+import unittest
+
+from app.services.pricing import Price, amount, discount_percent, parse_price
+
+
+class TestPricing(unittest.TestCase):
+
+    def test_parse_locale_formats(self) -> None:
+        """Prices should parse to minor units whatever their separators"""
+        self.assertEqual(parse_price("$ 29.90"), Price(2990, "USD"))
+        self.assertEqual(parse_price("1,999.99 TL"), Price(199999, "TRY"))
+        self.assertEqual(parse_price("1.999,99 TL"), Price(199999, "TRY"))
+        self.assertEqual(parse_price("1.299 TL"), Price(129900, "TRY"))
+        self.assertEqual(parse_price("1.299,00 TL"), Price(129900, "TRY"))
+        self.assertEqual(parse_price("1.299.000 TL"), Price(129900000, "TRY"))
+        self.assertEqual(parse_price("12.5 TL"), Price(1250, "TRY"))
+        self.assertEqual(parse_price("29,90 €"), Price(2990, "EUR"))
+        self.assertEqual(parse_price("1,299", "USD"), Price(129900, "USD"))
+        self.assertEqual(parse_price("¥1,200"), Price(1200, "JPY"))
+        self.assertEqual(parse_price("US$5"), Price(500, "USD"))
+
+    def test_invalid_prices(self) -> None:
+        """Prices without an amount or a currency should be rejected"""
+        with self.assertRaises(ValueError):
+            parse_price("$ ")
+        with self.assertRaises(ValueError):
+            parse_price("29.90")
+        self.assertEqual(amount(None, None, "call us"), float("inf"))
+        self.assertEqual(amount(2990, "USD", "ignored"), 29.9)
+
+    def test_discount_percent(self) -> None:
+        """Discounts should be computed exactly from minor units"""
+        self.assertEqual(discount_percent(Price(4990, "USD"), Price(2990, "USD")), 40.08)
+        self.assertEqual(discount_percent(Price(1000, "USD"), Price(1100, "USD")), -10.0)
+        with self.assertRaises(ValueError):
+            discount_percent(Price(1000, "USD"), Price(500, "EUR"))
+        with self.assertRaises(ValueError):
+            discount_percent(Price(0, "USD"), Price(0, "USD"))
+
+
+if __name__ == "__main__":
+    unittest.main()
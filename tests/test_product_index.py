@@ -0,0 +1,131 @@
+import unittest
+
+from app.services.product_index import ProductIndex
+from app.services.snapshot import Snapshot, encode_snapshot
+from tests.test_snapshot import make_product
+
+
+def make_snapshot(version: int, specs) -> Snapshot:
+    products = [
+        make_product(i, category, discount)
+        for i, (category, discount) in enumerate(specs)
+    ]
+    return Snapshot.from_bytes(encode_snapshot(products, version, 0.0))
+
+
+class TestProductIndex(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.index = ProductIndex()
+        self.index.update(
+            "zara",
+            make_snapshot(1, [("shirt", 10.0), ("Jacket", 40.0), ("shirt", 60.0)]),
+        )
+        self.index.update("mango", make_snapshot(1, [("pants", 20.0), ("shirt", 50.0)]))
+
+    def test_natural_order_across_stores(self) -> None:
+        """Unfiltered queries should page across stores in store order"""
+        total, matches = self.index.query(["zara", "mango"], start=2, end=4)
+
+        self.assertEqual(total, 5)
+        self.assertEqual(matches, [("zara", 2), ("mango", 0)])
+
+    def test_category_posting_list(self) -> None:
+        """Category lookups should be case-insensitive"""
+        total, matches = self.index.query(["zara", "mango"], category="JACKET")
+
+        self.assertEqual(total, 1)
+        self.assertEqual(matches, [("zara", 1)])
+
+    def test_min_discount_single_store(self) -> None:
+        """A single store's min_discount query should bisect its sorted list"""
+        total, matches = self.index.query(["zara"], min_discount=40)
+
+        self.assertEqual(total, 2)
+        self.assertEqual(matches, [("zara", 2), ("zara", 1)])
+
+    def test_single_store_page(self) -> None:
+        """A single store's sorted page should be sliced from its posting list"""
+        total, matches = self.index.query(["zara"], sort="name", start=1, end=2)
+        self.assertEqual(total, 3)
+        self.assertEqual(matches, [("zara", 1)])
+
+        total, matches = self.index.query(["zara"], min_discount=5, start=2, end=10)
+        self.assertEqual(total, 3)
+        self.assertEqual(matches, [("zara", 0)])
+
+    def test_min_discount_across_stores(self) -> None:
+        """Cross-store min_discount queries should merge discount orders"""
+        total, matches = self.index.query(
+            ["zara", "mango"], category="shirt", min_discount=10, start=1
+        )
+
+        self.assertEqual(total, 3)
+        self.assertEqual(matches, [("mango", 1), ("zara", 0)])
+
+    def test_update_only_rebuilds_changed_store(self) -> None:
+        """Updating with an unchanged version should not rebuild the index"""
+        zara = self.index.stores["zara"]
+
+        self.assertFalse(self.index.update("zara", make_snapshot(1, [("shirt", 1.0)])))
+        self.assertIs(self.index.stores["zara"], zara)
+
+        self.assertTrue(self.index.update("zara", make_snapshot(2, [("shirt", 1.0)])))
+        self.assertEqual(self.index.query(["zara"])[0], 1)
+
+    def test_merged_order_invalidated_on_update(self) -> None:
+        """A cached cross-store ordering should be dropped when a store changes"""
+        self.index.query(["zara", "mango"], min_discount=0)
+        self.index.update("mango", make_snapshot(2, [("shirt", 99.0)]))
+
+        _, matches = self.index.query(["zara", "mango"], min_discount=0, end=1)
+
+        self.assertEqual(matches, [("mango", 0)])
+
+    def test_sort_by_name_across_stores(self) -> None:
+        """Name order should merge the stores' sorted posting lists"""
+        total, matches = self.index.query(["zara", "mango"], category="shirt", sort="name")
+
+        self.assertEqual(total, 3)
+        self.assertEqual(matches, [("zara", 0), ("mango", 1), ("zara", 2)])
+
+    def test_sort_by_price_groups_currencies(self) -> None:
+        """Price order should compare amounts only within one currency"""
+        index = ProductIndex()
+        lira = make_product(0).model_copy(
+            update={"currency": "TRY", "discounted_price_minor": 50000}
+        )
+        dollars = make_product(1).model_copy(
+            update={"currency": "USD", "discounted_price_minor": 1500}
+        )
+        cheap_lira = make_product(2).model_copy(
+            update={"currency": "TRY", "discounted_price_minor": 9900}
+        )
+        index.update("mango", Snapshot.from_bytes(encode_snapshot([lira, cheap_lira], 1, 0.0)))
+        index.update("amazon", Snapshot.from_bytes(encode_snapshot([dollars], 1, 0.0)))
+
+        total, matches = index.query(["mango", "amazon"], sort="price")
+
+        self.assertEqual(total, 3)
+        self.assertEqual(matches, [("mango", 1), ("mango", 0), ("amazon", 0)])
+
+    def test_pinned_version_after_update(self) -> None:
+        """A pinned older version should still be queryable after an update"""
+        self.index.update("mango", make_snapshot(2, [("shirt", 99.0)]))
+
+        total, matches = self.index.query(["mango"], versions={"mango": 1})
+
+        self.assertEqual(total, 2)
+        self.assertEqual(self.index.query(["mango"])[0], 1)
+        with self.assertRaises(KeyError):
+            self.index.query(["mango"], versions={"mango": 7})
+
+    def test_removed_store(self) -> None:
+        """A store whose snapshot disappeared should no longer match"""
+        self.index.update("mango", None)
+
+        self.assertEqual(self.index.query(["mango"]), (0, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,16 +1,16 @@
 import unittest
 
 from app.models.product import Product
-from app.services.amazon_scraper import scrape_amazon_discounted_products
-from app.services.mango_scraper import scrape_mango_discounted_products
-from app.services.zara_scraper import scrape_zara_discounted_products
+from app.services.amazon_scraper import crawl_amazon_discounted_products
+from app.services.mango_scraper import crawl_mango_discounted_products
+from app.services.zara_scraper import crawl_zara_discounted_products
 
 
 class TestScraping(unittest.TestCase):
 
     def test_scrape_zara_discounted_products(self) -> None:
         """Test the Zara scraping function with real data"""
-        products = scrape_zara_discounted_products()
+        products = crawl_zara_discounted_products()
 
         self.assertGreater(
             len(products), 0, "No products found on Zara's discounted page"
@@ -27,7 +27,7 @@ class TestScraping(unittest.TestCase):
 
     def test_scrape_amazon_discounted_products(self) -> None:
         """Test the Amazon scraping function with real data"""
-        products = scrape_amazon_discounted_products()
+        products = crawl_amazon_discounted_products()
 
         self.assertGreater(
             len(products), 0, "No products found on Amazon's discounted page"
@@ -44,7 +44,7 @@ class TestScraping(unittest.TestCase):
 
     def test_scrape_mango_discounted_products(self) -> None:
         """Test the Mango scraping function with real data"""
-        products = scrape_mango_discounted_products()
+        products = crawl_mango_discounted_products()
 
         self.assertGreater(
             len(products), 0, "No products found on Mango's discounted page"
@@ -0,0 +1,330 @@
+import asyncio
+import csv
+import io
+import json
+import unittest
+from unittest import mock
+
+from fastapi import HTTPException, Response
+
+from app.routers import products as products_router
+from app.services import store_cache
+from app.services.local_cache import LocalCache
+from app.services.product_index import ProductIndex
+from app.services.response_cache import PageCache
+from app.services.stores import Store
+from app.utils.cursor import Cursor, encode_cursor
+from benchmarks.fake_redis import FakeRedis
+from tests.test_snapshot import make_product
+
+
+async def no_crawl():
+    raise AssertionError("the read-only API must not crawl")
+
+
+def make_store(name: str) -> Store:
+    return Store(
+        name=name, cache_key=name, refresh=no_crawl, crawl_interval=60
+    )
+
+
+class TestDiscountedProducts(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        self.redis = FakeRedis()
+        patchers = [
+            mock.patch.multiple(
+                store_cache,
+                get_cache_bytes=self.redis.get_cache_bytes,
+                get_cache_bytes_many=self.redis.get_cache_bytes_many,
+                set_cache_bytes_many=self.redis.set_cache_bytes_many,
+                patch_cache_bytes=self.redis.patch_cache_bytes,
+                get_cache_list=self.redis.get_cache_list,
+                publish_message=self.redis.publish_message,
+                get_cache_ranges=self.redis.get_cache_ranges,
+                get_cache_prefixes=self.redis.get_cache_prefixes,
+            ),
+            mock.patch.object(
+                products_router,
+                "store_mapping",
+                {"zara": make_store("zara"), "mango": make_store("mango")},
+            ),
+            mock.patch.object(products_router, "API_READ_ONLY", True),
+            mock.patch.object(products_router, "product_index", ProductIndex()),
+            mock.patch.object(
+                products_router, "page_cache", PageCache(LocalCache(max_bytes=1 << 20))
+            ),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        await store_cache.publish(
+            "zara",
+            [
+                make_product(0, "shirt", 10.0),
+                make_product(1, "jacket", 40.0),
+                make_product(2, "shirt", 60.0),
+            ],
+        )
+        await store_cache.publish(
+            "mango",
+            [make_product(3, "pants", 20.0), make_product(4, "shirt", 50.0)],
+        )
+
+    async def query(self, **params):
+        defaults = {
+            "store": None,
+            "category": None,
+            "min_discount": None,
+            "sort": None,
+            "page": 1,
+            "page_size": 10,
+            "cursor": None,
+            "if_none_match": None,
+        }
+        defaults.update(params)
+        self.response = await products_router.get_discounted_products(**defaults)
+        if isinstance(self.response, list):
+            return self.response
+        if self.response.status_code == 304:
+            return None
+        return [r["name"] for r in json.loads(self.response.body)]
+
+    async def test_all_stores(self) -> None:
+        """Products from every store should be returned in store order"""
+        self.assertEqual(
+            await self.query(),
+            ["Product 0", "Product 1", "Product 2", "Product 3", "Product 4"],
+        )
+
+    async def test_store_filter(self) -> None:
+        """The store filter should be case-insensitive"""
+        self.assertEqual(await self.query(store="Mango"), ["Product 3", "Product 4"])
+
+    async def test_category_and_discount_filters(self) -> None:
+        """Category and minimum discount filters should combine"""
+        self.assertEqual(
+            await self.query(category="Shirt", min_discount=50),
+            ["Product 2", "Product 4"],
+        )
+
+    async def test_min_discount_orders_by_discount(self) -> None:
+        """Results filtered by min_discount should be ordered by discount"""
+        self.assertEqual(
+            await self.query(min_discount=20),
+            ["Product 2", "Product 4", "Product 1", "Product 3"],
+        )
+
+    async def test_unchanged_snapshot_reuses_index(self) -> None:
+        """Only snapshot headers should be read while the catalog is unchanged"""
+        await self.query()
+        zara_index = products_router.product_index.stores["zara"]
+
+        await self.query(category="shirt")
+
+        self.assertIs(products_router.product_index.stores["zara"], zara_index)
+
+    async def test_new_snapshot_is_picked_up(self) -> None:
+        """A newly published snapshot should be indexed on the next query"""
+        await self.query()
+        await store_cache.publish("mango", [make_product(9, "shirt", 90.0)])
+
+        self.assertEqual(await self.query(store="mango"), ["Product 9"])
+
+    async def test_pagination(self) -> None:
+        """Pages should slice the filtered results"""
+        self.assertEqual(
+            await self.query(page=2, page_size=2), ["Product 2", "Product 3"]
+        )
+        self.assertEqual(await self.query(page=4, page_size=2), [])
+
+    async def test_sort_by_name(self) -> None:
+        """An explicit sort should order the merged results of every store"""
+        self.assertEqual(
+            await self.query(sort="name", category="shirt"),
+            ["Product 0", "Product 2", "Product 4"],
+        )
+
+    async def test_sort_with_min_discount(self) -> None:
+        """Sorting by something other than discount should still apply min_discount"""
+        self.assertEqual(
+            await self.query(sort="name", min_discount=40),
+            ["Product 1", "Product 2", "Product 4"],
+        )
+
+    async def test_cursor_pages_through_results(self) -> None:
+        """Following X-Next-Cursor should return every result exactly once"""
+        seen = await self.query(sort="discount_percent", page_size=2)
+        self.assertEqual(self.response.headers["X-Total-Count"], "5")
+        while "X-Next-Cursor" in self.response.headers:
+            seen += await self.query(cursor=self.response.headers["X-Next-Cursor"])
+
+        self.assertEqual(
+            seen, ["Product 2", "Product 4", "Product 1", "Product 3", "Product 0"]
+        )
+
+    async def test_cursor_survives_republish(self) -> None:
+        """A cursor should keep reading its snapshot after a new one is published"""
+        await self.query(store="mango", page_size=1)
+        cursor = self.response.headers["X-Next-Cursor"]
+        await store_cache.publish("mango", [make_product(9, "shirt", 90.0)])
+
+        self.assertEqual(await self.query(cursor=cursor), ["Product 4"])
+        self.assertEqual(await self.query(store="mango"), ["Product 9"])
+
+    async def test_expired_cursor(self) -> None:
+        """A cursor whose snapshot is no longer retained should be rejected"""
+        await self.query(store="mango", page_size=1)
+        cursor = self.response.headers["X-Next-Cursor"]
+        self.redis.values.clear()
+        # Another worker, whose index never saw that snapshot.
+        products_router.product_index = ProductIndex()
+
+        with self.assertRaises(HTTPException) as raised:
+            await self.query(cursor=cursor)
+        self.assertEqual(raised.exception.status_code, 410)
+
+    async def test_invalid_cursor(self) -> None:
+        """A malformed cursor should be rejected as a bad request"""
+        with self.assertRaises(HTTPException) as raised:
+            await self.query(cursor="not-a-cursor")
+        self.assertEqual(raised.exception.status_code, 400)
+
+        for tampered in [
+            Cursor({"zara": 1}, None, None, None, "price", -5),
+            Cursor({"zara": 1}, None, None, "abc", None, 0),
+            Cursor({"zara": 1}, None, 5, None, None, 0),
+            Cursor({"zara": 1}, 7, None, None, None, 0),
+        ]:
+            with self.assertRaises(HTTPException) as raised:
+                await self.query(cursor=encode_cursor(tampered))
+            self.assertEqual(raised.exception.status_code, 400)
+
+    async def test_server_error(self) -> None:
+        """An unexpected failure should be a 500, not an empty page"""
+        with mock.patch.object(
+            products_router, "_render_page", side_effect=RuntimeError("boom")
+        ), self.assertRaises(HTTPException) as raised:
+            await self.query()
+        self.assertEqual(raised.exception.status_code, 500)
+
+    async def test_page_etag(self) -> None:
+        """Re-polling an unchanged page with its ETag should return 304"""
+        await self.query(store="zara")
+        etag = self.response.headers["ETag"]
+        self.assertIn("max-age", self.response.headers["Cache-Control"])
+
+        await self.query(store="zara", if_none_match=etag)
+        self.assertEqual(self.response.status_code, 304)
+        self.assertEqual(self.response.body, b"")
+
+        await store_cache.publish("zara", [make_product(9, "shirt", 90.0)])
+        self.assertEqual(await self.query(store="zara", if_none_match=etag), ["Product 9"])
+
+    async def test_rendered_pages_are_reused(self) -> None:
+        """A page should be rendered once per snapshot version"""
+        with mock.patch.object(
+            products_router, "_load_page", wraps=products_router._load_page
+        ) as load_page:
+            first = await self.query(category="shirt")
+            self.assertEqual(await self.query(category="SHIRT"), first)
+            self.assertEqual(load_page.call_count, 1)
+
+            await store_cache.publish("mango", [make_product(9, "shirt", 90.0)])
+            self.assertIn("Product 9", await self.query(category="shirt"))
+            self.assertEqual(load_page.call_count, 2)
+
+    async def test_popular_pages_are_precomputed_on_publish(self) -> None:
+        """A publish should re-render the most requested first pages of that store"""
+        await self.query(store="mango")
+        await store_cache.publish("mango", [make_product(9, "shirt", 90.0)])
+
+        with mock.patch.object(
+            products_router, "_load_page", wraps=products_router._load_page
+        ) as load_page, mock.patch.object(
+            products_router, "API_READ_ONLY", False
+        ), mock.patch.object(products_router, "get_or_refresh_many") as refresh:
+            products_router._precompute_pages("mango", 0)
+            await asyncio.gather(*products_router._precomputing)
+            self.assertEqual(load_page.call_count, 1)
+            # Even where the API may crawl, a publish message never starts one.
+            refresh.assert_not_called()
+
+            self.assertEqual(await self.query(store="mango"), ["Product 9"])
+            self.assertEqual(load_page.call_count, 1)
+
+    async def export(self, **params):
+        defaults = {
+            "store": None,
+            "category": None,
+            "min_discount": None,
+            "sort": None,
+            "format": "ndjson",
+            "if_none_match": None,
+        }
+        defaults.update(params)
+        response = await products_router.export_discounted_products(**defaults)
+        body = ""
+        if response.status_code == 200:
+            body = "".join([chunk async for chunk in response.body_iterator])
+        return response, body
+
+    async def test_export_ndjson(self) -> None:
+        """The export should stream every matching product as one JSON line each"""
+        with mock.patch.object(products_router, "EXPORT_BATCH_SIZE", 2):
+            response, body = await self.export(min_discount=20)
+
+        names = [json.loads(line)["name"] for line in body.splitlines()]
+        self.assertEqual(names, ["Product 2", "Product 4", "Product 1", "Product 3"])
+        self.assertEqual(response.headers["X-Total-Count"], "4")
+
+    async def test_export_csv(self) -> None:
+        """The CSV export should start with a header row"""
+        _, body = await self.export(store="mango", format="csv")
+
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0][0], "name")
+        self.assertEqual([row[0] for row in rows[1:]], ["Product 3", "Product 4"])
+
+    async def test_export_etag(self) -> None:
+        """Re-polling an unchanged catalog with its ETag should return 304"""
+        response, _ = await self.export()
+        etag = response.headers["ETag"]
+
+        unchanged, body = await self.export(if_none_match=etag)
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertEqual(body, "")
+
+        await store_cache.publish("zara", [make_product(9, "shirt", 90.0)])
+        changed, _ = await self.export(if_none_match=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers["ETag"], etag)
+
+    async def test_changes_since_export(self) -> None:
+        """The changes feed should pick up from an export's catalog version"""
+        response, _ = await self.export()
+        since = int(response.headers["X-Catalog-Version"])
+        await store_cache.publish("mango", [make_product(3, "pants", 20.0)])
+
+        feed_response = Response()
+        changes = await products_router.get_product_changes(
+            feed_response, since=since, store=None
+        )
+
+        self.assertEqual([c.store for c in changes], ["mango"])
+        self.assertEqual([p.name for p in changes[0].removed], ["Product 4"])
+        self.assertEqual(feed_response.headers["X-Catalog-Version"], str(changes[0].version))
+
+        self.redis.values.pop("zara:changes")
+        with self.assertRaises(HTTPException) as raised:
+            await products_router.get_product_changes(Response(), since=1, store=None)
+        self.assertEqual(raised.exception.status_code, 410)
+
+    async def test_unknown_store(self) -> None:
+        """An unknown store should return no products"""
+        self.assertEqual(await self.query(store="unknown"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from unittest import mock
+
+from app.services import redis_cache
+from app.services.redis_cache import (
+    CircuitBreaker,
+    compress_value,
+    decompress_value,
+    guarded,
+)
+
+
+class TestCircuitBreaker(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.breaker = CircuitBreaker(failures=2, reset_after=60)
+        patcher = mock.patch.object(redis_cache, "breaker", self.breaker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.calls = 0
+        self.fail = True
+
+    @guarded(fallback="fallback")
+    async def command(self):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("down")
+        return "ok"
+
+    async def test_circuit_opens_after_repeated_failures(self) -> None:
+        """Once open, calls should fail fast without reaching Redis"""
+        for _ in range(4):
+            self.assertEqual(await self.command(), "fallback")
+
+        self.assertTrue(self.breaker.open)
+        self.assertEqual(self.calls, 2)
+
+    async def test_successful_trial_closes_circuit(self) -> None:
+        """A successful call after the reset period should close the circuit"""
+        await self.command()
+        await self.command()
+        self.fail = False
+        self.breaker.reset_after = 0
+
+        self.assertEqual(await self.command(), "ok")
+        self.assertFalse(self.breaker.open)
+
+
+class TestCompression(unittest.TestCase):
+
+    def test_large_values_round_trip_compressed(self) -> None:
+        """Values over the threshold should be compressed and read back unchanged"""
+        value = '{"products": [%s]}' % ", ".join(["1"] * 5000)
+        data = compress_value(value)
+
+        self.assertTrue(data.startswith(redis_cache.COMPRESSED_MAGIC))
+        self.assertLess(len(data), len(value))
+        self.assertEqual(decompress_value(data), value)
+        self.assertEqual(decompress_value(compress_value("[]")), "[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import unittest
+from unittest import mock
+
+from app.services import rendering
+
+
+class FakeDriver:
+    def __init__(self, transferred=0) -> None:
+        self.transferred = transferred
+        self.cdp = []
+
+    def execute_cdp_cmd(self, cmd, params):
+        self.cdp.append((cmd, params))
+        return {}
+
+    def execute_script(self, script, *args):
+        return self.transferred
+
+
+class TestRenderingProfile(unittest.TestCase):
+
+    def test_default_profile(self) -> None:
+        """The default profile should block images, media, fonts and trackers"""
+        profile = rendering.rendering_profile()
+
+        self.assertEqual(profile.page_load_strategy, "eager")
+        self.assertIn("*.woff2*", profile.blocked_urls)
+        self.assertIn("*doubleclick.net*", profile.blocked_urls)
+        self.assertNotIn("*.css*", profile.blocked_urls)
+
+    def test_store_overrides(self) -> None:
+        """Per-store settings should replace the shared blocking lists"""
+        overrides = {
+            "ZARA_RENDER_BLOCK_TYPES": "stylesheet",
+            "ZARA_RENDER_BLOCK_URLS": "*ads.test*",
+            "MANGO_RENDER_BLOCKING": "false",
+        }
+        with mock.patch.dict(os.environ, overrides):
+            zara = rendering.rendering_profile("zara")
+            mango = rendering.rendering_profile("mango")
+
+        self.assertEqual(zara.blocked_urls, ("*.css*", "*ads.test*"))
+        self.assertEqual(mango.blocked_urls, ())
+
+    def test_chrome_options(self) -> None:
+        """Launch options should follow the profile"""
+        profile = rendering.RenderingProfile(True, "eager", "800,600", ("*.png*",))
+
+        options = rendering.chrome_options(profile)
+
+        self.assertIn("--headless=new", options.arguments)
+        self.assertIn("--window-size=800,600", options.arguments)
+        self.assertIn("--blink-settings=imagesEnabled=false", options.arguments)
+        self.assertEqual(options.page_load_strategy, "eager")
+
+    def test_render_session_blocks_and_measures(self) -> None:
+        """A render session should apply blocking and record time and bytes"""
+        driver = FakeDriver(transferred=2048)
+        stats = rendering.RenderStats()
+
+        with mock.patch.object(rendering, "render_stats", stats):
+            with rendering.render_session(driver, "zara"):
+                pass
+
+        self.assertEqual(driver.cdp[1][0], "Network.setBlockedURLs")
+        self.assertEqual(
+            driver.cdp[1][1]["urls"], list(rendering.rendering_profile("zara").blocked_urls)
+        )
+        self.assertEqual(stats.snapshot()["zara"]["bytes_total"], 2048)
+        self.assertEqual(stats.snapshot()["zara"]["renders"], 1)
+
+    def test_blocking_without_devtools(self) -> None:
+        """Drivers without DevTools access should be left as they are"""
+        self.assertFalse(
+            rendering.apply_blocking(object(), rendering.rendering_profile())
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
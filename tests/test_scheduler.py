@@ -0,0 +1,88 @@
+import unittest
+from unittest import mock
+
+from app.services import store_cache
+from app.services.scheduler import CrawlScheduler
+from app.services.stores import Store
+from benchmarks.fake_redis import FakeRedis
+from tests.test_store_cache import PRODUCT
+
+
+class TestCrawlScheduler(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.redis = FakeRedis()
+        patcher = mock.patch.multiple(
+            store_cache,
+            get_cache_bytes=self.redis.get_cache_bytes,
+            get_cache_bytes_many=self.redis.get_cache_bytes_many,
+            set_cache_bytes_many=self.redis.set_cache_bytes_many,
+            patch_cache_bytes=self.redis.patch_cache_bytes,
+            get_cache_list=self.redis.get_cache_list,
+            publish_message=self.redis.publish_message,
+            get_cache_ranges=self.redis.get_cache_ranges,
+            acquire_lock=self.redis.acquire_lock,
+            release_lock=self.redis.release_lock,
+            is_locked=self.redis.is_locked,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_store(self, results) -> Store:
+        results = list(results)
+        self.attempts = 0
+
+        async def refresh():
+            self.attempts += 1
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        return Store(
+            name="zara",
+            cache_key="zara",
+            refresh=refresh,
+            crawl_interval=60,
+        )
+
+    async def test_crawl_retries_then_publishes(self) -> None:
+        """A failed crawl should be retried and the result published"""
+        store = self.make_store([RuntimeError("timeout"), [], [PRODUCT]])
+        scheduler = CrawlScheduler([store], max_retries=3, backoff_base=0)
+
+        self.assertTrue(await scheduler.crawl(store))
+        self.assertEqual(self.attempts, 3)
+        self.assertEqual(await store_cache.read_cached("zara"), [PRODUCT])
+
+    async def test_failed_crawl_keeps_last_snapshot(self) -> None:
+        """When every retry fails the previous snapshot should be kept"""
+        await store_cache.publish("zara", [PRODUCT])
+        store = self.make_store([[], []])
+        scheduler = CrawlScheduler([store], max_retries=1, backoff_base=0)
+
+        self.assertFalse(await scheduler.crawl(store))
+        self.assertEqual(await store_cache.read_cached("zara"), [PRODUCT])
+
+    async def test_crawl_skipped_when_locked(self) -> None:
+        """A store being crawled by another worker should be skipped"""
+        self.redis.locks["zara"] = "other-worker"
+        store = self.make_store([[PRODUCT]])
+        scheduler = CrawlScheduler([store])
+
+        self.assertFalse(await scheduler.crawl(store))
+        self.assertEqual(self.attempts, 0)
+
+    async def test_initial_delay_waits_for_recent_snapshot(self) -> None:
+        """A recent snapshot should delay the first crawl until it is due"""
+        store = self.make_store([])
+        scheduler = CrawlScheduler([store], jitter=0)
+
+        self.assertEqual(await scheduler._initial_delay(store), 0.0)
+
+        await store_cache.publish("zara", [PRODUCT])
+        self.assertAlmostEqual(await scheduler._initial_delay(store), 60, delta=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
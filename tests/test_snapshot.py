@@ -0,0 +1,92 @@
+import json
+import unittest
+
+from app.models.product import Product
+from app.services.snapshot import (
+    HEADER,
+    Snapshot,
+    SnapshotFormatError,
+    encode_snapshot,
+)
+
+
+def make_product(i: int, category: str = "shirt", discount: float = 10.0) -> Product:
+    return Product(
+        name=f"Product {i}",
+        original_price="$ 20.00",
+        discounted_price="$ 18.00",
+        discount_percent=discount,
+        purchase_url=f"https://example.com/p{i}",
+        image_url=f"https://example.com/p{i}.jpg",
+        store="zara",
+        category=category,
+    )
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def test_round_trip(self) -> None:
+        """Encoded products should decode back unchanged"""
+        products = [make_product(i) for i in range(3)]
+
+        snapshot = Snapshot.from_bytes(encode_snapshot(products, 7, 123.5))
+
+        self.assertEqual(snapshot.version, 7)
+        self.assertEqual(snapshot.fetched_at, 123.5)
+        self.assertEqual(len(snapshot), 3)
+        self.assertEqual(snapshot.products(), products)
+
+    def test_columns(self) -> None:
+        """Discounts and categories should be readable without decoding rows"""
+        products = [
+            make_product(0, "shirt", 10.0),
+            make_product(1, "jacket", 55.5),
+            make_product(2, "shirt", 30.0),
+        ]
+
+        snapshot = Snapshot.from_bytes(encode_snapshot(products, 1, 0.0))
+
+        self.assertEqual(list(snapshot.discounts), [10.0, 55.5, 30.0])
+        self.assertEqual(snapshot.categories, ["shirt", "jacket"])
+        self.assertEqual(
+            [snapshot.category(i) for i in range(3)], ["shirt", "jacket", "shirt"]
+        )
+
+    def test_slice_records(self) -> None:
+        """Only the requested rows should be decoded"""
+        products = [make_product(i) for i in range(10)]
+        snapshot = Snapshot.from_bytes(encode_snapshot(products, 1, 0.0))
+
+        records = snapshot.records(range(4, 6))
+
+        self.assertEqual([r["name"] for r in records], ["Product 4", "Product 5"])
+
+    def test_metadata_only(self) -> None:
+        """A snapshot decoded from its metadata should decode rows passed in"""
+        products = [make_product(i) for i in range(5)]
+        data = encode_snapshot(products, 1, 0.0)
+
+        prefix = data[: Snapshot.metadata_length(data[: HEADER.size])]
+        snapshot = Snapshot(prefix)
+        self.assertFalse(snapshot.has_rows)
+
+        start, end = snapshot.row_span(3)
+        self.assertEqual(snapshot.record(3, data[start:end])["name"], "Product 3")
+        with self.assertRaises(SnapshotFormatError):
+            snapshot.record(3)
+
+    def test_rejects_other_data(self) -> None:
+        """Bytes that are not a snapshot should be rejected"""
+        with self.assertRaises(SnapshotFormatError):
+            Snapshot.from_bytes(b'[{"name": "json"}]')
+
+    def test_smaller_than_json(self) -> None:
+        """The snapshot should be more compact than the JSON list it replaces"""
+        products = [make_product(i) for i in range(100)]
+        as_json = json.dumps([p.model_dump() for p in products]).encode()
+
+        self.assertLess(len(encode_snapshot(products, 1, 0.0)), len(as_json))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,221 @@
+import asyncio
+import json
+import time
+import unittest
+from unittest import mock
+
+from app.models.product import Product
+from app.services import store_cache
+from app.services.snapshot import encode_snapshot
+from benchmarks.fake_redis import FakeRedis
+
+PRODUCT = Product(
+    name="Linen Shirt",
+    original_price="$ 50.00",
+    discounted_price="$ 25.00",
+    discount_percent=50.0,
+    purchase_url="https://www.zara.com/p1",
+    image_url="https://static.zara.net/p1.jpg",
+    store="zara",
+    category="shirt",
+)
+
+
+class TestStoreCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.redis = FakeRedis()
+        self.crawls = 0
+        patcher = mock.patch.multiple(
+            store_cache,
+            get_cache_bytes=self.redis.get_cache_bytes,
+            get_cache_bytes_many=self.redis.get_cache_bytes_many,
+            set_cache_bytes_many=self.redis.set_cache_bytes_many,
+            patch_cache_bytes=self.redis.patch_cache_bytes,
+            get_cache_list=self.redis.get_cache_list,
+            publish_message=self.redis.publish_message,
+            get_cache_ranges=self.redis.get_cache_ranges,
+            get_cache_prefixes=self.redis.get_cache_prefixes,
+            acquire_lock=self.redis.acquire_lock,
+            release_lock=self.redis.release_lock,
+            is_locked=self.redis.is_locked,
+            CACHE_WAIT_INTERVAL=0.01,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def crawl(self):
+        self.crawls += 1
+        await asyncio.sleep(0.05)
+        return [PRODUCT]
+
+    async def test_concurrent_misses_crawl_once(self) -> None:
+        """Concurrent misses should share a single crawl"""
+        results = await asyncio.gather(
+            *[store_cache.get_or_refresh("zara", self.crawl) for _ in range(5)]
+        )
+
+        self.assertEqual(self.crawls, 1)
+        self.assertTrue(all(r.products() == [PRODUCT] for r in results))
+        self.assertFalse(self.redis.locks)
+
+    async def test_fresh_entry_is_served_without_crawl(self) -> None:
+        """A fresh entry should be returned without crawling"""
+        await store_cache.publish("zara", [PRODUCT])
+
+        snapshot = await store_cache.get_or_refresh("zara", self.crawl)
+        self.assertEqual(snapshot.products(), [PRODUCT])
+        self.assertEqual(self.crawls, 0)
+
+    async def test_stale_entry_is_served_while_refreshing(self) -> None:
+        """A stale entry should be served at once and refreshed in the background"""
+        await self.redis.set_cache_bytes(
+            "zara", encode_snapshot([], version=1, fetched_at=0)
+        )
+
+        results = await asyncio.gather(
+            *[store_cache.get_or_refresh("zara", self.crawl) for _ in range(3)]
+        )
+        self.assertEqual([len(r) for r in results], [0, 0, 0])
+
+        await asyncio.gather(*store_cache._background)
+        self.assertEqual(self.crawls, 1)
+        snapshot = await store_cache.get_or_refresh("zara", self.crawl)
+        self.assertEqual(snapshot.products(), [PRODUCT])
+
+    async def test_empty_refresh_keeps_stale_entry(self) -> None:
+        """A refresh that finds no products should not replace a stale entry"""
+        await self.redis.set_cache_bytes(
+            "zara", encode_snapshot([PRODUCT], version=1, fetched_at=0)
+        )
+
+        async def failed_crawl():
+            return []
+
+        snapshot = await store_cache.get_or_refresh("zara", failed_crawl)
+        await asyncio.gather(*store_cache._background, return_exceptions=True)
+
+        self.assertEqual(snapshot.products(), [PRODUCT])
+        current = await store_cache.read_current_snapshot("zara")
+        self.assertEqual(current.products(), [PRODUCT])
+        self.assertEqual(current.fetched_at, 0)
+        self.assertFalse(self.redis.locks)
+
+    async def test_miss_waits_for_other_worker(self) -> None:
+        """A miss should wait for the worker that holds the Redis lock"""
+        self.redis.locks["zara"] = "other-worker"
+
+        async def publish():
+            await asyncio.sleep(0.05)
+            await store_cache.publish("zara", [PRODUCT])
+
+        snapshot, _ = await asyncio.gather(
+            store_cache.get_or_refresh("zara", self.crawl), publish()
+        )
+
+        self.assertEqual(snapshot.products(), [PRODUCT])
+        self.assertEqual(self.crawls, 0)
+
+    async def test_many_stores_are_read_together(self) -> None:
+        """Batched reads should serve cached stores and refresh only the missing one"""
+        await store_cache.publish("zara", [PRODUCT])
+
+        async def fail():
+            raise RuntimeError("blocked")
+
+        zara, hm, mango = await store_cache.get_or_refresh_many(
+            [("zara", fail), ("hm", self.crawl), ("mango", fail)]
+        )
+
+        self.assertEqual(zara.products(), [PRODUCT])
+        self.assertEqual(hm.products(), [PRODUCT])
+        self.assertIsInstance(mango, RuntimeError)
+        self.assertEqual(self.crawls, 1)
+
+    async def test_legacy_json_entry_is_read(self) -> None:
+        """JSON entries written before snapshots should still be readable"""
+        self.redis.values["zara"] = json.dumps(
+            {"fetched_at": time.time(), "products": [PRODUCT.model_dump()]}
+        ).encode()
+
+        self.assertEqual(await store_cache.read_cached("zara"), [PRODUCT])
+
+    async def test_load_records_fetches_only_page_rows(self) -> None:
+        """Rows should be fetched by range when only metadata was read"""
+        products = [
+            PRODUCT.model_copy(update={"name": f"Shirt {i}"}) for i in range(200)
+        ]
+        await store_cache.publish("zara", products)
+
+        with mock.patch.object(store_cache, "SNAPSHOT_PREFETCH", 64):
+            snapshot = await store_cache.read_snapshot_metadata("zara")
+            self.assertFalse(snapshot.has_rows)
+
+            self.redis.bytes_read = 0
+            records = await store_cache.load_records("zara", snapshot, [10, 11, 150])
+
+        self.assertEqual([r["name"] for r in records], ["Shirt 10", "Shirt 11", "Shirt 150"])
+        self.assertLess(self.redis.bytes_read, 1000)
+
+    async def test_load_records_detects_new_snapshot(self) -> None:
+        """Reading rows of a replaced snapshot should raise SnapshotChangedError"""
+        await store_cache.publish("zara", [PRODUCT] * 50)
+        with mock.patch.object(store_cache, "SNAPSHOT_PREFETCH", 64):
+            snapshot = await store_cache.read_snapshot_metadata("zara")
+
+        repriced = PRODUCT.model_copy(update={"discount_percent": 40.0})
+        await store_cache.publish("zara", [repriced] * 50)
+
+        with self.assertRaises(store_cache.SnapshotChangedError):
+            await store_cache.load_records("zara", snapshot, [0])
+
+    async def test_unchanged_crawl_keeps_snapshot(self) -> None:
+        """Publishing an identical crawl should only renew fetched_at in place"""
+        first = await store_cache.publish("zara", [PRODUCT])
+        with mock.patch.object(store_cache.time, "time", return_value=first.fetched_at + 60):
+            second = await store_cache.publish("zara", [PRODUCT])
+
+        self.assertEqual(second.version, first.version)
+        self.assertEqual(second.fetched_at, first.fetched_at + 60)
+        cached = await store_cache.read_snapshot("zara")
+        self.assertEqual(cached.fetched_at, first.fetched_at + 60)
+        self.assertEqual(len(self.redis.values["zara:changes"]), 1)
+
+    async def test_failed_write_is_not_announced(self) -> None:
+        """A snapshot Redis failed to store should not be announced or recorded"""
+        with mock.patch.object(
+            store_cache, "set_cache_bytes_many", mock.AsyncMock(return_value=False)
+        ), mock.patch.object(store_cache.price_history, "record") as record:
+            snapshot = await store_cache.publish("zara", [PRODUCT])
+
+        self.assertEqual(snapshot.products(), [PRODUCT])
+        self.assertEqual(self.redis.messages, [])
+        record.assert_not_called()
+
+    async def test_changes_feed(self) -> None:
+        """Each publish that changes products should append one delta"""
+        first = await store_cache.publish("zara", [PRODUCT])
+        repriced = PRODUCT.model_copy(update={"discounted_price": "$ 20.00"})
+        second = await store_cache.publish("zara", [repriced])
+
+        changes = await store_cache.read_changes("zara", first.version)
+
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0]["version"], second.version)
+        self.assertEqual(changes[0]["previous_version"], first.version)
+        self.assertEqual(changes[0]["changed"][0]["discounted_price"], "$ 20.00")
+        self.assertEqual(changes[0]["added"], [])
+        self.assertEqual(await store_cache.read_changes("zara", second.version), [])
+
+    async def test_changes_feed_gap(self) -> None:
+        """A since older than the retained feed should be reported as a gap"""
+        first = await store_cache.publish("zara", [PRODUCT])
+        self.redis.values.pop("zara:changes")
+        await store_cache.publish("zara", [PRODUCT.model_copy(update={"name": "Tee"})])
+
+        self.assertIsNone(await store_cache.read_changes("zara", first.version - 1))
+        self.assertIsNotNone(await store_cache.read_changes("zara", first.version))
+
+
+if __name__ == "__main__":
+    unittest.main()
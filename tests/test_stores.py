@@ -0,0 +1,53 @@
+import subprocess
+import sys
+import unittest
+
+from app.services.stores import ScraperPlugin, load_plugin, plugin_references, plugin_store
+from tests.test_snapshot import make_product
+
+PLUGIN = ScraperPlugin(crawl=lambda: [make_product(1)], parse=lambda html, base_url=None: [])
+NOT_A_PLUGIN = object()
+
+
+class TestStoreRegistry(unittest.IsolatedAsyncioTestCase):
+
+    def test_api_does_not_import_scrapers(self) -> None:
+        """Importing the API should load neither store modules, Selenium nor the crawl clients"""
+        loaded = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, app.main; print(sorted(m for m in sys.modules "
+                "if m.split('.')[0] in ('selenium', 'bs4', 'requests') "
+                "or m.endswith(('_scraper', '.extraction'))))",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(loaded.stdout.strip(), "[]")
+
+    def test_configured_plugins(self) -> None:
+        """STORE_PLUGINS should add and remove stores, ignoring malformed entries"""
+        references = plugin_references("zara=, Shop=tests.test_stores:PLUGIN, broken")
+
+        self.assertNotIn("zara", references)
+        self.assertEqual(references["shop"], "tests.test_stores:PLUGIN")
+        self.assertEqual(references["amazon"], "app.services.amazon_scraper:PLUGIN")
+
+    async def test_plugin_store(self) -> None:
+        """A plugin store should crawl through its plugin, whole when it has no pages"""
+        store = plugin_store("shop", "tests.test_stores:PLUGIN")
+
+        self.assertEqual(store.cache_key, "shop_discounted_products")
+        self.assertEqual(await store.refresh(), [make_product(1)])
+        self.assertEqual(await store.crawl_pages(1, 1), ([make_product(1)], 1))
+
+    def test_invalid_plugin(self) -> None:
+        """A reference to anything but a ScraperPlugin should be rejected"""
+        with self.assertRaises(TypeError):
+            load_plugin("tests.test_stores:NOT_A_PLUGIN")
+
+
+if __name__ == "__main__":
+    unittest.main()